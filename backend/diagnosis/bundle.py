@@ -0,0 +1,94 @@
+# backend/diagnosis/bundle.py
+#
+# 모델 API 바이너리 응답(bundle) 스트리밍 파서
+# 형식 정의: model_api/bundle.py (형식을 바꾸면 함께 수정해야 함)
+#
+# 이미지 파트는 응답 스트림에서 조각 단위로 읽어 임시 파일에 바로 기록하므로
+# base64 JSON처럼 전체 이미지를 메모리에 두 번(문자열 + 디코딩 결과) 올리지 않습니다.
+
+import json
+import struct
+import tempfile
+
+BUNDLE_MEDIA_TYPE = "application/x-earlydot-bundle"
+MAGIC = b"EDB1"
+PART_HEADER = struct.Struct(">HHQ")
+METADATA_PART = "metadata"
+CHUNK_SIZE = 64 * 1024
+
+
+class BundleFormatError(ValueError):
+    """번들 형식이 올바르지 않을 때 발생"""
+
+
+def is_bundle_response(response):
+    """requests 응답이 바이너리 번들인지 확인"""
+    return response.headers.get("Content-Type", "").startswith(BUNDLE_MEDIA_TYPE)
+
+
+def _read_exact(stream, size):
+    """스트림에서 정확히 size 바이트를 읽음 (짧으면 형식 오류)"""
+    chunks = []
+    remaining = size
+    while remaining > 0:
+        chunk = stream.read(remaining)
+        if not chunk:
+            raise BundleFormatError(f"번들이 예상보다 일찍 끝났습니다 ({size - remaining}/{size} bytes)")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+def _copy_exact(stream, dst, size):
+    """스트림에서 size 바이트를 CHUNK_SIZE 단위로 dst 파일에 복사"""
+    remaining = size
+    while remaining > 0:
+        chunk = stream.read(min(CHUNK_SIZE, remaining))
+        if not chunk:
+            raise BundleFormatError(f"번들 파트가 예상보다 일찍 끝났습니다 ({size - remaining}/{size} bytes)")
+        dst.write(chunk)
+        remaining -= len(chunk)
+
+
+def read_bundle(stream):
+    """
+    번들 스트림을 읽어 메타데이터와 이미지 파트를 반환
+
+    Args:
+        stream: read(n)을 지원하는 파일 형태 객체 (예: requests 응답의 response.raw)
+
+    Returns:
+        (metadata dict, {파트 이름: (content_type, 임시 파일 객체)})
+        임시 파일은 처음 위치로 되감겨 있으며, 닫으면 자동 삭제됩니다. 호출한 쪽에서 close() 해야 합니다.
+    """
+    if _read_exact(stream, len(MAGIC)) != MAGIC:
+        raise BundleFormatError("번들 MAGIC이 올바르지 않습니다")
+
+    metadata = None
+    blobs = {}
+    try:
+        while True:
+            name_len, content_type_len, body_len = PART_HEADER.unpack(_read_exact(stream, PART_HEADER.size))
+            if name_len == 0:
+                break
+            name = _read_exact(stream, name_len).decode("utf-8")
+            content_type = _read_exact(stream, content_type_len).decode("ascii")
+
+            if name == METADATA_PART:
+                metadata = json.loads(_read_exact(stream, body_len).decode("utf-8"))
+                continue
+
+            blob_file = tempfile.TemporaryFile()
+            blobs[name] = (content_type, blob_file)
+            _copy_exact(stream, blob_file, body_len)
+            blob_file.seek(0)
+    except Exception:
+        for _, blob_file in blobs.values():
+            blob_file.close()
+        raise
+
+    if metadata is None:
+        for _, blob_file in blobs.values():
+            blob_file.close()
+        raise BundleFormatError("번들에 metadata 파트가 없습니다")
+    return metadata, blobs
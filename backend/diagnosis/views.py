@@ -10,7 +10,9 @@ from rest_framework.permissions import IsAuthenticated
 # IsAuthenticated: 로그인한 사용자만 접근 가능하게 함
 import requests
 import os
+import time
 
+from .bundle import BUNDLE_MEDIA_TYPE, is_bundle_response, read_bundle
 from .models import Photos, Results, DiseaseInfo
 from .serializers import PhotoUploadSerializer, PhotoDetailSerializer
 from dashboard.models import FollowUpCheck
@@ -18,6 +20,201 @@ from dashboard.models import FollowUpCheck
 
 # (만약 기존에 views.py에 다른 코드가 있었다면 그 아래에 추가하세요)
 
+# 모델 API 429 응답의 Retry-After가 이 값(초) 이하일 때만 한 번 재시도
+MODEL_API_MAX_RETRY_AFTER = 10
+
+# 모델 API와 미디어 볼륨을 공유하면(모델 API의 SHARED_MEDIA_ROOT = MEDIA_ROOT) 이미지 바이트 대신
+# MEDIA_ROOT 기준 상대 경로로 진단 요청 (/shared/diagnose)
+MODEL_API_SHARED_MEDIA = os.getenv('MODEL_API_SHARED_MEDIA', '0') == '1'
+
+
+def _retry_after_seconds(response):
+    """429 응답의 Retry-After 헤더(초)를 정수로 반환 (없거나 형식이 다르면 None)"""
+    try:
+        return int(response.headers.get("Retry-After", ""))
+    except ValueError:
+        return None
+
+
+def _post_model_api(url, **kwargs):
+    """모델 API POST 요청 (과부하로 429를 주면 Retry-After가 짧을 때만 한 번 더 시도)"""
+    for attempt in range(2):
+        response = requests.post(url, **kwargs)
+        if response.status_code != 429 or attempt == 1:
+            return response
+        retry_after = _retry_after_seconds(response)
+        if retry_after is None or retry_after > MODEL_API_MAX_RETRY_AFTER:
+            print(f"[Diagnosis] [1/5] 모델 API 과부하 (Retry-After: {retry_after}), 재시도하지 않음")
+            return response
+        response.close()
+        print(f"[Diagnosis] [1/5] 모델 API 과부하, {retry_after}초 후 재시도")
+        time.sleep(retry_after)
+
+
+def _media_path(relative_path):
+    """모델 API가 돌려준 MEDIA_ROOT 기준 상대 경로를 절대 경로로 변환 (MEDIA_ROOT 밖이면 None)"""
+    media_root = os.path.realpath(settings.MEDIA_ROOT)
+    path = os.path.realpath(os.path.join(media_root, relative_path))
+    if os.path.commonpath([media_root, path]) != media_root:
+        print(f"[Diagnosis] 경고: MEDIA_ROOT 밖의 경로를 무시합니다: {relative_path}")
+        return None
+    return path
+
+
+def _diagnose_via_shared_path(fastapi_url, photo_instance, image_path):
+    """
+    공유 미디어 볼륨 경로로 진단 요청 (이미지 바이트를 주고받지 않음)
+
+    모델 API가 입력 옆에 기록한 털 제거 이미지로 원본 파일을 교체합니다.
+    Returns: (예측 결과 dict 또는 None, GradCAM의 MEDIA_ROOT 기준 상대 경로 또는 None)
+    """
+    import shutil
+
+    relative_path = photo_instance.upload_storage_path.name
+    print(f"[Diagnosis] [1/5] 진단 파이프라인 시작 (공유 경로): {fastapi_url}/shared/diagnose ({relative_path})")
+    response = _post_model_api(
+        f"{fastapi_url}/shared/diagnose",
+        json={"path": relative_path, "generate_gradcam": True},
+        timeout=300,  # 5분 타임아웃 (처리 시간이 길 수 있음)
+    )
+    print(f"[Diagnosis] [1/5] 진단 응답 상태 코드: {response.status_code}")
+    if response.status_code != 200:
+        print(f"[Diagnosis] [1/5] 진단 실패 (처음 200자): {response.text[:200]}")
+        response.close()
+        return None, None
+    prediction_data = response.json()
+    response.close()
+
+    # 털 제거된 이미지로 원본 파일 교체 (같은 볼륨 안의 rename, 털 제거 실패 시 원본 유지)
+    processed_name = prediction_data.get("processed_image_path")
+    processed_path = _media_path(processed_name) if processed_name else None
+    if processed_path:
+        shutil.copy2(image_path, f"{image_path}.backup")
+        os.replace(processed_path, image_path)
+        print(f"[Diagnosis] [1/5] 털 제거 완료: Photo ID {photo_instance.id} ({os.path.getsize(image_path)} bytes)")
+    else:
+        print(f"[Diagnosis] [1/5] 털 제거 실패, 원본 이미지로 분류되었습니다.")
+
+    grad_cam_name = prediction_data.get("grad_cam_path")
+    if grad_cam_name and _media_path(grad_cam_name) is None:
+        grad_cam_name = None
+    return prediction_data, grad_cam_name
+
+
+def _diagnose_via_upload(fastapi_url, photo_instance, image_path, file_name):
+    """
+    이미지 바이트로 진단 요청 (/diagnose, 바이너리 번들 응답 우선)
+
+    털 제거된 이미지로 원본 파일을 교체합니다.
+    Returns: (예측 결과 dict 또는 None, 털 제거 이미지 파일 객체 또는 None, GradCAM 파일 객체 또는 None)
+    """
+    prediction_data = None
+    processed_image_file = None
+    grad_cam_file = None
+    with open(image_path, 'rb') as f:
+        image_bytes = f.read()
+
+    # FastAPI 서버 호출 (털 제거 + 분류 + GradCAM)
+    print(f"[Diagnosis] [1/5] 진단 파이프라인 시작: {fastapi_url}/diagnose")
+
+    # 바이너리 번들 응답 요청 (이미지를 base64 없이 원본 바이트로 받음)
+    # 모델 API가 과부하로 429를 주면 Retry-After가 짧을 때만 한 번 더 시도
+    response = _post_model_api(
+        f"{fastapi_url}/diagnose",
+        files={"file": (file_name, image_bytes, "image/jpeg")},
+        params={"generate_gradcam": True},  # GradCAM 생성 활성화
+        headers={"Accept": f"{BUNDLE_MEDIA_TYPE}, application/json"},
+        stream=True,
+        timeout=300  # 5분 타임아웃 (처리 시간이 길 수 있음)
+    )
+
+    print(f"[Diagnosis] [1/5] 진단 응답 상태 코드: {response.status_code}")
+
+    if response.status_code == 200:
+        if is_bundle_response(response):
+            # 바이너리 번들: 이미지 파트를 응답 스트림에서 임시 파일로 바로 기록
+            response.raw.decode_content = True
+            prediction_data, blobs = read_bundle(response.raw)
+            processed_image_file = blobs.get("processed_image", (None, None))[1]
+            grad_cam_file = blobs.get("grad_cam_bytes", (None, None))[1]
+        else:
+            # JSON 응답 (이미지는 base64) - 이전 모델 API 호환
+            import base64
+            import io
+            prediction_data = response.json()
+            if prediction_data.get("processed_image"):
+                processed_image_file = io.BytesIO(base64.b64decode(prediction_data["processed_image"]))
+            if prediction_data.get("grad_cam_bytes"):
+                grad_cam_file = io.BytesIO(base64.b64decode(prediction_data["grad_cam_bytes"]))
+
+        # 털 제거된 이미지로 원본 파일 덮어쓰기 (털 제거 실패 시 원본 유지)
+        if processed_image_file is not None:
+            import shutil
+
+            # 기존 파일 백업 (선택적)
+            backup_path = f"{image_path}.backup"
+            if os.path.exists(image_path):
+                shutil.copy2(image_path, backup_path)
+
+            # 임시 파일에 조각 단위로 복사한 뒤 교체 (중간에 실패해도 원본이 깨지지 않음)
+            tmp_path = f"{image_path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                shutil.copyfileobj(processed_image_file, f)
+            os.replace(tmp_path, image_path)
+            print(f"[Diagnosis] [1/5] 처리된 이미지 크기: {os.path.getsize(image_path)} bytes")
+            print(f"[Diagnosis] [1/5] 털 제거 완료: Photo ID {photo_instance.id}")
+        else:
+            print(f"[Diagnosis] [1/5] 털 제거 실패, 원본 이미지로 분류되었습니다.")
+    else:
+        print(f"[Diagnosis] [1/5] 진단 실패: 상태 코드 {response.status_code}")
+        # 응답 내용도 크기만 표시 (긴 에러 메시지일 수 있음)
+        response_text = response.text
+        print(f"[Diagnosis] [1/5] 응답 크기: {len(response_text)}자")
+        if response_text:
+            print(f"[Diagnosis] [1/5] 응답 내용 (처음 200자): {response_text[:200]}")
+        # 진단 실패해도 Photos는 저장되어 있음
+    response.close()
+    return prediction_data, processed_image_file, grad_cam_file
+
+
+def _predict_original(fastapi_url, file_name, image_path):
+    """
+    /diagnose 실패 시 원본 이미지로 /predict 재시도 (기존 흐름에서 털 제거 실패 시 원본으로 분류하던 것과 동일)
+
+    Returns: (예측 결과 dict 또는 None, GradCAM 파일 객체 또는 None)
+    """
+    with open(image_path, 'rb') as f:
+        image_bytes = f.read()
+
+    print(f"[Diagnosis] [2/5] 원본 이미지로 환부 분류 재시도: {fastapi_url}/predict")
+    response = _post_model_api(
+        f"{fastapi_url}/predict",
+        files={"file": (file_name, image_bytes, "image/jpeg")},
+        params={"generate_gradcam": True},
+        headers={"Accept": f"{BUNDLE_MEDIA_TYPE}, application/json"},
+        stream=True,
+        timeout=300,
+    )
+    print(f"[Diagnosis] [2/5] 예측 응답 상태 코드: {response.status_code}")
+    try:
+        if response.status_code != 200:
+            print(f"[Diagnosis] [2/5] 예측 실패 (처음 200자): {response.text[:200]}")
+            return None, None
+        if is_bundle_response(response):
+            response.raw.decode_content = True
+            prediction_data, blobs = read_bundle(response.raw)
+            return prediction_data, blobs.get("grad_cam_bytes", (None, None))[1]
+        # JSON 응답 (이미지는 base64) - 이전 모델 API 호환
+        import base64
+        import io
+        prediction_data = response.json()
+        grad_cam_file = None
+        if prediction_data.get("grad_cam_bytes"):
+            grad_cam_file = io.BytesIO(base64.b64decode(prediction_data["grad_cam_bytes"]))
+        return prediction_data, grad_cam_file
+    finally:
+        response.close()
+
 
 class PhotoUploadView(APIView):
     """
@@ -71,10 +268,13 @@ class PhotoUploadView(APIView):
             # Results ID 추적 (AI 예측 성공 시 사용)
             result_id = None
             
-            # 털 제거 파이프라인 호출 (전처리 모델 역할)
-            # FastAPI 서버에 이미지 전송하여 털 제거 처리
+            # 진단 파이프라인 호출 (털 제거 → 환부 분류 → GradCAM)
+            # FastAPI /diagnose 한 번의 호출로 처리 (털 제거 이미지는 모델 서버 메모리에서 바로 분류에 사용됨)
             # 중요: 원본 이미지는 이미 저장되어 있으므로, 처리 실패해도 문제 없음
-            processed_image_bytes = None
+            prediction_data = None
+            processed_image_file = None  # 털 제거된 이미지 (임시 파일 또는 BytesIO)
+            grad_cam_file = None  # GradCAM 이미지 (임시 파일 또는 BytesIO)
+            grad_cam_name = None  # 공유 경로 모드: 모델 API가 기록한 GradCAM 상대 경로
             image_path = None
             file_name = None
             fastapi_url = os.getenv('FASTAPI_URL', 'http://fastapi:8001')
@@ -92,193 +292,138 @@ class PhotoUploadView(APIView):
                         print(f"[Diagnosis] ========== 전체 파이프라인 시작 (총 5단계) ==========")
                         print(f"[Diagnosis] 이미지 파일 확인: {image_path} (크기: {os.path.getsize(image_path)} bytes)")
                         
-                        with open(image_path, 'rb') as f:
-                            image_bytes = f.read()
-                        
-                        # FastAPI 서버 호출 (털 제거)
-                        print(f"[Diagnosis] [1/5] 털 제거 파이프라인 시작: {fastapi_url}/remove-hair")
-                        
-                        response = requests.post(
-                            f"{fastapi_url}/remove-hair",
-                            files={"file": (file_name, image_bytes, "image/jpeg")},
-                            timeout=300  # 5분 타임아웃 (처리 시간이 길 수 있음)
-                        )
-                        
-                        if response.status_code == 200:
-                            # 처리된 이미지로 원본 파일 덮어쓰기
-                            processed_image_bytes = response.content
-                            print(f"[Diagnosis] [1/5] 처리된 이미지 크기: {len(processed_image_bytes)} bytes")
-                            
-                            # 기존 파일 백업 (선택적)
-                            backup_path = f"{image_path}.backup"
-                            if os.path.exists(image_path):
-                                import shutil
-                                shutil.copy2(image_path, backup_path)
-                            
-                            with open(image_path, 'wb') as f:
-                                f.write(processed_image_bytes)
-                            print(f"[Diagnosis] [1/5] 털 제거 파이프라인 완료: Photo ID {photo_instance.id}")
-                        else:
-                            print(f"[Diagnosis] 털 제거 처리 실패: {response.status_code}")
-                            print(f"[Diagnosis] 응답 내용: {response.text[:500]}")  # 처음 500자만 출력
-                            print(f"[Diagnosis] 원본 이미지로 AI 예측을 진행합니다.")
-                            # 원본 이미지는 그대로 유지됨
+                        try:
+                            if MODEL_API_SHARED_MEDIA:
+                                prediction_data, grad_cam_name = _diagnose_via_shared_path(
+                                    fastapi_url, photo_instance, image_path
+                                )
+                            else:
+                                prediction_data, processed_image_file, grad_cam_file = _diagnose_via_upload(
+                                    fastapi_url, photo_instance, image_path, file_name
+                                )
+                        except requests.exceptions.RequestException as e:
+                            # 타임아웃 / 연결 실패도 아래에서 원본 이미지로 분류를 재시도
+                            print(f"[Diagnosis] [1/5] 진단 요청 실패: {str(e)}")
+
+                        if prediction_data is None:
+                            # /diagnose 실패 시 원본 이미지로 분류만 다시 시도
+                            prediction_data, grad_cam_file = _predict_original(fastapi_url, file_name, image_path)
                 else:
-                    print(f"[Diagnosis] 이미지 파일이 없어 털 제거 처리를 건너뜁니다: Photo ID {photo_instance.id}")
+                    print(f"[Diagnosis] 이미지 파일이 없어 진단을 건너뜁니다: Photo ID {photo_instance.id}")
             except requests.exceptions.RequestException as e:
                 # 네트워크 에러 등
                 print(f"[Diagnosis] FastAPI 요청 실패 (이미지는 저장됨): {str(e)}")
-                print(f"[Diagnosis] 원본 이미지로 AI 예측을 진행합니다.")
                 import traceback
                 if settings.DEBUG:
                     traceback.print_exc()
             except Exception as e:
                 # 기타 에러
-                print(f"[Diagnosis] 털 제거 처리 중 오류 발생 (이미지는 저장됨): {str(e)}")
-                print(f"[Diagnosis] 원본 이미지로 AI 예측을 진행합니다.")
+                print(f"[Diagnosis] 진단 처리 중 오류 발생 (이미지는 저장됨): {str(e)}")
                 import traceback
                 if settings.DEBUG:
                     traceback.print_exc()
             
-            # AI 모델 예측 호출 (털 제거 성공/실패 여부와 관계없이 실행)
-            # 털 제거된 이미지가 있으면 사용, 없으면 원본 이미지 사용
-            if image_path and os.path.exists(image_path):
+            # 진단 결과 저장 (AI 예측 성공 시)
+            if prediction_data:
                 try:
-                    print(f"[Diagnosis] [2/5] 환부 분류 파이프라인 시작: {fastapi_url}/predict")
+                    print(f"[Diagnosis] [2/5] 환부 분류 결과 확인")
+                    
+                    # 예측 데이터를 간결하게 로그 출력 (이미지 데이터는 크기만 표시)
+                    print(f"[Diagnosis] [2/5] disease_name_ko: {prediction_data.get('disease_name_ko')}")
+                    print(f"[Diagnosis] [2/5] disease_name_en: {prediction_data.get('disease_name_en')}")
+                    print(f"[Diagnosis] [2/5] risk_level: {prediction_data.get('risk_level')}")
+                    
+                    # 클래스 확률 (상위 3개만 표시)
+                    class_probs = prediction_data.get('class_probs')
+                    if class_probs and isinstance(class_probs, dict):
+                        sorted_probs = sorted(class_probs.items(), key=lambda x: x[1], reverse=True)[:3]
+                        prob_str = ", ".join([f"{k}: {v:.4f}" for k, v in sorted_probs])
+                        print(f"[Diagnosis] [2/5] 클래스 확률 (상위 3개): {prob_str}")
+                    else:
+                        print(f"[Diagnosis] [2/5] 클래스 확률: {type(class_probs).__name__} (크기: {len(str(class_probs))}자)" if class_probs else "[Diagnosis] [2/5] 클래스 확률: 없음")
                     
-                    # 털 제거된 이미지가 있으면 사용, 없으면 원본 이미지 사용
-                    if processed_image_bytes:
-                        image_bytes_for_predict = processed_image_bytes
-                        print(f"[Diagnosis] [2/5] 털 제거된 이미지로 예측 진행")
-                        content_type = "image/png"
+                    # GradCAM 이미지 크기만 표시
+                    if grad_cam_file is not None:
+                        grad_cam_size = grad_cam_file.seek(0, os.SEEK_END)
+                        grad_cam_file.seek(0)
+                        print(f"[Diagnosis] [2/5] GradCAM 이미지: {grad_cam_size} bytes")
+                    elif grad_cam_name:
+                        print(f"[Diagnosis] [2/5] GradCAM 이미지 (공유 경로): {grad_cam_name}")
                     else:
-                        # 원본 이미지로 예측 시도
-                        with open(image_path, 'rb') as f:
-                            image_bytes_for_predict = f.read()
-                        print(f"[Diagnosis] [2/5] 원본 이미지로 예측 진행 (털 제거 실패 또는 건너뜀)")
-                        content_type = "image/jpeg"
+                        print(f"[Diagnosis] [2/5] GradCAM 이미지: 없음")
                     
-                    print(f"[Diagnosis] [2/5] 이미지 크기: {len(image_bytes_for_predict)} bytes")
+                    # DiseaseInfo에서 질병 찾기 또는 생성
+                    disease_name_ko = prediction_data.get("disease_name_ko", "알 수 없음")
+                    disease_name_en = prediction_data.get("disease_name_en", "Unknown")
                     
-                    predict_response = requests.post(
-                        f"{fastapi_url}/predict",
-                        files={"file": (file_name, image_bytes_for_predict, content_type)},
-                        params={"generate_gradcam": True},  # GradCAM 생성 활성화
-                        timeout=300  # 5분 타임아웃
+                    print(f"[Diagnosis] DiseaseInfo 조회/생성 시작: name_ko={disease_name_ko}")
+                    disease, created = DiseaseInfo.objects.get_or_create(
+                        name_ko=disease_name_ko,
+                        defaults={
+                            "name_en": disease_name_en,
+                            "classification": "기타",  # 기본값, 필요시 수정
+                            "description": None,
+                            "recommendation": None,
+                        }
                     )
                     
-                    print(f"[Diagnosis] [2/5] 예측 응답 상태 코드: {predict_response.status_code}")
+                    if created:
+                        print(f"[Diagnosis] [3/5] 새로운 질병 정보 생성: {disease_name_ko} (ID: {disease.id})")
+                    else:
+                        print(f"[Diagnosis] [3/5] 기존 질병 정보 사용: {disease_name_ko} (ID: {disease.id})")
                     
-                    if predict_response.status_code == 200:
-                        prediction_data = predict_response.json()
-                        print(f"[Diagnosis] [2/5] 환부 분류 파이프라인 완료")
-                        
-                        # 예측 데이터를 간결하게 로그 출력 (base64 이미지 데이터는 크기만 표시)
-                        print(f"[Diagnosis] [2/5] disease_name_ko: {prediction_data.get('disease_name_ko')}")
-                        print(f"[Diagnosis] [2/5] disease_name_en: {prediction_data.get('disease_name_en')}")
-                        print(f"[Diagnosis] [2/5] risk_level: {prediction_data.get('risk_level')}")
-                        
-                        # 클래스 확률 (상위 3개만 표시)
-                        class_probs = prediction_data.get('class_probs')
-                        if class_probs and isinstance(class_probs, dict):
-                            sorted_probs = sorted(class_probs.items(), key=lambda x: x[1], reverse=True)[:3]
-                            prob_str = ", ".join([f"{k}: {v:.4f}" for k, v in sorted_probs])
-                            print(f"[Diagnosis] [2/5] 클래스 확률 (상위 3개): {prob_str}")
-                        else:
-                            print(f"[Diagnosis] [2/5] 클래스 확률: {type(class_probs).__name__} (크기: {len(str(class_probs))}자)" if class_probs else "[Diagnosis] [2/5] 클래스 확률: 없음")
-                        
-                        # GradCAM 이미지 크기만 표시
-                        grad_cam_bytes = prediction_data.get('grad_cam_bytes')
-                        if grad_cam_bytes:
-                            # base64 문자열의 크기 계산 (디코딩하지 않고 대략적인 크기 추정)
-                            grad_cam_size = len(grad_cam_bytes) * 3 // 4  # base64는 약 4:3 비율
-                            print(f"[Diagnosis] [2/5] GradCAM 이미지: {len(grad_cam_bytes)}자 (base64), 추정 바이너리 크기: 약 {grad_cam_size} bytes")
-                        else:
-                            print(f"[Diagnosis] [2/5] GradCAM 이미지: 없음")
+                    # GradCAM 이미지 저장 (있는 경우)
+                    grad_cam_path = None
+                    if grad_cam_file is not None:
+                        from django.core.files import File
                         
-                        # DiseaseInfo에서 질병 찾기 또는 생성
-                        disease_name_ko = prediction_data.get("disease_name_ko", "알 수 없음")
-                        disease_name_en = prediction_data.get("disease_name_en", "Unknown")
-                        
-                        print(f"[Diagnosis] DiseaseInfo 조회/생성 시작: name_ko={disease_name_ko}")
-                        disease, created = DiseaseInfo.objects.get_or_create(
-                            name_ko=disease_name_ko,
-                            defaults={
-                                "name_en": disease_name_en,
-                                "classification": "기타",  # 기본값, 필요시 수정
-                                "description": None,
-                                "recommendation": None,
-                            }
-                        )
-                        
-                        if created:
-                            print(f"[Diagnosis] [3/5] 새로운 질병 정보 생성: {disease_name_ko} (ID: {disease.id})")
-                        else:
-                            print(f"[Diagnosis] [3/5] 기존 질병 정보 사용: {disease_name_ko} (ID: {disease.id})")
-                        
-                        # GradCAM 이미지 저장 (있는 경우)
-                        grad_cam_path = None
-                        if prediction_data.get("grad_cam_bytes"):
-                            import base64
-                            from django.core.files.base import ContentFile
-                            
-                            grad_cam_bytes = base64.b64decode(prediction_data["grad_cam_bytes"])
-                            grad_cam_filename = f"gradcam_{photo_instance.id}.png"
-                            grad_cam_path = ContentFile(grad_cam_bytes, name=grad_cam_filename)
-                        
-                        # Results 테이블에 저장
-                        print(f"[Diagnosis] [4/5] Results 생성 시작: photo_id={photo_instance.id}, disease_id={disease.id}")
-                        result = Results.objects.create(
-                            photo=photo_instance,
-                            risk_level=prediction_data.get("risk_level", "중간"),
-                            class_probs=prediction_data.get("class_probs", {}),
-                            grad_cam_path=grad_cam_path,
-                            disease=disease,
-                        )
-                        result_id = result.id  # Results ID 저장
-                        print(f"[Diagnosis] [4/5] Results 저장 완료: Result ID {result.id}, Disease ID {result.disease.id}, Disease Name: {result.disease.name_ko}")
-                        
-                        # FollowUpCheck 자동 생성 (환자의 담당 의사가 있는 경우)
-                        print(f"[Diagnosis] [5/5] FollowUpCheck 생성 시작")
-                        patient_user = photo_instance.user
-                        if patient_user.doctor:
-                            try:
-                                # FollowUpCheck가 이미 존재하는지 확인
-                                followup_check, created = FollowUpCheck.objects.get_or_create(
-                                    result=result,
-                                    defaults={
-                                        'user': patient_user,
-                                        'doctor': patient_user.doctor,
-                                        'current_status': '요청중',
-                                        'doctor_risk_level': None,  # 의사가 아직 소견을 작성하지 않음
-                                        'doctor_note': None,
-                                    }
-                                )
-                                if created:
-                                    print(f"[Diagnosis] [5/5] FollowUpCheck 자동 생성: FollowUpCheck ID {followup_check.id}, 의사 ID {patient_user.doctor.uid.id}")
-                                else:
-                                    print(f"[Diagnosis] [5/5] FollowUpCheck 이미 존재: FollowUpCheck ID {followup_check.id}")
-                            except Exception as e:
-                                print(f"[Diagnosis] [5/5] FollowUpCheck 생성 실패: {e}")
-                                import traceback
-                                traceback.print_exc()
-                        else:
-                            print(f"[Diagnosis] [5/5] 환자에게 담당 의사가 없어 FollowUpCheck를 생성하지 않습니다.")
-                        
-                        print(f"[Diagnosis] ========== 전체 파이프라인 완료 ==========")
+                        # 스토리지에는 파일에서 조각 단위로 복사됨
+                        grad_cam_filename = f"gradcam_{photo_instance.id}.png"
+                        grad_cam_path = File(grad_cam_file, name=grad_cam_filename)
+                    elif grad_cam_name:
+                        # 공유 경로 모드: 모델 API가 이미 MEDIA_ROOT에 기록한 파일을 그대로 참조
+                        grad_cam_path = grad_cam_name
+                    
+                    # Results 테이블에 저장
+                    print(f"[Diagnosis] [4/5] Results 생성 시작: photo_id={photo_instance.id}, disease_id={disease.id}")
+                    result = Results.objects.create(
+                        photo=photo_instance,
+                        risk_level=prediction_data.get("risk_level", "중간"),
+                        class_probs=prediction_data.get("class_probs", {}),
+                        grad_cam_path=grad_cam_path,
+                        disease=disease,
+                    )
+                    result_id = result.id  # Results ID 저장
+                    print(f"[Diagnosis] [4/5] Results 저장 완료: Result ID {result.id}, Disease ID {result.disease.id}, Disease Name: {result.disease.name_ko}")
+                    
+                    # FollowUpCheck 자동 생성 (환자의 담당 의사가 있는 경우)
+                    print(f"[Diagnosis] [5/5] FollowUpCheck 생성 시작")
+                    patient_user = photo_instance.user
+                    if patient_user.doctor:
+                        try:
+                            # FollowUpCheck가 이미 존재하는지 확인
+                            followup_check, created = FollowUpCheck.objects.get_or_create(
+                                result=result,
+                                defaults={
+                                    'user': patient_user,
+                                    'doctor': patient_user.doctor,
+                                    'current_status': '요청중',
+                                    'doctor_risk_level': None,  # 의사가 아직 소견을 작성하지 않음
+                                    'doctor_note': None,
+                                }
+                            )
+                            if created:
+                                print(f"[Diagnosis] [5/5] FollowUpCheck 자동 생성: FollowUpCheck ID {followup_check.id}, 의사 ID {patient_user.doctor.uid.id}")
+                            else:
+                                print(f"[Diagnosis] [5/5] FollowUpCheck 이미 존재: FollowUpCheck ID {followup_check.id}")
+                        except Exception as e:
+                            print(f"[Diagnosis] [5/5] FollowUpCheck 생성 실패: {e}")
+                            import traceback
+                            traceback.print_exc()
                     else:
-                        print(f"[Diagnosis] [2/5] AI 예측 실패: 상태 코드 {predict_response.status_code}")
-                        # 응답 내용도 크기만 표시 (긴 에러 메시지일 수 있음)
-                        response_text = predict_response.text
-                        print(f"[Diagnosis] [2/5] 응답 크기: {len(response_text)}자")
-                        if response_text:
-                            print(f"[Diagnosis] [2/5] 응답 내용 (처음 200자): {response_text[:200]}")
-                        # 예측 실패해도 Photos는 저장되어 있음
-                except requests.exceptions.RequestException as e:
-                    print(f"[Diagnosis] [2/5] AI 예측 요청 실패: {str(e)}")
-                    import traceback
-                    if settings.DEBUG:
-                        traceback.print_exc()
+                        print(f"[Diagnosis] [5/5] 환자에게 담당 의사가 없어 FollowUpCheck를 생성하지 않습니다.")
+                    
+                    print(f"[Diagnosis] ========== 전체 파이프라인 완료 ==========")
                 except Exception as e:
                     print(f"[Diagnosis] [2/5] AI 예측 처리 중 오류 발생: {str(e)}")
                     import traceback
@@ -286,7 +431,12 @@ class PhotoUploadView(APIView):
                     if settings.DEBUG:
                         traceback.print_exc()
             else:
-                print(f"[Diagnosis] 이미지 파일이 없어 AI 예측을 건너뜁니다: Photo ID {photo_instance.id}")
+                print(f"[Diagnosis] 진단 결과가 없어 Results를 생성하지 않습니다: Photo ID {photo_instance.id}")
+            
+            # 번들 임시 파일 정리
+            for blob_file in (processed_image_file, grad_cam_file):
+                if blob_file is not None:
+                    blob_file.close()
             
             # 저장 성공 후 ID를 포함한 응답 반환 (프론트엔드에서 결과 페이지로 이동하기 위해 필요)
             # serializer.data는 to_representation을 통해 이미지 URL이 절대 경로로 변환됨
@@ -0,0 +1,149 @@
+"""
+엔드포인트별 동시 실행 수 / 대기열 제한 (admission control)
+
+부하가 몰리면 요청이 기본 스레드 풀에 끝없이 쌓이고, Django는 최대 300초까지 기다린 뒤에야 실패합니다.
+엔드포인트마다 최대 동시 실행 수, 최대 대기 수, 대기 시간 예산을 두고 이를 넘는 요청은 즉시 429로 거절하며,
+관측된 처리 시간(EWMA)으로 Retry-After를 계산합니다.
+
+사용 방법:
+    controller = AdmissionController("predict", max_in_flight=4, max_queued=16, queue_timeout_s=30)
+    try:
+        async with controller.admit():
+            result = await compute()
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=429, headers={"Retry-After": str(e.retry_after)})
+"""
+import asyncio
+import logging
+import math
+import time
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    """대기열이 가득 찼거나 대기 시간 예산을 넘어 요청을 받을 수 없을 때 발생"""
+
+    def __init__(self, name: str, reason: str, retry_after: int):
+        super().__init__(f"{name}: {reason} (Retry-After {retry_after}초)")
+        self.name = name
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """동시 실행 수 + 대기열 + 대기 시간 예산 기반 요청 수락기"""
+
+    def __init__(
+        self,
+        name: str,
+        max_in_flight: int,
+        max_queued: int,
+        queue_timeout_s: float,
+        initial_service_s: float = 5.0,
+        ewma_alpha: float = 0.2,
+    ):
+        """
+        Args:
+            name: 로그 및 통계 표시용 이름
+            max_in_flight: 동시에 실행할 최대 요청 수
+            max_queued: 실행 대기 중인 최대 요청 수 (초과 시 즉시 거절)
+            queue_timeout_s: 대기 시간 예산 (예상 대기가 이보다 길면 즉시 거절, 실제 대기가 넘어도 거절)
+            initial_service_s: 관측값이 없을 때 사용할 요청당 처리 시간 추정치
+            ewma_alpha: 처리 시간 지수 이동 평균 계수
+        """
+        if max_in_flight < 1:
+            raise ValueError(f"max_in_flight는 1 이상이어야 합니다: {max_in_flight}")
+        self.name = name
+        self.max_in_flight = int(max_in_flight)
+        self.max_queued = int(max_queued)
+        self.queue_timeout_s = float(queue_timeout_s)
+        self.ewma_alpha = float(ewma_alpha)
+
+        self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        self._in_flight = 0
+        self._queued = 0
+        self._service_s = float(initial_service_s)
+
+        # 통계
+        self._admitted = 0
+        self._rejected_queue_full = 0
+        self._rejected_budget = 0
+        self._rejected_timeout = 0
+
+    def estimated_wait_s(self, position: int = None) -> float:
+        """
+        position번째 대기자가 실행을 시작하기까지의 예상 시간
+
+        동시에 max_in_flight개가 처리되므로 앞선 (대기 + 실행) 요청 수 / max_in_flight 만큼의
+        처리 시간이 걸린다고 봅니다.
+        """
+        if position is None:
+            position = self._queued + 1
+        ahead = max(0, self._in_flight + position - self.max_in_flight)
+        return math.ceil(ahead / self.max_in_flight) * self._service_s
+
+    def retry_after(self) -> int:
+        """Retry-After 헤더 값 (초, 최소 1)"""
+        return max(1, math.ceil(self.estimated_wait_s() + self._service_s))
+
+    def _reject(self, reason: str) -> AdmissionRejected:
+        rejected = AdmissionRejected(self.name, reason, self.retry_after())
+        logger.warning(f"[Admission:{self.name}] 요청 거절: {rejected}")
+        return rejected
+
+    @asynccontextmanager
+    async def admit(self):
+        """
+        실행 슬롯을 얻을 때까지 대기 (제한을 넘으면 AdmissionRejected)
+
+        블록이 끝나면 실행 시간을 처리 시간 추정치에 반영합니다.
+        """
+        if not self._semaphore.locked() and self._queued == 0:
+            # 빈 슬롯이 있으면 대기 없이 바로 획득 (asyncio.Semaphore는 이 경우 양보하지 않음)
+            await self._semaphore.acquire()
+        else:
+            if self._queued >= self.max_queued:
+                self._rejected_queue_full += 1
+                raise self._reject(f"대기열 가득 참 ({self._queued}/{self.max_queued})")
+            if self.estimated_wait_s() > self.queue_timeout_s:
+                self._rejected_budget += 1
+                raise self._reject(
+                    f"예상 대기 {self.estimated_wait_s():.1f}초 > 예산 {self.queue_timeout_s:.1f}초"
+                )
+
+            self._queued += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout_s)
+            except asyncio.TimeoutError:
+                self._rejected_timeout += 1
+                raise self._reject(f"대기 시간 예산 {self.queue_timeout_s:.1f}초 초과")
+            finally:
+                self._queued -= 1
+
+        self._in_flight += 1
+        self._admitted += 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self._service_s += self.ewma_alpha * (elapsed - self._service_s)
+            self._in_flight -= 1
+            self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "max_in_flight": self.max_in_flight,
+            "max_queued": self.max_queued,
+            "queue_timeout_s": self.queue_timeout_s,
+            "in_flight": self._in_flight,
+            "queued": self._queued,
+            "ewma_service_s": self._service_s,
+            "admitted": self._admitted,
+            "rejected_queue_full": self._rejected_queue_full,
+            "rejected_budget": self._rejected_budget,
+            "rejected_timeout": self._rejected_timeout,
+        }
@@ -0,0 +1,188 @@
+"""
+사전 빌드된 TorchScript 추론 아티팩트 캐시
+
+모델 API는 시작할 때마다 파이썬 코드로 모델을 다시 만들고 state_dict를 채웁니다. LaMa는 특히
+saicinpainting의 load_checkpoint + OmegaConf/YAML 설정 해석을 거치므로 느립니다.
+build_artifacts.py가 각 모델을 trace + freeze한 TorchScript 파일로 저장해 두면, 파이프라인은
+그 파일을 torch.jit.load로 바로 읽고 (원본 파이썬 모듈 import 불필요), 아티팩트가 없거나
+맞지 않으면 기존 로딩 경로로 돌아갑니다.
+
+아티팩트 키 = 원본 체크포인트 SHA-256 + torch 버전 + 디바이스 종류 + 모델별 설정
+체크포인트를 교체하거나 torch를 업그레이드하면 키가 바뀌어 이전 아티팩트는 자동으로 무시됩니다.
+(체크포인트 해시는 크기/수정 시각과 함께 hashes.json에 기억해 두어 시작할 때마다 다시 계산하지 않습니다)
+
+대상: U-Net++ (털 마스크), BSRGAN, LaMa, ViT
+CNN 앙상블은 GradCAM++ hook(model_A.layer4)과 수동 forward가 필요하므로 eager 모드로 유지합니다.
+
+사용 방법:
+    cache = default_cache()
+    loaded = cache.load("vit", [vit_checkpoint_path], device=device)
+    if loaded is not None:
+        module, meta = loaded
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+# 아티팩트 캐시 사용 여부와 위치
+# 환경변수로 변경 가능: ARTIFACT_CACHE_ENABLED (기본값: 1), ARTIFACT_CACHE_DIR (기본값: model_api/cache/artifacts)
+ARTIFACT_CACHE_ENABLED = os.getenv('ARTIFACT_CACHE_ENABLED', '1') == '1'
+ARTIFACT_CACHE_DIR = os.getenv('ARTIFACT_CACHE_DIR', str(Path(__file__).parent / "cache" / "artifacts"))
+
+# 아티팩트 포맷 버전 (trace 방식이 바뀌면 올려서 기존 아티팩트 무효화)
+ARTIFACT_FORMAT_VERSION = 1
+
+_HASH_CHUNK = 8 * 1024 * 1024
+
+
+def _sha256_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ArtifactCache:
+    """체크포인트 해시로 키를 만드는 TorchScript 아티팩트 저장소"""
+
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = Path(cache_dir)
+        self._hashes_path = self.cache_dir / "hashes.json"
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # 키
+    # ------------------------------------------------------------------
+    def _read_hashes(self) -> Dict[str, dict]:
+        try:
+            return json.loads(self._hashes_path.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def checkpoint_hash(self, path: Path) -> str:
+        """체크포인트 SHA-256 (크기/수정 시각이 같으면 기억해 둔 값 사용)"""
+        path = Path(path).resolve()
+        st = path.stat()
+        with self._lock:
+            hashes = self._read_hashes()
+            entry = hashes.get(str(path))
+            if entry and entry.get("size") == st.st_size and entry.get("mtime_ns") == st.st_mtime_ns:
+                return entry["sha256"]
+
+            digest = _sha256_file(path)
+            hashes[str(path)] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest}
+            try:
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                tmp_path = self._hashes_path.with_suffix(f".tmp{os.getpid()}")
+                tmp_path.write_text(json.dumps(hashes, indent=2))
+                os.replace(tmp_path, self._hashes_path)
+            except OSError as e:
+                logger.warning(f"[Artifacts] 체크포인트 해시 저장 실패 (무시): {e}")
+            return digest
+
+    def key(self, name: str, sources: Iterable[Path], device: torch.device, extra: str = "") -> str:
+        """아티팩트 키 (원본 체크포인트 해시 + torch 버전 + 디바이스 종류 + 설정)"""
+        h = hashlib.sha256()
+        h.update(f"{name};v{ARTIFACT_FORMAT_VERSION};torch={torch.__version__};device={torch.device(device).type};".encode())
+        for source in sources:
+            h.update(f"{Path(source).name}={self.checkpoint_hash(source)};".encode())
+        h.update(extra.encode())
+        return h.hexdigest()[:16]
+
+    def paths(self, name: str, key: str) -> Tuple[Path, Path]:
+        """(TorchScript 파일, 메타데이터 JSON) 경로"""
+        return self.cache_dir / f"{name}-{key}.pt", self.cache_dir / f"{name}-{key}.json"
+
+    # ------------------------------------------------------------------
+    # 로드 / 저장
+    # ------------------------------------------------------------------
+    def load(
+        self,
+        name: str,
+        sources: Iterable[Path],
+        device: torch.device,
+        extra: str = "",
+    ) -> Optional[Tuple[torch.jit.ScriptModule, dict]]:
+        """
+        아티팩트 로드 → (module, meta), 없거나 손상되었거나 원본이 없으면 None
+
+        None이면 호출하는 쪽에서 기존 로딩 경로를 사용합니다.
+        """
+        sources = [Path(source) for source in sources]
+        if not all(source.exists() for source in sources):
+            return None
+        try:
+            key = self.key(name, sources, device, extra)
+        except OSError as e:
+            logger.warning(f"[Artifacts] {name} 키 계산 실패, 기존 로딩 사용: {e}")
+            return None
+
+        module_path, meta_path = self.paths(name, key)
+        if not module_path.exists() or not meta_path.exists():
+            logger.info(f"[Artifacts] {name} 아티팩트 없음 ({key}), 기존 로딩 사용")
+            return None
+        try:
+            meta = json.loads(meta_path.read_text())
+            if meta.get("key") != key:
+                raise ValueError(f"메타데이터 키 불일치: {meta.get('key')} != {key}")
+            module = torch.jit.load(str(module_path), map_location=device)
+            module.eval()
+        except Exception as e:
+            logger.warning(f"[Artifacts] {name} 아티팩트 로드 실패, 기존 로딩 사용: {e}")
+            return None
+        logger.info(f"[Artifacts] {name} 아티팩트 로드: {module_path.name}")
+        return module, meta.get("meta") or {}
+
+    def save(
+        self,
+        name: str,
+        sources: Iterable[Path],
+        device: torch.device,
+        module: torch.jit.ScriptModule,
+        extra: str = "",
+        meta: Optional[dict] = None,
+    ) -> Path:
+        """TorchScript 모듈과 메타데이터 저장 (임시 파일 → rename)"""
+        sources = [Path(source) for source in sources]
+        key = self.key(name, sources, device, extra)
+        module_path, meta_path = self.paths(name, key)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        tmp_module = module_path.with_suffix(f".tmp{os.getpid()}")
+        torch.jit.save(module, str(tmp_module))
+        os.replace(tmp_module, module_path)
+
+        tmp_meta = meta_path.with_suffix(f".tmp{os.getpid()}")
+        tmp_meta.write_text(json.dumps({
+            "key": key,
+            "name": name,
+            "torch": torch.__version__,
+            "device": torch.device(device).type,
+            "sources": [str(source) for source in sources],
+            "extra": extra,
+            "meta": meta or {},
+        }, indent=2, default=str))
+        os.replace(tmp_meta, meta_path)
+        return module_path
+
+
+_default_cache: Optional[ArtifactCache] = None
+
+
+def default_cache() -> Optional[ArtifactCache]:
+    """환경변수 설정에 따른 공용 캐시 (비활성화 시 None)"""
+    global _default_cache
+    if not ARTIFACT_CACHE_ENABLED or not ARTIFACT_CACHE_DIR:
+        return None
+    if _default_cache is None:
+        _default_cache = ArtifactCache(Path(ARTIFACT_CACHE_DIR))
+    return _default_cache
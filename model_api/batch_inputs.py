@@ -0,0 +1,100 @@
+"""
+/predict/batch 입력 처리 (multipart 이미지 목록 / zip 아카이브)
+
+업로드 파일이 zip이면 안의 이미지 파일들로 펼치고, 나머지는 그대로 한 항목으로 사용합니다.
+항목 순서는 업로드 순서 → zip 내부 순서이며, 응답의 index는 이 순서입니다.
+
+사용 방법:
+    items = expand_uploads([(file.filename, data) for ...], max_items=256)
+    mark_gradcam(items, default=False, selection=parse_gradcam_selection("0,lesion_3.jpg"))
+    for chunk in chunked(items, 8):
+        ...
+"""
+import io
+import zipfile
+from dataclasses import dataclass
+from pathlib import PurePosixPath
+from typing import Iterator, List, Optional, Sequence, Set, Tuple
+
+ZIP_MAGIC = b"PK\x03\x04"
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".webp", ".tif", ".tiff"}
+
+# zip 내부 파일 하나의 최대 크기 (압축 해제 후, 바이트)
+MAX_ZIP_MEMBER_BYTES = 64 * 1024 * 1024
+
+
+@dataclass
+class BatchItem:
+    """배치 요청의 이미지 한 장"""
+    index: int
+    name: str
+    data: bytes
+    generate_gradcam: bool = False
+
+
+def is_zip(name: str, data: bytes) -> bool:
+    return data[:4] == ZIP_MAGIC or (name or "").lower().endswith(".zip")
+
+
+def _zip_members(data: bytes) -> Iterator[Tuple[str, bytes]]:
+    """zip 안의 이미지 파일 (디렉토리 / 숨김 파일 / macOS 메타데이터 제외)"""
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        for info in archive.infolist():
+            path = PurePosixPath(info.filename)
+            if info.is_dir() or path.suffix.lower() not in IMAGE_EXTENSIONS:
+                continue
+            if path.name.startswith(".") or "__MACOSX" in path.parts:
+                continue
+            if info.file_size > MAX_ZIP_MEMBER_BYTES:
+                raise ValueError(f"zip 내부 파일이 너무 큽니다: {info.filename} ({info.file_size} bytes)")
+            yield info.filename, archive.read(info)
+
+
+def expand_uploads(uploads: Sequence[Tuple[str, bytes]], max_items: int) -> List[BatchItem]:
+    """
+    (파일 이름, 바이트) 업로드 목록을 이미지 항목 목록으로 변환
+
+    Raises:
+        ValueError: 손상된 zip / 항목 수 초과 / 이미지 없음
+    """
+    items: List[BatchItem] = []
+
+    def add(name: str, data: bytes):
+        if len(items) >= max_items:
+            raise ValueError(f"한 요청의 최대 이미지 수({max_items})를 넘었습니다")
+        items.append(BatchItem(index=len(items), name=name, data=data))
+
+    for name, data in uploads:
+        if is_zip(name, data):
+            try:
+                for member_name, member_data in _zip_members(data):
+                    add(member_name, member_data)
+            except zipfile.BadZipFile as e:
+                raise ValueError(f"zip 파일을 읽을 수 없습니다: {name} ({e})")
+        else:
+            add(name or f"image_{len(items)}", data)
+
+    if not items:
+        raise ValueError("처리할 이미지가 없습니다")
+    return items
+
+
+def parse_gradcam_selection(value: Optional[str]) -> Optional[Set[str]]:
+    """GradCAM을 생성할 항목 (쉼표로 구분한 index 또는 파일 이름), 없으면 None"""
+    if not value:
+        return None
+    return {token.strip() for token in value.split(",") if token.strip()}
+
+
+def mark_gradcam(items: Sequence[BatchItem], default: bool, selection: Optional[Set[str]]):
+    """항목별 GradCAM 생성 여부 설정 (selection이 있으면 selection 우선)"""
+    for item in items:
+        if selection is None:
+            item.generate_gradcam = default
+        else:
+            item.generate_gradcam = str(item.index) in selection or item.name in selection
+
+
+def chunked(items: Sequence[BatchItem], size: int) -> List[Sequence[BatchItem]]:
+    size = max(1, size)
+    return [items[i:i + size] for i in range(0, len(items), size)]
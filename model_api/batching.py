@@ -0,0 +1,207 @@
+"""
+/predict 요청용 동적 마이크로 배칭 스케줄러
+
+동시에 들어온 예측 요청을 최대 N장 또는 T밀리초 동안 모아 하나의 배치 텐서로 쌓고,
+Soft Voting 앙상블을 한 번만 실행한 뒤 행(row)별 결과를 각 요청자에게 돌려줍니다.
+
+infer_fn은 (B, 3, H, W) 배치 텐서를 받아 길이 B의 행별 결과 시퀀스를 반환해야 하고,
+submit()은 해당 요청의 행을 그대로 돌려줍니다. /predict에서는 행마다 (확률, 추론 경로) 튜플입니다.
+
+사용 방법:
+    def predict_rows(batch_tensor):
+        probs, paths = prediction_pipeline.predict_probs_with_paths(batch_tensor)
+        return list(zip(probs, paths))             # [(확률 (num_classes,), 추론 경로), ...]
+
+    batcher = MicroBatcher(predict_rows, max_batch_size=8, max_wait_ms=10)
+    await batcher.start()
+    probs, path = await batcher.submit(image_tensor)  # image_tensor: (1, 3, 512, 512)
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Sequence
+
+import torch
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _PendingItem:
+    """큐에 대기 중인 단일 요청"""
+    tensor: torch.Tensor
+    future: asyncio.Future
+    # 요청자의 단계 이벤트 리스너 (배치 워커 태스크는 요청 컨텍스트 밖에서 실행되므로 함께 전달)
+    listener: Optional[Callable[[str, str, float], None]] = None
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+class MicroBatcher:
+    """요청을 모아 배치 추론하는 비동기 큐"""
+
+    def __init__(
+        self,
+        infer_fn: Callable[[torch.Tensor], Sequence],
+        max_batch_size: int = 8,
+        max_wait_ms: float = 10.0,
+        name: str = "predict",
+    ):
+        """
+        Args:
+            infer_fn: (B, 3, H, W) 텐서를 받아 길이 B의 행별 결과(예: [(확률, 추론 경로), ...])를 반환하는 동기 함수
+            max_batch_size: 한 번에 실행할 최대 이미지 수 (N)
+            max_wait_ms: 첫 요청 이후 배치를 채우기 위해 기다리는 최대 시간 (T)
+            name: 로그 및 통계 표시용 이름
+        """
+        if max_batch_size < 1:
+            raise ValueError(f"max_batch_size는 1 이상이어야 합니다: {max_batch_size}")
+        self.infer_fn = infer_fn
+        self.max_batch_size = int(max_batch_size)
+        self.max_wait_ms = float(max_wait_ms)
+        self.name = name
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._running_batch_size = 0
+
+        # 통계
+        self._batches_run = 0
+        self._items_run = 0
+        self._max_observed_batch = 0
+        self._total_queue_wait = 0.0
+
+    async def start(self):
+        """배치 워커 태스크 시작 (이벤트 루프 안에서 호출)"""
+        if self._worker is not None:
+            return
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+        logger.info(
+            f"[Batch:{self.name}] 마이크로 배칭 시작 "
+            f"(max_batch_size={self.max_batch_size}, max_wait_ms={self.max_wait_ms})"
+        )
+
+    async def stop(self):
+        """배치 워커 종료, 대기 중인 요청은 실패 처리"""
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if not item.future.done():
+                item.future.set_exception(RuntimeError("배치 큐가 종료되었습니다"))
+        logger.info(f"[Batch:{self.name}] 마이크로 배칭 종료")
+
+    async def submit(self, tensor: torch.Tensor):
+        """
+        단일 이미지 텐서를 큐에 넣고 해당 행의 결과를 기다림
+
+        Args:
+            tensor: 전처리된 텐서 (1, 3, H, W)
+
+        Returns:
+            infer_fn 결과의 해당 행 (예: (확률 numpy array (num_classes,), 추론 경로))
+        """
+        if self._worker is None:
+            raise RuntimeError("배치 큐가 시작되지 않았습니다. start()를 먼저 호출하세요.")
+        if tensor.dim() == 3:
+            tensor = tensor.unsqueeze(0)
+        if tensor.shape[0] != 1:
+            raise ValueError(f"submit()은 단일 이미지만 받습니다: {tuple(tensor.shape)}")
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(_PendingItem(tensor=tensor, future=future, listener=metrics.stage_listener.get()))
+        return await future
+
+    def stats(self) -> dict:
+        """큐 점유 상태 및 누적 통계"""
+        queued = self._queue.qsize() if self._queue is not None else 0
+        return {
+            "name": self.name,
+            "running": self._worker is not None,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "queued": queued,
+            "in_flight": self._running_batch_size,
+            "occupancy": queued + self._running_batch_size,
+            "batches_run": self._batches_run,
+            "items_run": self._items_run,
+            "avg_batch_size": (self._items_run / self._batches_run) if self._batches_run else 0.0,
+            "max_observed_batch": self._max_observed_batch,
+            "avg_queue_wait_ms": (self._total_queue_wait / self._items_run * 1000.0) if self._items_run else 0.0,
+        }
+
+    async def _collect_batch(self) -> List[_PendingItem]:
+        """첫 요청을 기다린 뒤 N장 또는 T밀리초까지 요청을 모음"""
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait_ms / 1000.0
+
+        while len(batch) < self.max_batch_size:
+            # 이미 쌓여 있는 요청은 기다리지 않고 바로 가져옴
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        # 연결이 끊겨 취소된 요청은 제외
+        return [item for item in batch if not item.future.done()]
+
+    async def _run(self):
+        """배치 워커 루프"""
+        while True:
+            batch = await self._collect_batch()
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            self._running_batch_size = len(batch)
+            # 배치 추론의 단계 이벤트(cnn / vit 등)를 배치에 묶인 모든 요청의 리스너로 전달
+            listeners = [item.listener for item in batch if item.listener is not None]
+            token = metrics.stage_listener.set(metrics.StageFanout(listeners) if listeners else None)
+            try:
+                batch_tensor = torch.cat([item.tensor for item in batch], dim=0)
+                probs = await asyncio.to_thread(self.infer_fn, batch_tensor)
+                if len(probs) != len(batch):
+                    raise RuntimeError(f"배치 출력 크기 불일치: 입력 {len(batch)}개, 출력 {len(probs)}개")
+            except asyncio.CancelledError:
+                for item in batch:
+                    if not item.future.done():
+                        item.future.set_exception(RuntimeError("배치 큐가 종료되었습니다"))
+                raise
+            except Exception as e:
+                logger.error(f"[Batch:{self.name}] 배치 추론 실패 (배치 크기: {len(batch)}): {e}", exc_info=True)
+                for item in batch:
+                    if not item.future.done():
+                        item.future.set_exception(e)
+                continue
+            finally:
+                self._running_batch_size = 0
+                metrics.stage_listener.reset(token)
+
+            for row, item in zip(probs, batch):
+                if not item.future.done():
+                    item.future.set_result(row)
+
+            self._batches_run += 1
+            self._items_run += len(batch)
+            self._max_observed_batch = max(self._max_observed_batch, len(batch))
+            self._total_queue_wait += sum(started - item.enqueued_at for item in batch)
+            logger.info(
+                f"[Batch:{self.name}] 배치 추론 완료 (배치 크기: {len(batch)}, "
+                f"소요 시간: {time.perf_counter() - started:.3f}초)"
+            )
@@ -0,0 +1,157 @@
+"""
+TorchScript 추론 아티팩트 빌드
+
+모델을 기존 경로(eager)로 로드한 뒤 trace + freeze해 아티팩트 캐시(ARTIFACT_CACHE_DIR)에 저장합니다.
+저장 전에 eager 출력과 비교해 차이가 허용 범위를 넘으면 저장하지 않습니다.
+모델 API는 다음 시작부터 이 아티팩트를 로드합니다 (artifact_cache.py 참고).
+
+아티팩트는 빌드한 머신의 torch 버전 / 디바이스 종류로 키가 만들어지므로
+모델 API와 같은 환경(같은 Docker 이미지)에서 실행하세요.
+
+사용 방법:
+    cd model_api
+    python build_artifacts.py                 # unet, bsrgan, lama, vit 전부
+    python build_artifacts.py --only vit lama
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import torch
+import torch.nn as nn
+
+import artifact_cache
+from artifact_cache import ARTIFACT_CACHE_DIR, ArtifactCache
+
+MODELS_DIR = Path(__file__).parent / "models"
+TARGETS = ("unet", "bsrgan", "lama", "vit")
+
+# eager 대비 허용 최대 절대 오차 (freeze의 conv-bn 병합 등으로 생기는 부동소수점 차이)
+MAX_ABS_DIFF = 1e-3
+
+
+class LamaJITWrapper(nn.Module):
+    """models/lama/bin/to_jit.py의 JITWrapper와 같은 (image, mask) → inpainted 래퍼"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, image, mask):
+        return self.model({"image": image, "mask": mask})["inpainted"]
+
+
+def _first_tensor(output):
+    if isinstance(output, (list, tuple)):
+        return output[0]
+    return output
+
+
+def trace_and_check(module: nn.Module, example_inputs: tuple, check_inputs: list):
+    """trace → freeze 후 example/check 입력에서 eager 출력과 비교"""
+    module.eval()
+    with torch.no_grad():
+        traced = torch.jit.trace(module, example_inputs, check_trace=False, strict=False)
+        try:
+            traced = torch.jit.freeze(traced)
+        except Exception as e:
+            print(f"  freeze 실패, trace 결과만 저장: {e}")
+
+        max_diff = 0.0
+        for inputs in [example_inputs] + list(check_inputs):
+            expected = _first_tensor(module(*inputs))
+            actual = _first_tensor(traced(*inputs))
+            if expected.shape != actual.shape:
+                raise RuntimeError(f"출력 크기 불일치: {tuple(actual.shape)} != {tuple(expected.shape)}")
+            max_diff = max(max_diff, (expected.float() - actual.float()).abs().max().item())
+    if max_diff > MAX_ABS_DIFF:
+        raise RuntimeError(f"eager 대비 최대 오차 {max_diff:.2e} > {MAX_ABS_DIFF:.0e}")
+    print(f"  eager 대비 최대 오차: {max_diff:.2e}")
+    return traced
+
+
+def _lama_inputs(height: int, width: int, device: torch.device):
+    image = torch.rand(1, 3, height, width, device=device)
+    # 파이프라인과 같이 이진화된 정수 마스크
+    mask = (torch.rand(1, 1, height, width, device=device) > 0.7) * 1
+    return image, mask
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TorchScript 추론 아티팩트 빌드")
+    parser.add_argument("--only", nargs="*", choices=TARGETS, default=list(TARGETS))
+    parser.add_argument("--models-dir", type=Path, default=MODELS_DIR)
+    parser.add_argument("--cache-dir", type=Path, default=Path(ARTIFACT_CACHE_DIR))
+    args = parser.parse_args()
+
+    # 빌드할 때는 항상 기존(eager) 경로로 로드
+    artifact_cache.ARTIFACT_CACHE_ENABLED = False
+    cache = ArtifactCache(args.cache_dir)
+    built, failed = [], []
+
+    def save(name, sources, device, module_factory):
+        print(f"[{name}] 빌드 중...")
+        try:
+            traced = module_factory()
+            path = cache.save(name, sources, device, traced)
+            print(f"[{name}] ✅ 저장: {path}")
+            built.append(name)
+        except Exception as e:
+            print(f"[{name}] ❌ 빌드 실패: {e}")
+            failed.append(name)
+
+    if {"unet", "bsrgan", "lama"} & set(args.only):
+        from hair_removal import HairRemovalPipeline
+        hair = HairRemovalPipeline(models_dir=args.models_dir)
+
+        if "unet" in args.only:
+            x = torch.rand(1, 3, hair.IMG_SIZE, hair.IMG_SIZE, device=hair.device)
+            save("unet", [hair.hair_mask_model_path], hair.device,
+                 lambda: trace_and_check(hair.unet_model, (x,), []))
+
+        if "bsrgan" in args.only:
+            if hair.bsrgan_model is None:
+                print("[bsrgan] BSRGAN 모델이 없어 건너뜀")
+            else:
+                device = hair.bsr_device
+                save("bsrgan", [hair.bsrgan_model_path], device, lambda: trace_and_check(
+                    hair.bsrgan_model,
+                    (torch.rand(1, 3, 96, 128, device=device),),
+                    [(torch.rand(1, 3, 150, 110, device=device),)],
+                ))
+
+        if "lama" in args.only:
+            if hair.lama_model is None:
+                print("[lama] LaMa 직접 로드에 실패해 건너뜀 (subprocess 모드)")
+            else:
+                device = hair.lama_device
+                save("lama", [hair.lama_checkpoint_path, hair.lama_weights_dir / "config.yaml"], device,
+                     lambda: trace_and_check(
+                         LamaJITWrapper(hair.lama_model),
+                         _lama_inputs(256, 256, device),
+                         [_lama_inputs(320, 480, device)],
+                     ))
+
+    if "vit" in args.only:
+        from prediction import PredictionPipeline
+        predictor = PredictionPipeline(models_dir=args.models_dir)
+        # PredictionPipeline.load_model()과 같은 디바이스 선택
+        if torch.cuda.is_available():
+            device = torch.device("cuda")
+        elif torch.backends.mps.is_available():
+            device = torch.device("mps")
+        else:
+            device = torch.device("cpu")
+        vit = predictor._load_vit_model(predictor.vit_model_path, device)
+        save("vit", [predictor.vit_model_path], device, lambda: trace_and_check(
+            vit,
+            (torch.rand(1, 3, 512, 512, device=device),),
+            [(torch.rand(2, 3, 512, 512, device=device),)],
+        ))
+
+    print(f"\n빌드 완료: {built or '-'} / 실패: {failed or '-'}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+모델 API ↔ Django 바이너리 응답 컨테이너 (length-prefixed bundle)
+
+GradCAM / 털 제거 이미지를 JSON 안의 base64 문자열로 보내면 크기가 1/3 늘고 양쪽 모두 큰 JSON을
+파싱해야 합니다. 클라이언트가 Accept 헤더에 BUNDLE_MEDIA_TYPE을 보내면 JSON 메타데이터와
+원본 PNG 바이트를 아래 형식으로 이어 붙여 응답합니다.
+
+형식:
+    MAGIC (4 bytes, b"EDB1")
+    파트 반복:
+        헤더 (big-endian): name_len (uint16), content_type_len (uint16), body_len (uint64)
+        name (utf-8), content_type (ascii), body
+    종료 파트: name_len = 0, content_type_len = 0, body_len = 0
+
+첫 파트는 항상 name="metadata", content_type="application/json" 입니다.
+Django 쪽 파서: backend/diagnosis/bundle.py (형식을 바꾸면 함께 수정해야 함)
+"""
+import json
+import struct
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+BUNDLE_MEDIA_TYPE = "application/x-earlydot-bundle"
+MAGIC = b"EDB1"
+PART_HEADER = struct.Struct(">HHQ")
+METADATA_PART = "metadata"
+
+
+def wants_bundle(accept_header: Optional[str]) -> bool:
+    """Accept 헤더가 바이너리 번들을 요청하는지 확인"""
+    return bool(accept_header) and BUNDLE_MEDIA_TYPE in accept_header
+
+
+def _part_header(name: str, content_type: str, body_len: int) -> bytes:
+    name_bytes = name.encode("utf-8")
+    content_type_bytes = content_type.encode("ascii")
+    return PART_HEADER.pack(len(name_bytes), len(content_type_bytes), body_len) + name_bytes + content_type_bytes
+
+
+def iter_bundle(metadata: Dict, blobs: Iterable[Tuple[str, str, bytes]]) -> Iterator[bytes]:
+    """
+    번들을 조각 단위로 생성 (blob 바이트는 복사하지 않고 그대로 전달)
+
+    Args:
+        metadata: JSON 직렬화 가능한 메타데이터
+        blobs: (name, content_type, body) 목록 - body가 None/빈 값이면 생략
+    """
+    yield MAGIC
+    metadata_bytes = json.dumps(metadata, ensure_ascii=False).encode("utf-8")
+    yield _part_header(METADATA_PART, "application/json", len(metadata_bytes))
+    yield metadata_bytes
+    for name, content_type, body in blobs:
+        if not body:
+            continue
+        yield _part_header(name, content_type, len(body))
+        yield body
+    yield PART_HEADER.pack(0, 0, 0)
@@ -0,0 +1,81 @@
+"""
+모델 체크포인트를 safetensors로 변환
+
+원본 체크포인트 옆에 같은 이름의 .safetensors 파일을 만들면 모델 API가 시작할 때 그 파일을 우선 로드합니다
+(pickle 해석 없이 텐서만 읽으므로 더 빠르고 안전합니다). 원본 체크포인트를 교체하면 변환본은 자동으로
+무시되므로 다시 변환하세요.
+
+사용 방법:
+    cd model_api
+    python convert_to_safetensors.py              # 기본 모델 4개 변환
+    python convert_to_safetensors.py path/to/model.pt ...
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import torch
+
+from weights_io import (
+    SAFETENSORS_META_KEY,
+    SAFETENSORS_SOURCE_KEY,
+    extract_state_dict,
+    safetensors_path,
+    source_signature,
+)
+
+MODELS_DIR = Path(__file__).parent / "models"
+
+DEFAULT_CHECKPOINTS = [
+    MODELS_DIR / "ensemble_finetune_best_60epochst.pt",
+    MODELS_DIR / "vit_b16_512px_best_train_loss_86epochs.pt",
+    MODELS_DIR / "hair_mask" / "best_hair_mask_model.pt",
+    MODELS_DIR / "bsrgan" / "BSRGANx2.pth",
+]
+
+
+def convert(checkpoint_path: Path) -> Path:
+    """체크포인트 1개를 변환하고 생성된 .safetensors 경로를 반환"""
+    from safetensors.torch import save_file
+
+    checkpoint = torch.load(str(checkpoint_path), map_location="cpu", weights_only=False)
+    state_dict, meta = extract_state_dict(checkpoint)
+
+    tensors = {}
+    for key, value in state_dict.items():
+        if not isinstance(value, torch.Tensor):
+            print(f"  텐서가 아닌 항목 건너뜀: {key} ({type(value).__name__})")
+            continue
+        # safetensors는 저장소를 공유하는 텐서를 허용하지 않으므로 각각 연속 메모리로 복사
+        tensors[key] = value.detach().contiguous().clone()
+
+    output_path = safetensors_path(checkpoint_path)
+    save_file(tensors, str(output_path), metadata={
+        SAFETENSORS_META_KEY: json.dumps(meta, default=str),
+        SAFETENSORS_SOURCE_KEY: source_signature(checkpoint_path),
+    })
+    return output_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="모델 체크포인트를 safetensors로 변환")
+    parser.add_argument("checkpoints", nargs="*", type=Path, help="변환할 체크포인트 (기본값: 모델 API 기본 모델)")
+    args = parser.parse_args()
+
+    failed = False
+    for checkpoint_path in args.checkpoints or DEFAULT_CHECKPOINTS:
+        if not checkpoint_path.exists():
+            print(f"⚠️  체크포인트 없음: {checkpoint_path}")
+            continue
+        try:
+            output_path = convert(checkpoint_path)
+            print(f"✅ {checkpoint_path} → {output_path}")
+        except Exception as e:
+            failed = True
+            print(f"❌ 변환 실패: {checkpoint_path} ({e})")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+털 제거 → 환부 분류 → GradCAM을 한 번에 처리하는 진단 파이프라인
+
+/remove-hair 와 /predict 를 따로 호출하면 털 제거 결과가 PNG로 인코딩되어 Django로 갔다가
+디스크에 저장된 뒤 다시 전송되어 디코딩됩니다. 여기서는 HairRemovalPipeline.process_from_array
+결과(BGR ndarray)를 그대로 PredictionPipeline에 넘기고, 처리된 이미지는 응답용으로 한 번만 인코딩합니다.
+"""
+import logging
+from dataclasses import dataclass
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from hair_removal import HairRemovalPipeline
+from metrics import stage
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class HairRemovalOutput:
+    """메모리 털 제거 단계 결과"""
+    rgb: Optional[np.ndarray]  # 분류에 사용할 RGB 이미지 (털 제거 실패 시 원본, 워커 풀 모드에서는 None)
+    processed_png: Optional[bytes]  # 응답용 PNG (털 제거 실패 시 None)
+    hair_removed: bool
+
+
+def encode_png(bgr: np.ndarray) -> bytes:
+    """BGR 이미지를 PNG 바이트로 인코딩"""
+    with stage("png_encode"):
+        success, encoded_img = cv2.imencode('.png', bgr)
+    if not success:
+        raise RuntimeError("이미지 인코딩 실패")
+    return encoded_img.tobytes()
+
+
+def hair_output_from_png(processed_png: bytes) -> HairRemovalOutput:
+    """캐시된 털 제거 PNG로 HairRemovalOutput 복원"""
+    bgr = cv2.imdecode(np.frombuffer(processed_png, np.uint8), cv2.IMREAD_COLOR)
+    if bgr is None:
+        raise ValueError("캐시된 털 제거 이미지를 디코딩할 수 없습니다")
+    return HairRemovalOutput(
+        rgb=cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB),
+        processed_png=processed_png,
+        hair_removed=True,
+    )
+
+
+def remove_hair_in_memory(hair_pipeline: HairRemovalPipeline, image_bytes: bytes) -> HairRemovalOutput:
+    """
+    털 제거를 메모리에서 수행하고 분류 입력용 RGB 배열을 반환
+
+    털 제거가 실패하면 기존 Django 흐름과 동일하게 원본 이미지로 분류를 계속합니다.
+    """
+    bgr = hair_pipeline.decode_image(image_bytes)
+
+    try:
+        logger.info("[Diagnose] 털 제거 시작 (메모리 처리)")
+        processed_bgr = hair_pipeline.process_from_array(bgr)
+        processed_png = encode_png(processed_bgr)
+        logger.info(f"[Diagnose] 털 제거 완료 (PNG: {len(processed_png)} bytes)")
+        return HairRemovalOutput(
+            rgb=cv2.cvtColor(processed_bgr, cv2.COLOR_BGR2RGB),
+            processed_png=processed_png,
+            hair_removed=True,
+        )
+    except Exception as e:
+        logger.error(f"[Diagnose] 털 제거 실패, 원본 이미지로 분류 진행: {e}", exc_info=True)
+        return HairRemovalOutput(
+            rgb=cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB),
+            processed_png=None,
+            hair_removed=False,
+        )
+
@@ -10,6 +10,13 @@
         model_path="ensemble_finetune_best_60epochst.pt"
     )
     
+    # 이미 로드된 CNN 앙상블 모델을 재사용하는 경우 (hook은 한 번만 등록)
+    gradcampp = GradCAMPlusPlus(model, model.model_A.layer4)
+    overlay_image = generate_gradcam_overlay_with_model(image, model, gradcampp=gradcampp)
+    
+    # 예측 클래스 + 여러 클래스 히트맵을 forward 1회로 (예: mel / nv 비교)
+    overlays, pred_class = generate_gradcam_overlays_with_model(image, model, [4, 5], gradcampp=gradcampp)
+    
     # overlay_image는 numpy array (H, W, 3) uint8 형식
     # PIL Image로 변환하려면:
     # from PIL import Image
@@ -17,20 +24,35 @@
 """
 
 import os
+import threading
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
 import numpy as np
+import cv2
 from PIL import Image
-from torchvision import transforms
 from torchvision.models import resnet50, ResNet50_Weights
 from torchvision.models import efficientnet_b4, EfficientNet_B4_Weights
-from scipy.ndimage import zoom
-import matplotlib.cm as cm
 
-# 정규화 상수 (ImageNet 표준)
-MEAN = [0.485, 0.456, 0.406]
-STD = [0.229, 0.224, 0.225]
+from weights_io import MODEL_LOAD_LEGACY, build_and_load, load_checkpoint
+from preprocessing import MEAN, STD, PreparedImage, prepare_image
+
+# jet 컬러맵 조회 테이블 (256, 3) uint8 - matplotlib.cm.jet(N=256)과 같은 구간 선형 보간 정의
+# (matplotlib import 없이 히트맵 값 → 색상을 인덱스 조회 한 번으로 변환)
+_JET_SEGMENTS = (
+    ((0.0, 0.0), (0.35, 0.0), (0.66, 1.0), (0.89, 1.0), (1.0, 0.5)),              # red
+    ((0.0, 0.0), (0.125, 0.0), (0.375, 1.0), (0.64, 1.0), (0.91, 0.0), (1.0, 0.0)),  # green
+    ((0.0, 0.5), (0.11, 1.0), (0.34, 1.0), (0.65, 0.0), (1.0, 0.0)),              # blue
+)
+
+
+def _build_jet_lut():
+    x = np.linspace(0.0, 1.0, 256)
+    channels = [np.interp(x, [p for p, _ in segment], [v for _, v in segment]) for segment in _JET_SEGMENTS]
+    return np.round(np.stack(channels, axis=1) * 255).astype(np.uint8)
+
+
+JET_LUT = _build_jet_lut()
 
 # 클래스 이름
 CLASS_NAMES = ['ak', 'bcc', 'bkl', 'df', 'mel', 'nv', 'scc', 'vasc']
@@ -42,15 +64,15 @@ DEVICE = torch.device('cuda' if torch.cuda.is_available() else 'mps' if torch.ba
 
 class EnsembleModel(nn.Module):
     """학습 코드와 일치하는 앙상블 모델 구조"""
-    def __init__(self, num_classes):
+    def __init__(self, num_classes, pretrained=False):
         super().__init__()
         
-        # ResNet50 (백본 A)
-        self.model_A = resnet50(weights=ResNet50_Weights.IMAGENET1K_V1)
+        # ResNet50 (백본 A) - 체크포인트가 덮어쓰므로 기본은 사전학습 가중치 없이 생성
+        self.model_A = resnet50(weights=ResNet50_Weights.IMAGENET1K_V1 if pretrained else None)
         self.model_A.fc = nn.Identity()
         
         # EfficientNetB4 (백본 B)
-        self.model_B = efficientnet_b4(weights=EfficientNet_B4_Weights.IMAGENET1K_V1)
+        self.model_B = efficientnet_b4(weights=EfficientNet_B4_Weights.IMAGENET1K_V1 if pretrained else None)
         num_ftrs_b = self.model_B.classifier[1].in_features
         self.model_B.classifier = nn.Identity()
         
@@ -88,52 +110,23 @@ class EnsembleModel(nn.Module):
         return output
 
 
-class GradCAMPlusPlus:
-    """GradCAM++ 구현"""
-    def __init__(self, model, target_layer):
-        self.model = model
-        self.target_layer = target_layer
-        self.gradients = None
-        self.activations = None
-        
-        # 훅 등록
-        self.target_layer.register_forward_hook(self.save_activation)
-        self.target_layer.register_full_backward_hook(self.save_gradient)
+def compute_gradcampp_heatmap(activations, gradients):
+    """
+    GradCAM++ 히트맵 계산 (단일 샘플)
     
-    def save_activation(self, module, input, output):
-        self.activations = output
+    Args:
+        activations: 타깃 레이어 출력 [1, C, H, W]
+        gradients: 타깃 클래스 점수의 activations에 대한 기울기 [1, C, H, W]
     
-    def save_gradient(self, module, grad_input, grad_output):
-        if grad_output[0] is not None:
-            self.gradients = grad_output[0]
-        else:
-            self.gradients = None
+    Returns:
+        정규화된 히트맵 numpy array (H, W) [0, 1]
+    """
+    if activations is None or gradients is None:
+        return np.zeros((16, 16))
+    if len(gradients.shape) != 4 or len(activations.shape) != 4:
+        return np.zeros((16, 16))
     
-    def __call__(self, input_tensor, target_category=None):
-        self.model.zero_grad()
-        self.gradients = None
-        self.activations = None
-        
-        input_tensor.requires_grad_(True)
-        output = self.model(input_tensor)
-        
-        if target_category is None:
-            target_category = torch.argmax(output, dim=1).item()
-        
-        one_hot = torch.zeros_like(output)
-        one_hot[0, target_category] = 1
-        
-        output.backward(gradient=one_hot, retain_graph=False)
-        
-        if self.activations is None or self.gradients is None:
-            return np.zeros((16, 16)), target_category, output.detach()
-        
-        activations = self.activations
-        gradients = self.gradients
-        
-        if len(gradients.shape) != 4 or len(activations.shape) != 4:
-            return np.zeros((16, 16)), target_category, output.detach()
-        
+    with torch.no_grad():
         # GradCAM++ 계산
         alpha_num = F.relu(gradients)
         alpha_den = torch.sum(activations, dim=[2, 3], keepdim=True) + 1e-10
@@ -146,81 +139,286 @@ class GradCAMPlusPlus:
         # 정규화 (gradcam_visualization.py와 동일)
         max_val = torch.max(heatmap)
         min_val = torch.min(heatmap)
-        mean_val = torch.mean(heatmap)
-        std_val = torch.std(heatmap)
         
         if max_val > 0:
             # [0, 1]로 정규화하되 상대적 차이 보존 (gradcam_visualization.py와 동일)
             heatmap_normalized = (heatmap - min_val) / (max_val - min_val + 1e-8)
             # 약한 활성화를 더 보이게 하기 위한 약간의 향상 적용
-            heatmap_normalized = torch.pow(heatmap_normalized, 0.8)
-            heatmap = heatmap_normalized
+            heatmap = torch.pow(heatmap_normalized, 0.8)
         else:
             heatmap = torch.zeros_like(heatmap)
         
-        heatmap_np = heatmap.cpu().detach().numpy()
-        output_detached = output.detach()
-        
-        del heatmap, heatmap_normalized, weights, alpha, alpha_num, alpha_den, activations, gradients, one_hot, output
-        self.gradients = None
+        return heatmap.float().cpu().numpy()
+
+
+def forward_with_layer4_activations(model, input_tensor, return_features=False):
+    """
+    CNN 앙상블 forward (ResNet50 layer4 activation 캡처)
+    
+    layer4 출력까지와 EfficientNet 분기는 no_grad로 실행하고, layer4 출력부터 분류기까지만
+    그래프를 만들어 GradCAM++ backward가 head 부분만 거치도록 합니다.
+    
+    Args:
+        model: model_A(ResNet50) / model_B / classifier를 가진 CNN 앙상블 모델
+        input_tensor: 전처리된 텐서 (B, 3, H, W)
+        return_features: True면 분류기 입력 특징 (detached)도 함께 반환
+    
+    Returns:
+        (logits [B, num_classes], layer4 activations [B, 2048, h, w] - requires_grad 리프 텐서)
+        return_features=True: (logits, activations, 분류기 입력 특징 [B, 3840])
+    """
+    model_A = model.model_A
+    with torch.no_grad():
+        x = model_A.conv1(input_tensor)
+        x = model_A.bn1(x)
+        x = model_A.relu(x)
+        x = model_A.maxpool(x)
+        x = model_A.layer1(x)
+        x = model_A.layer2(x)
+        x = model_A.layer3(x)
+        x = model_A.layer4(x)  # [B, 2048, H, W] - 공간 특징
+        features_B = model.model_B(input_tensor)  # [B, 1792]
+    
+    activations = x.detach().requires_grad_(True)
+    with torch.enable_grad():
+        features_A = model_A.avgpool(activations)
+        features_A = torch.flatten(features_A, 1)
+        features_A = model_A.fc(features_A)  # nn.Identity
+        combined_features = torch.cat((features_A, features_B), dim=1)
+        logits = model.classifier(combined_features)
+    if return_features:
+        return logits, activations, combined_features.detach()
+    return logits, activations
+
+
+def gradcampp_from_activations(logits, activations, target_category):
+    """
+    forward_with_layer4_activations 결과로 GradCAM++ 히트맵 계산 (head만 backward)
+    
+    Returns:
+        정규화된 히트맵 numpy array (H, W) [0, 1]
+    """
+    gradients = torch.autograd.grad(logits[0, target_category], activations, retain_graph=False)[0]
+    return compute_gradcampp_heatmap(activations.detach(), gradients)
+
+
+def gradcampp_multi_from_activations(logits, activations, target_classes):
+    """
+    forward_with_layer4_activations 결과 하나로 여러 클래스의 GradCAM++ 히트맵 계산
+    
+    클래스별 one-hot grad_outputs를 쌓아 is_grads_batched=True로 vector-Jacobian product를
+    한 번에 계산하므로 head(layer4 → 분류기)만 클래스 수만큼 (vmap으로 묶어) backward합니다.
+    
+    Args:
+        logits: [1, num_classes]
+        activations: layer4 activations [1, C, H, W] (requires_grad)
+        target_classes: 히트맵을 만들 클래스 인덱스 목록 (중복 제거, 순서 유지)
+    
+    Returns:
+        {클래스 인덱스: 정규화된 히트맵 numpy array (H, W) [0, 1]}
+    """
+    target_classes = list(dict.fromkeys(int(c) for c in target_classes))
+    if not target_classes:
+        return {}
+    grad_outputs = torch.zeros((len(target_classes),) + tuple(logits.shape), dtype=logits.dtype, device=logits.device)
+    for i, target_category in enumerate(target_classes):
+        grad_outputs[i, 0, target_category] = 1
+    try:
+        gradients = torch.autograd.grad(
+            logits, activations, grad_outputs=grad_outputs, retain_graph=True, is_grads_batched=True
+        )[0]  # [k, 1, C, H, W]
+    except RuntimeError:
+        # head에 vmap을 지원하지 않는 연산이 있으면 클래스별로 backward (그래프 유지)
+        gradients = torch.stack([
+            torch.autograd.grad(logits[0, c], activations, retain_graph=True)[0] for c in target_classes
+        ])
+    activations = activations.detach()
+    return {
+        target_category: compute_gradcampp_heatmap(activations, gradients[i])
+        for i, target_category in enumerate(target_classes)
+    }
+
+
+def denormalize_image(image_tensor):
+    """
+    정규화된 텐서 (1, 3, H, W)를 시각화용 이미지 (H, W, 3) [0, 1]로 역정규화
+    """
+    image_denorm = image_tensor[0].detach().float().cpu().numpy().transpose((1, 2, 0))
+    image_denorm = np.array(STD) * image_denorm + np.array(MEAN)
+    return np.clip(image_denorm, 0, 1)
+
+
+class GradCAMPlusPlus:
+    """
+    GradCAM++ 구현
+    
+    타깃 레이어에 forward hook을 한 번만 등록해 두고 요청마다 재사용합니다.
+    hook은 __call__을 실행 중인 스레드의 forward에서만 activation을 저장하므로
+    같은 모델로 다른 스레드에서 일반 추론이 동시에 돌아도 섞이지 않습니다.
+    더 이상 필요 없으면 remove_hooks()로 해제합니다 (with 문 사용 가능).
+    """
+    def __init__(self, model, target_layer):
+        self.model = model
+        self.target_layer = target_layer
         self.activations = None
+        self._active_thread = None
+        self._lock = threading.Lock()
+        self._handles = []
+        self.register_hooks()
+    
+    def register_hooks(self):
+        """타깃 레이어에 forward hook 등록 (이미 등록되어 있으면 무시)"""
+        if not self._handles:
+            self._handles.append(self.target_layer.register_forward_hook(self.save_activation))
+    
+    def remove_hooks(self):
+        """등록된 hook 해제"""
+        for handle in self._handles:
+            handle.remove()
+        self._handles = []
+        self.activations = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.remove_hooks()
+    
+    def save_activation(self, module, input, output):
+        if self._active_thread == threading.get_ident():
+            self.activations = output
+    
+    def __call__(self, input_tensor, target_category=None, target_classes=None):
+        """
+        forward 1회 + 타깃 레이어까지의 backward 1회로 히트맵 계산
+        
+        target_classes가 주어지면 같은 forward로 target_category(없으면 예측 클래스)와
+        target_classes 각각의 히트맵을 batched backward로 함께 계산합니다.
+        
+        Returns:
+            (heatmap numpy array (H, W), target_category, 모델 출력 logits (detached))
+            target_classes 모드: ({클래스 인덱스: heatmap}, target_category, logits) - target_category가 첫 항목
+        """
+        if not self._handles:
+            raise RuntimeError("GradCAM++ hook이 해제되었습니다. register_hooks()를 먼저 호출하세요.")
         
-        return heatmap_np, target_category, output_detached
+        with self._lock:
+            self._active_thread = threading.get_ident()
+            self.activations = None
+            try:
+                with torch.enable_grad():
+                    output = self.model(input_tensor.detach().requires_grad_(True))
+                    
+                    if target_category is None:
+                        target_category = torch.argmax(output, dim=1).item()
+                    
+                    activations = self.activations
+                    if activations is None or not activations.requires_grad:
+                        if target_classes is not None:
+                            classes = dict.fromkeys([target_category, *target_classes])
+                            return {c: np.zeros((16, 16)) for c in classes}, target_category, output.detach()
+                        return np.zeros((16, 16)), target_category, output.detach()
+                    
+                    if target_classes is not None:
+                        heatmaps = gradcampp_multi_from_activations(
+                            output, activations, [target_category, *target_classes]
+                        )
+                        return heatmaps, target_category, output.detach()
+                    
+                    # 타깃 클래스 점수의 activation 기울기만 계산 (파라미터 기울기는 계산하지 않음)
+                    gradients = torch.autograd.grad(output[0, target_category], activations)[0]
+                
+                heatmap_np = compute_gradcampp_heatmap(activations.detach(), gradients)
+                return heatmap_np, target_category, output.detach()
+            finally:
+                self._active_thread = None
+                self.activations = None
 
 
 def load_model(model_path, device=DEVICE):
-    """모델 로드"""
-    model = EnsembleModel(num_classes=NUM_CLASSES).to(device)
-    
-    checkpoint = torch.load(model_path, map_location=device, weights_only=False)
-    if isinstance(checkpoint, dict) and 'model_state_dict' in checkpoint:
-        state_dict = checkpoint['model_state_dict']
-        if any(k.startswith('module.') for k in state_dict.keys()):
-            state_dict = {k.replace('module.', ''): v for k, v in state_dict.items()}
-        model.load_state_dict(state_dict, strict=False)
-    else:
-        model.load_state_dict(checkpoint, strict=False)
+    """모델 로드 (meta 디바이스 생성 + mmap/safetensors 체크포인트 할당)"""
+    state_dict, _ = load_checkpoint(model_path)
+    model = build_and_load(
+        lambda: EnsembleModel(num_classes=NUM_CLASSES, pretrained=MODEL_LOAD_LEGACY),
+        state_dict,
+        strict=False,
+        device=device,
+    )
     
     model.eval()
     return model
 
 
+# 체크포인트 경로별 모델 + GradCAM++ 캐시 (요청마다 모델을 다시 로드하지 않음)
+_MODEL_CACHE = {}
+_MODEL_CACHE_LOCK = threading.Lock()
+
+
+def get_cached_gradcam(model_path, device=DEVICE):
+    """
+    체크포인트 경로/디바이스별로 한 번만 로드한 (모델, GradCAM++) 반환
+    
+    Returns:
+        (model, GradCAMPlusPlus) - hook은 model.model_A.layer4에 등록되어 있음
+    """
+    key = (os.path.abspath(str(model_path)), str(device))
+    with _MODEL_CACHE_LOCK:
+        cached = _MODEL_CACHE.get(key)
+        if cached is None:
+            model = load_model(model_path, device)
+            cached = (model, GradCAMPlusPlus(model, model.model_A.layer4))
+            _MODEL_CACHE[key] = cached
+        return cached
+
+
+def clear_model_cache():
+    """캐시된 모델과 hook 해제"""
+    with _MODEL_CACHE_LOCK:
+        for _, gradcampp in _MODEL_CACHE.values():
+            gradcampp.remove_hooks()
+        _MODEL_CACHE.clear()
+
+
 def preprocess_image(image_input, image_size=512, device=DEVICE):
     """
-    이미지 전처리
+    이미지 전처리 (분류와 같은 preprocessing.prepare_image 사용)
     
     Args:
-        image_input: PIL Image 객체 또는 이미지 경로
+        image_input: PreparedImage (분류에서 이미 전처리한 결과), PIL Image 객체 또는 이미지 경로
         image_size: 리사이즈할 크기 (기본값: 512)
         device: 사용할 디바이스 (기본값: 전역 DEVICE)
     
     Returns:
         image_tensor: 전처리된 텐서 (1, 3, H, W)
-        image_denorm: 역정규화된 이미지 numpy array (H, W, 3) [0, 1]
+        image_display: 리사이즈된 이미지 numpy array (H, W, 3) uint8 (오버레이 배경)
     """
+    if isinstance(image_input, PreparedImage):
+        # 분류에 쓴 텐서 / 리사이즈 결과를 그대로 재사용
+        return image_input.tensor.to(device), image_input.display
+    
     # 이미지 로드
     if isinstance(image_input, str):
         image = Image.open(image_input).convert('RGB')
     elif isinstance(image_input, Image.Image):
         image = image_input.convert('RGB')
     else:
-        raise ValueError("image_input은 PIL Image 객체 또는 이미지 경로여야 합니다.")
-    
-    # 전처리 파이프라인
-    transform = transforms.Compose([
-        transforms.Resize((image_size, image_size)),
-        transforms.ToTensor(),
-        transforms.Normalize(mean=MEAN, std=STD)
-    ])
-    
-    image_tensor = transform(image).unsqueeze(0).to(device)
-    
-    # 역정규화된 이미지 (시각화용)
-    image_denorm = image_tensor[0].cpu().numpy().transpose((1, 2, 0))
-    image_denorm = np.array(STD) * image_denorm + np.array(MEAN)
-    image_denorm = np.clip(image_denorm, 0, 1)
+        raise ValueError("image_input은 PreparedImage, PIL Image 객체 또는 이미지 경로여야 합니다.")
     
-    return image_tensor, image_denorm
+    prepared = prepare_image(image, device, size=image_size)
+    return prepared.tensor, prepared.display
+
+
+def _percentile(values, q):
+    """
+    np.percentile(values, q)와 같은 값 (기본 linear 보간)을 전체 정렬 없이 np.partition으로 계산
+    """
+    flat = np.ravel(values)
+    position = (len(flat) - 1) * q / 100.0
+    lower = int(np.floor(position))
+    upper = min(lower + 1, len(flat) - 1)
+    partitioned = np.partition(flat, (lower, upper))
+    low_value, high_value = partitioned[lower], partitioned[upper]
+    return low_value + (high_value - low_value) * (position - lower)
 
 
 def apply_class_specific_threshold(cam, predicted_class):
@@ -288,7 +486,7 @@ def apply_class_specific_threshold(cam, predicted_class):
     max_val = np.max(cam_resized)
     
     if max_val > 0:
-        threshold = np.percentile(cam_resized, percentile)
+        threshold = _percentile(cam_resized, percentile)
         
         # 임계값 적용 (gradcam_visualization.py와 동일)
         cam_resized = np.maximum(cam_resized - threshold * threshold_multiplier, 0)
@@ -301,7 +499,7 @@ def apply_class_specific_threshold(cam, predicted_class):
             cam_resized = np.power(cam_resized, gamma)
             
             # 추가 후처리: 상위 30% 픽셀 유지하여 병변 전체 커버 (gradcam_visualization.py와 동일)
-            top_30_percentile = np.percentile(cam_resized, 70)
+            top_30_percentile = _percentile(cam_resized, 70)
             cam_resized = np.where(cam_resized >= top_30_percentile, cam_resized, cam_resized * 0.5)
             
             # 재정규화
@@ -317,52 +515,80 @@ def apply_class_specific_threshold(cam, predicted_class):
     return cam_resized
 
 
+def resize_heatmap(heatmap, height, width):
+    """
+    히트맵을 (height, width)로 bicubic 리사이즈 (모서리 정렬)
+    
+    기존 scipy.ndimage.zoom(order=3)처럼 입력/출력의 첫·마지막 픽셀 중심을 맞춥니다 (grid_mode=False).
+    cv2.resize는 픽셀 중심을 반 픽셀씩 맞추므로(half-pixel) 16 → 512 확대 시 약 16px 밀려서,
+    출력 좌표 → 입력 좌표 역변환 행렬을 직접 주고 cv2.warpAffine으로 보간합니다.
+    보간 커널은 cv2 cubic(Keys)이라 zoom의 3차 B-spline과 값이 약간 다릅니다 (tests/test_overlay.py에서 오차 상한 확인).
+    """
+    heatmap = np.asarray(heatmap, dtype=np.float32)
+    h, w = heatmap.shape
+    if (h, w) == (height, width):
+        return heatmap
+    inverse_map = np.array(
+        [[(w - 1) / max(width - 1, 1), 0, 0], [0, (h - 1) / max(height - 1, 1), 0]],
+        dtype=np.float64,
+    )
+    return cv2.warpAffine(
+        heatmap,
+        inverse_map,
+        (width, height),
+        flags=cv2.INTER_CUBIC | cv2.WARP_INVERSE_MAP,
+        borderMode=cv2.BORDER_REPLICATE,
+    )
+
+
 def create_overlay_image(image_denorm, heatmap, alpha=0.5):
     """
-    히트맵을 이미지에 오버레이 (gradcam_visualization.py와 동일)
+    히트맵을 이미지에 오버레이 (gradcam_visualization.py와 같은 jet 컬러맵 / 혼합 비율)
+    
+    히트맵은 resize_heatmap()으로 리사이즈하고, JET_LUT 조회 후 정수 연산으로 혼합합니다.
     
     Args:
-        image_denorm: 역정규화된 이미지 (H, W, 3) [0, 1]
+        image_denorm: 리사이즈된 uint8 이미지 (H, W, 3) 또는 역정규화된 이미지 (H, W, 3) [0, 1]
         heatmap: 히트맵 (H, W) [0, 1]
         alpha: 오버레이 투명도
     
     Returns:
         오버레이된 이미지 (H, W, 3) [0, 255] uint8
     """
+    if image_denorm.dtype != np.uint8:
+        image_denorm = (np.clip(image_denorm, 0, 1) * 255 + 0.5).astype(np.uint8)
     H, W, _ = image_denorm.shape
     
     # 히트맵 리사이즈
-    if heatmap.shape != (H, W):
-        zoom_factors = (H / heatmap.shape[0], W / heatmap.shape[1])
-        heatmap_resized = zoom(heatmap, zoom_factors, order=3)
-    else:
-        heatmap_resized = heatmap
+    heatmap_resized = resize_heatmap(heatmap, H, W)
     
-    # 컬러맵 적용 (jet: blue -> red) - gradcam_visualization.py와 동일
-    cam_for_colormap = np.clip(heatmap_resized, 0, 1)
-    heatmap_colored = cm.jet(cam_for_colormap)[:, :, :3]  # (H, W, 3) [0, 1]
+    # 컬러맵 적용 (jet: blue -> red) - matplotlib과 같은 인덱스 계산 (x * 256, 255에서 자름)
+    indices = np.clip(heatmap_resized * 256, 0, 255).astype(np.uint8)
+    heatmap_colored = JET_LUT[indices]  # (H, W, 3) uint8
     
-    # 오버레이
-    overlay = heatmap_colored * alpha + image_denorm * (1 - alpha)
-    overlay = np.clip(overlay, 0, 1)
-    overlay_uint8 = (overlay * 255).astype(np.uint8)
+    # 오버레이 (8비트 고정소수점 가중치)
+    weight = int(round(alpha * 256))
+    overlay = heatmap_colored.astype(np.uint16) * weight + image_denorm.astype(np.uint16) * (256 - weight)
+    overlay_uint8 = (overlay >> 8).astype(np.uint8)
     
     return overlay_uint8
 
 
-def generate_gradcam_overlay(
+def generate_gradcam_overlay_with_model(
     image_input,
-    model_path,
+    model,
+    gradcampp=None,
     target_class=None,
     image_size=512,
     device=DEVICE
 ):
     """
-    단일 이미지에 대한 GradCAM++ 오버레이 이미지 생성 (웹 서버용)
+    이미 로드된 모델로 GradCAM++ 오버레이 이미지 생성 (forward 1회 + backward 1회)
     
     Args:
-        image_input: PIL Image 객체 또는 이미지 경로
-        model_path: 학습된 모델 체크포인트 경로
+        image_input: PreparedImage, PIL Image 객체 또는 이미지 경로
+        model: model_A.layer4를 가진 CNN 앙상블 모델 (eval 모드)
+        gradcampp: 재사용할 GradCAMPlusPlus (None이면 임시로 만들고 hook 해제)
         target_class: 특정 클래스에 대한 GradCAM 생성 (None이면 예측 클래스 사용)
         image_size: 이미지 리사이즈 크기 (기본값: 512)
         device: 사용할 디바이스
@@ -370,45 +596,98 @@ def generate_gradcam_overlay(
     Returns:
         numpy array (H, W, 3) uint8 - 오버레이된 이미지
     """
-    # 모델 로드
-    model = load_model(model_path, device)
-    
     # 이미지 전처리
-    image_tensor, image_denorm = preprocess_image(image_input, image_size, device)
-    
-    # 예측
-    with torch.no_grad():
-        output = model(image_tensor)
-        pred_class = torch.argmax(output, dim=1).item()
-        pred_prob = torch.softmax(output, dim=1)[0, pred_class].item()
-    
-    # 타겟 클래스 결정
-    if target_class is None:
-        target_class = pred_class
+    image_tensor, image_display = preprocess_image(image_input, image_size, device)
     
     # GradCAM++ 생성 (ResNet50 layer4 사용 - 단일 레이어)
-    target_layer = model.model_A.layer4
-    gradcampp = GradCAMPlusPlus(model, target_layer)
-    
-    # 히트맵 계산
-    heatmap, _, _ = gradcampp(image_tensor, target_category=target_class)
+    # 같은 forward 출력으로 예측 클래스를 결정하므로 별도의 예측 forward가 필요 없음
+    if gradcampp is None:
+        with GradCAMPlusPlus(model, model.model_A.layer4) as temp_gradcampp:
+            heatmap, _, output = temp_gradcampp(image_tensor, target_category=target_class)
+    else:
+        heatmap, _, output = gradcampp(image_tensor, target_category=target_class)
+    pred_class = torch.argmax(output, dim=1).item()
     
     # 클래스별 임계값 적용
     heatmap_processed = apply_class_specific_threshold(heatmap, pred_class)
     
     # 오버레이 이미지 생성
-    overlay_image = create_overlay_image(image_denorm, heatmap_processed)
-    
-    # 메모리 정리
-    del model, image_tensor, gradcampp
-    if device.type == 'cuda':
-        torch.cuda.empty_cache()
-    elif device.type == 'mps':
-        torch.mps.empty_cache()
+    overlay_image = create_overlay_image(image_display, heatmap_processed)
     
+    del image_tensor, output
     return overlay_image
 
 
+def generate_gradcam_overlays_with_model(
+    image_input,
+    model,
+    target_classes,
+    gradcampp=None,
+    image_size=512,
+    device=DEVICE
+):
+    """
+    이미 로드된 모델로 예측 클래스 + target_classes의 GradCAM++ 오버레이를 한 번에 생성
+    (forward 1회 + head만 거치는 클래스별 batched backward)
+    
+    Args:
+        image_input: PreparedImage, PIL Image 객체 또는 이미지 경로
+        model: model_A.layer4를 가진 CNN 앙상블 모델 (eval 모드)
+        target_classes: 추가로 히트맵을 만들 클래스 인덱스 목록 (예: 앙상블 top-k)
+        gradcampp: 재사용할 GradCAMPlusPlus (None이면 임시로 만들고 hook 해제)
+    
+    Returns:
+        ({클래스 인덱스: 오버레이 numpy array (H, W, 3) uint8}, 예측 클래스) - 예측 클래스가 첫 항목
+    """
+    image_tensor, image_display = preprocess_image(image_input, image_size, device)
+    
+    if gradcampp is None:
+        with GradCAMPlusPlus(model, model.model_A.layer4) as temp_gradcampp:
+            heatmaps, pred_class, output = temp_gradcampp(image_tensor, target_classes=target_classes)
+    else:
+        heatmaps, pred_class, output = gradcampp(image_tensor, target_classes=target_classes)
+    
+    overlays = {
+        class_index: create_overlay_image(image_display, apply_class_specific_threshold(heatmap, class_index))
+        for class_index, heatmap in heatmaps.items()
+    }
+    del image_tensor, output
+    return overlays, pred_class
+
+
+def generate_gradcam_overlay(
+    image_input,
+    model_path,
+    target_class=None,
+    image_size=512,
+    device=DEVICE
+):
+    """
+    단일 이미지에 대한 GradCAM++ 오버레이 이미지 생성 (웹 서버용)
+    
+    모델은 체크포인트 경로별로 한 번만 로드되어 캐시됩니다.
+    
+    Args:
+        image_input: PIL Image 객체 또는 이미지 경로
+        model_path: 학습된 모델 체크포인트 경로
+        target_class: 특정 클래스에 대한 GradCAM 생성 (None이면 예측 클래스 사용)
+        image_size: 이미지 리사이즈 크기 (기본값: 512)
+        device: 사용할 디바이스
+    
+    Returns:
+        numpy array (H, W, 3) uint8 - 오버레이된 이미지
+    """
+    model, gradcampp = get_cached_gradcam(model_path, device)
+    return generate_gradcam_overlay_with_model(
+        image_input,
+        model,
+        gradcampp=gradcampp,
+        target_class=target_class,
+        image_size=image_size,
+        device=device
+    )
+
+
 # 사용 예시
 if __name__ == "__main__":
     # 예시: 이미지 경로로 GradCAM 오버레이 생성
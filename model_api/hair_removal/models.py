@@ -8,6 +8,8 @@ import torch
 import torch.nn.functional as F
 import segmentation_models_pytorch as smp
 
+from weights_io import build_and_load, load_checkpoint
+
 
 class InternalResolutionAdapter(torch.nn.Module):
     """내부 해상도 어댑터 (메모리 절약용)"""
@@ -29,16 +31,21 @@ class InternalResolutionAdapter(torch.nn.Module):
         return logits_small
 
 
-def load_unet_model(checkpoint_path: Path, device: torch.device):
-    """U-Net 모델 로드 (털 마스크 추출용)"""
-    if not checkpoint_path.exists():
-        raise FileNotFoundError(f"체크포인트가 존재하지 않습니다: {checkpoint_path}")
-    
-    state = torch.load(checkpoint_path, map_location="cpu")
-    meta = state.get("meta") or {}
-    internal_size = int(meta.get("internal_size", 384))
-    
-    # 임계값 로드
+class ScriptedLama:
+    """
+    TorchScript LaMa 아티팩트를 기존 LaMa 모델과 같은 방식(batch dict → {"inpainted": ...})으로 호출
+
+    아티팩트는 models/lama/bin/to_jit.py의 JITWrapper와 같은 (image, mask) → inpainted 시그니처입니다.
+    """
+    def __init__(self, module: torch.jit.ScriptModule):
+        self.module = module
+
+    def __call__(self, batch: dict) -> dict:
+        return {"inpainted": self.module(batch["image"], batch["mask"])}
+
+
+def resolve_unet_threshold(checkpoint_path: Path, meta: dict) -> float:
+    """털 마스크 임계값 (best_threshold.txt > 체크포인트 meta > 0.5)"""
     thr_path = checkpoint_path.with_name("best_threshold.txt")
     recommended_thr = meta.get("recommended_threshold")
     if thr_path.exists():
@@ -47,19 +54,32 @@ def load_unet_model(checkpoint_path: Path, device: torch.device):
         except ValueError:
             pass
     
-    threshold = float(recommended_thr if recommended_thr is not None else 0.5)
+    return float(recommended_thr if recommended_thr is not None else 0.5)
+
+
+def load_unet_model(checkpoint_path: Path, device: torch.device):
+    """U-Net 모델 로드 (털 마스크 추출용)"""
+    if not checkpoint_path.exists():
+        raise FileNotFoundError(f"체크포인트가 존재하지 않습니다: {checkpoint_path}")
     
-    # 모델 생성
-    base_model = smp.UnetPlusPlus(
-        encoder_name="resnet18",
-        encoder_weights=None,
-        in_channels=3,
-        classes=1,
-        decoder_attention_type=None,
-    )
-    model = InternalResolutionAdapter(base_model, internal_size=internal_size)
-    model.load_state_dict(state["state_dict"], strict=True)
-    model.to(device)
+    state_dict, meta = load_checkpoint(checkpoint_path)
+    internal_size = int(meta.get("internal_size", 384))
+    
+    # 임계값 로드
+    threshold = resolve_unet_threshold(checkpoint_path, meta)
+    
+    # 모델 생성 (meta 디바이스에서 만든 뒤 체크포인트 텐서 할당)
+    def build():
+        base_model = smp.UnetPlusPlus(
+            encoder_name="resnet18",
+            encoder_weights=None,
+            in_channels=3,
+            classes=1,
+            decoder_attention_type=None,
+        )
+        return InternalResolutionAdapter(base_model, internal_size=internal_size)
+
+    model = build_and_load(build, state_dict, strict=True, device=device)
     model.eval()
     
     return model, threshold
@@ -80,10 +100,13 @@ def load_bsrgan_model(weights_path: Path, network_path: Path, device: torch.devi
     except Exception as e:
         raise RuntimeError("network_rrdbnet.py를 가져오지 못했습니다. models 폴더 경로를 확인하세요.") from e
 
-    net = RRDBNet(in_nc=3, out_nc=3, nf=64, nb=23, gc=32, sf=2).to(device)
-    ckpt = torch.load(str(weights_path), map_location=device)
-    state = ckpt.get("params_ema") or ckpt.get("params") or ckpt.get("state_dict") or ckpt
-    net.load_state_dict(state, strict=True)
+    state, _ = load_checkpoint(weights_path)
+    net = build_and_load(
+        lambda: RRDBNet(in_nc=3, out_nc=3, nf=64, nb=23, gc=32, sf=2),
+        state,
+        strict=True,
+        device=device,
+    )
     net.eval()
     for p in net.parameters():
         p.requires_grad_(False)
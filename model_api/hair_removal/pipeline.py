@@ -15,12 +15,16 @@ import numpy as np
 import torch
 import torch.nn.functional as F
 
-from .models import load_unet_model, load_bsrgan_model
+from .models import ScriptedLama, load_unet_model, load_bsrgan_model, resolve_unet_threshold
+from artifact_cache import default_cache
+from image_io import decode_bgr
+from precision import wrap_model
 from .utils import (
     letterbox_pad,
     restore_mask_to_original,
     normalize_image_and_mask,
     enhance_hairless_image,
+    stage,
 )
 
 
@@ -65,16 +69,43 @@ class HairRemovalPipeline:
         
         self._load_models()
     
+    @property
+    def lama_checkpoint_path(self) -> Path:
+        return self.lama_weights_dir / "models" / "best.ckpt"
+    
+    def _lama_device(self) -> torch.device:
+        # LaMa는 CPU에서 실행 (안정성 우선), MPS는 일부 연산 미지원
+        lama_device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+        if self.device.type == 'mps':
+            lama_device = torch.device('cpu')
+        return lama_device
+    
+    def _bsrgan_device(self) -> torch.device:
+        # BSRGAN은 CPU로 실행 (안정성), MPS 대신 CPU
+        bsr_device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        if self.device.type == "mps":
+            bsr_device = torch.device("cpu")
+        return bsr_device
+    
     def _load_models(self):
-        """모델 로드"""
+        """모델 로드 (사전 빌드된 TorchScript 아티팩트가 있으면 우선 사용)"""
         print(f"[Pipeline] 디바이스: {self.device}")
+        artifacts = default_cache()
         
         # U-Net 모델 로드
         if self.hair_mask_model_path.exists():
-            self.unet_model, self.unet_threshold = load_unet_model(
-                self.hair_mask_model_path,
-                self.device
-            )
+            loaded = artifacts.load("unet", [self.hair_mask_model_path], self.device) if artifacts else None
+            if loaded is not None:
+                self.unet_model, artifact_meta = loaded
+                self.unet_threshold = resolve_unet_threshold(
+                    self.hair_mask_model_path, artifact_meta.get("checkpoint_meta") or {}
+                )
+            else:
+                self.unet_model, self.unet_threshold = load_unet_model(
+                    self.hair_mask_model_path,
+                    self.device
+                )
+            self.unet_model = wrap_model(self.unet_model, "unet", self.device)
             print(f"[Pipeline] U-Net 모델 로드 완료 (임계값: {self.unet_threshold:.4f})")
         else:
             raise FileNotFoundError(f"U-Net 모델을 찾을 수 없습니다: {self.hair_mask_model_path}")
@@ -82,15 +113,17 @@ class HairRemovalPipeline:
         # BSRGAN 모델 로드 (선택적)
         if self.bsrgan_model_path.exists() and self.bsrgan_network_path.exists():
             try:
-                # BSRGAN은 CPU로 실행 (안정성)
-                self.bsr_device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-                if self.device.type == "mps":
-                    self.bsr_device = torch.device("cpu")
-                self.bsrgan_model = load_bsrgan_model(
-                    self.bsrgan_model_path,
-                    self.bsrgan_network_path,
-                    self.bsr_device
-                )
+                self.bsr_device = self._bsrgan_device()
+                loaded = artifacts.load("bsrgan", [self.bsrgan_model_path], self.bsr_device) if artifacts else None
+                if loaded is not None:
+                    self.bsrgan_model = loaded[0]
+                else:
+                    self.bsrgan_model = load_bsrgan_model(
+                        self.bsrgan_model_path,
+                        self.bsrgan_network_path,
+                        self.bsr_device
+                    )
+                self.bsrgan_model = wrap_model(self.bsrgan_model, "bsrgan", self.bsr_device)
                 print(f"[Pipeline] BSRGAN 모델 로드 완료 (device: {self.bsr_device})")
             except Exception as e:
                 print(f"[Pipeline] BSRGAN 로드 실패: {e}")
@@ -101,7 +134,14 @@ class HairRemovalPipeline:
         # LaMa 모델 직접 로드 (subprocess 오버헤드 제거)
         try:
             print("[Pipeline] LaMa 모델 로딩 시작...")
-            self.lama_model = self._load_lama_model()
+            lama_sources = [self.lama_checkpoint_path, self.lama_weights_dir / "config.yaml"]
+            loaded = artifacts.load("lama", lama_sources, self._lama_device()) if artifacts else None
+            if loaded is not None:
+                self.lama_device = self._lama_device()
+                self.lama_model = ScriptedLama(loaded[0])
+            else:
+                self.lama_model = self._load_lama_model()
+            self.lama_model = wrap_model(self.lama_model, "lama", self.lama_device)
             print(f"[Pipeline] LaMa 모델 로드 완료")
         except Exception as e:
             print(f"[Pipeline] LaMa 모델 로드 실패 (subprocess fallback 사용): {e}")
@@ -135,7 +175,7 @@ class HairRemovalPipeline:
         
         # Config 로드
         train_config_path = self.lama_weights_dir / 'config.yaml'
-        checkpoint_path = self.lama_weights_dir / 'models' / 'best.ckpt'
+        checkpoint_path = self.lama_checkpoint_path
         
         if not train_config_path.exists():
             raise FileNotFoundError(f"LaMa config.yaml 없음: {train_config_path}")
@@ -149,10 +189,7 @@ class HairRemovalPipeline:
         train_config.visualizer.kind = 'noop'
         
         # 모델 로드
-        # LaMa는 CPU에서 실행 (안정성 우선)
-        lama_device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-        if self.device.type == 'mps':
-            lama_device = torch.device('cpu')  # MPS는 일부 연산 미지원
+        lama_device = self._lama_device()
         
         print(f"[Pipeline] LaMa 체크포인트 로딩 중: {checkpoint_path}")
         model = load_checkpoint(train_config, str(checkpoint_path), strict=False, map_location=lama_device)
@@ -169,6 +206,10 @@ class HairRemovalPipeline:
     
     def _predict_mask(self, bgr: np.ndarray) -> np.ndarray:
         """U-Net으로 털 마스크 예측"""
+        with stage("unet_mask"):
+            return self._predict_mask_impl(bgr)
+    
+    def _predict_mask_impl(self, bgr: np.ndarray) -> np.ndarray:
         # 이미지 전처리 (letterbox padding)
         padded, meta = letterbox_pad(bgr, self.IMG_SIZE)
         
@@ -214,16 +255,16 @@ class HairRemovalPipeline:
             return prep_img
         
         # 최적화 2: 직접 모델 호출 (subprocess 오버헤드 제거)
-        if self.lama_model is not None:
-            return self._run_lama_direct(prep_img, prep_mask)
-        else:
-            print("[LaMa] 직접 모델 없음, subprocess fallback 사용")
-            return self._run_lama_subprocess(prep_img, prep_mask)
+        with stage("lama"):
+            if self.lama_model is not None:
+                return self._run_lama_direct(prep_img, prep_mask)
+            else:
+                print("[LaMa] 직접 모델 없음, subprocess fallback 사용")
+                return self._run_lama_subprocess(prep_img, prep_mask)
     
     def _run_lama_direct(self, prep_img: np.ndarray, prep_mask: np.ndarray) -> np.ndarray:
         """LaMa 모델을 직접 호출 (최적화된 버전)"""
         import time
-        from saicinpainting.evaluation.utils import move_to_device
         
         start_time = time.time()
         print(f"[LaMa Direct] 시작 (device: {self.lama_device})")
@@ -238,8 +279,8 @@ class HairRemovalPipeline:
         
         # 추론
         with torch.no_grad():
+            # 텐서는 이미 lama_device에 있음 (TorchScript 아티팩트 사용 시 saicinpainting import 불필요)
             batch = {'image': img_tensor, 'mask': mask_tensor}
-            batch = move_to_device(batch, self.lama_device)
             batch['mask'] = (batch['mask'] > 0) * 1  # 이진화
             
             result = self.lama_model(batch)
@@ -356,30 +397,47 @@ class HairRemovalPipeline:
             
             return result
     
-    def process(self, image_bytes: bytes) -> bytes:
+    def decode_image(self, image_bytes: bytes) -> np.ndarray:
         """
-        이미지 바이트를 받아서 털 제거 처리 후 결과 바이트 반환
+        이미지 바이트를 BGR numpy array로 디코딩
         
         Args:
             image_bytes: 입력 이미지 바이트
             
         Returns:
-            처리된 이미지 바이트
+            BGR 이미지 (numpy array)
         """
-        print("[Pipeline] ========== 털 제거 파이프라인 시작 (총 4단계) ==========")
-        
-        # 바이트를 numpy array로 변환
         try:
-            nparr = np.frombuffer(image_bytes, np.uint8)
-            bgr = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            if bgr is None:
-                raise ValueError("이미지를 디코딩할 수 없습니다")
+            with stage("decode"):
+                # 큰 JPEG는 축소 디코딩: 긴 변은 마스크/정규화 크기 이상, 짧은 변은 원본이
+                # BSRGAN 기준(BSRGAN_EDGE_SMALL)보다 크면 축소 후에도 크게 유지 (업스케일 여부 불변)
+                bgr = decode_bgr(
+                    image_bytes,
+                    min_long_edge=max(self.IMG_SIZE, self.PREP_LONG_EDGE),
+                    min_short_edge=self.BSRGAN_EDGE_SMALL + 1,
+                )
             print(f"[Pipeline] 이미지 디코딩 완료 (크기: {bgr.shape})")
+            return bgr
         except Exception as e:
             print(f"[Pipeline] 이미지 디코딩 실패: {e}")
             import traceback
             traceback.print_exc()
             raise
+    
+    def process(self, image_bytes: bytes) -> bytes:
+        """
+        이미지 바이트를 받아서 털 제거 처리 후 결과 바이트 반환
+        
+        Args:
+            image_bytes: 입력 이미지 바이트
+            
+        Returns:
+            처리된 이미지 바이트
+        """
+        print("[Pipeline] ========== 털 제거 파이프라인 시작 (총 4단계) ==========")
+        
+        # 바이트를 numpy array로 변환
+        bgr = self.decode_image(image_bytes)
         
         # Stage 1: 마스크 추출
         try:
@@ -426,10 +484,11 @@ class HairRemovalPipeline:
         # Stage 4: 후처리
         try:
             print("[Pipeline] [4/4] Stage 4: 후처리 시작")
-            enhanced_bgr, enhance_meta = enhance_hairless_image(
-                hairless_bgr,
-                target_long_edge=self.POST_TARGET_LONG_EDGE,
-            )
+            with stage("postprocess"):
+                enhanced_bgr, enhance_meta = enhance_hairless_image(
+                    hairless_bgr,
+                    target_long_edge=self.POST_TARGET_LONG_EDGE,
+                )
             print("[Pipeline] [4/4] Stage 4: 후처리 완료")
         except Exception as e:
             print(f"[Pipeline] Stage 4 실패: {e}")
@@ -439,7 +498,8 @@ class HairRemovalPipeline:
         
         # 결과를 바이트로 변환
         try:
-            success, encoded_img = cv2.imencode('.png', enhanced_bgr)
+            with stage("png_encode"):
+                success, encoded_img = cv2.imencode('.png', enhanced_bgr)
             if not success:
                 raise RuntimeError("이미지 인코딩 실패")
             print(f"[Pipeline] 이미지 인코딩 완료 (크기: {len(encoded_img.tobytes())} bytes)")
@@ -480,10 +540,11 @@ class HairRemovalPipeline:
         hairless_bgr = self._run_lama_inpaint(prep_img, prep_mask)
         
         # Stage 4: 후처리
-        enhanced_bgr, enhance_meta = enhance_hairless_image(
-            hairless_bgr,
-            target_long_edge=self.POST_TARGET_LONG_EDGE,
-        )
+        with stage("postprocess"):
+            enhanced_bgr, enhance_meta = enhance_hairless_image(
+                hairless_bgr,
+                target_long_edge=self.POST_TARGET_LONG_EDGE,
+            )
         
         return enhanced_bgr
 
@@ -6,6 +6,8 @@ import numpy as np
 from typing import Tuple, Optional
 import torch
 
+from metrics import stage
+
 # NumPy 2.0 호환성
 if not hasattr(np, "sctypes"):
     np.sctypes = {
@@ -86,10 +88,11 @@ def normalize_image_and_mask(
         want_passes = decide_bsrgan_passes(*img.shape[:2], edge_tiny, edge_small, max_passes)
         for _ in range(want_passes):
             try:
-                tensor = _bgr_to_tensor01(img).to(device=bsr_device, dtype=torch.float32)
-                with torch.no_grad():
-                    out = bsr_model(tensor)
-                up = _tensor01_to_bgr(out)
+                with stage("bsrgan_pass"):
+                    tensor = _bgr_to_tensor01(img).to(device=bsr_device, dtype=torch.float32)
+                    with torch.no_grad():
+                        out = bsr_model(tensor)
+                    up = _tensor01_to_bgr(out)
             except Exception as e:
                 print(f"[BSRGAN] 업스케일 실패 → 중단: {e}")
                 break
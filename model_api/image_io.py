@@ -0,0 +1,108 @@
+"""
+입력 이미지 디코딩 (JPEG 축소 디코딩)
+
+휴대폰 사진(12~50MP JPEG)은 모델 입력(긴 변 512)보다 훨씬 크지만, 전체 해상도로 디코딩한 뒤
+바로 줄여 버립니다. JPEG는 DCT 단계에서 1/2, 1/4, 1/8 크기로 바로 디코딩할 수 있으므로
+(libjpeg scale_denom), 필요한 최소 크기를 여전히 만족하는 가장 작은 배율로 디코딩해
+디코딩 시간과 최대 메모리 사용량을 줄입니다. JPEG가 아니면(PNG 등) 기존처럼 전체 디코딩합니다.
+
+  털 제거: cv2.IMREAD_REDUCED_COLOR_{2,4,8} (BGR, EXIF 방향 적용 - 기존 cv2.IMREAD_COLOR와 동일)
+  분류:    PIL Image.draft() (RGB, EXIF 방향 미적용 - 기존 Image.open()과 동일)
+
+설정
+  IMAGE_DECODE_REDUCED=1|0 (기본값: 1, 0이면 항상 전체 해상도로 디코딩)
+
+사용 방법:
+    bgr = decode_bgr(image_bytes, min_long_edge=512, min_short_edge=301)
+    image = open_rgb(image_bytes, min_size=(512, 512))
+"""
+import io
+import mmap
+import os
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# JPEG 축소 디코딩 사용 여부
+# 환경변수로 변경 가능: IMAGE_DECODE_REDUCED (기본값: 1)
+IMAGE_DECODE_REDUCED = os.getenv('IMAGE_DECODE_REDUCED', '1') == '1'
+
+JPEG_MAGIC = b"\xff\xd8"
+
+# 큰 배율부터 시도 (libjpeg가 지원하는 DCT 축소 배율)
+JPEG_SCALES = (8, 4, 2)
+
+_CV2_REDUCED_FLAGS = {
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+def _as_file(data):
+    """bytes / mmap을 복사 없이 PIL에 넘길 파일 객체로"""
+    if isinstance(data, mmap.mmap):
+        data.seek(0)
+        return data
+    return io.BytesIO(data)
+
+
+def is_jpeg(data) -> bool:
+    return bytes(data[:2]) == JPEG_MAGIC
+
+
+def jpeg_size(data) -> Optional[Tuple[int, int]]:
+    """JPEG 헤더의 (가로, 세로) - 픽셀은 디코딩하지 않음, JPEG가 아니거나 읽을 수 없으면 None"""
+    if not is_jpeg(data):
+        return None
+    try:
+        with Image.open(_as_file(data)) as image:
+            return image.size
+    except Exception:
+        return None
+
+
+def choose_scale(width: int, height: int, min_long_edge: int, min_short_edge: int = 0) -> int:
+    """
+    축소 디코딩 결과가 긴 변 ≥ min_long_edge, 짧은 변 ≥ min_short_edge를 만족하는 가장 큰 배율
+
+    libjpeg의 축소 크기는 ceil(원본 / 배율)입니다. 만족하는 배율이 없으면 1 (전체 디코딩).
+    """
+    long_edge, short_edge = max(width, height), min(width, height)
+    for scale in JPEG_SCALES:
+        if -(-long_edge // scale) >= min_long_edge and -(-short_edge // scale) >= min_short_edge:
+            return scale
+    return 1
+
+
+def decode_bgr(data, min_long_edge: int = 0, min_short_edge: int = 0) -> np.ndarray:
+    """
+    이미지 바이트(또는 mmap)를 BGR numpy array로 디코딩 (JPEG면 필요한 만큼만 축소 디코딩)
+
+    Raises:
+        ValueError: 디코딩 실패
+    """
+    flags = cv2.IMREAD_COLOR
+    if IMAGE_DECODE_REDUCED and min_long_edge > 0:
+        size = jpeg_size(data)
+        if size is not None:
+            flags = _CV2_REDUCED_FLAGS.get(choose_scale(*size, min_long_edge, min_short_edge), flags)
+    bgr = cv2.imdecode(np.frombuffer(data, np.uint8), flags)
+    if bgr is None:
+        raise ValueError("이미지를 디코딩할 수 없습니다")
+    return bgr
+
+
+def open_rgb(data, min_size: Optional[Tuple[int, int]] = None) -> Image.Image:
+    """
+    이미지 바이트(또는 mmap)를 RGB PIL Image로 디코딩
+
+    min_size=(가로, 세로)가 주어지고 JPEG면 Image.draft()로 두 변이 각각 min_size 이상인
+    가장 작은 DCT 배율로 디코딩합니다.
+    """
+    image = Image.open(_as_file(data))
+    if IMAGE_DECODE_REDUCED and min_size and image.format == "JPEG":
+        image.draft("RGB", min_size)
+    return image.convert("RGB")
@@ -0,0 +1,193 @@
+"""
+비동기 작업(job) 저장소와 진행 이벤트 스트림
+
+CPU에서 수십 초 걸리는 털 제거/진단을 HTTP 연결 하나로 붙잡고 있지 않도록, 요청을 작업으로 등록해
+job id를 바로 돌려주고 상태/결과 조회와 Server-Sent Events 진행 스트림을 제공합니다.
+진행 이벤트는 metrics.stage()의 시작/종료를 stage_listener 컨텍스트 변수로 받아 만들며,
+컨텍스트 변수는 asyncio 태스크와 asyncio.to_thread로 전파되므로 파이프라인 코드를 바꾸지 않습니다.
+같은 입력의 진행 중 계산에 병합된 작업(SingleFlight)도 그 계산의 단계 이벤트를 받습니다.
+
+사용 방법:
+    store = JobStore(max_jobs=256, ttl_s=600)
+    job = store.create("diagnose")
+    asyncio.create_task(store.run(job, compute()))
+    async for chunk in store.sse(job): ...
+"""
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Dict, List, Optional
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# 작업 상태
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+FINISHED_STATES = (SUCCEEDED, FAILED)
+
+# SSE 연결 유지용 주석 전송 간격 (초)
+SSE_KEEPALIVE_S = 15.0
+
+
+class JobStoreFull(Exception):
+    """진행 중인 작업이 가득 차 새 작업을 받을 수 없을 때 발생"""
+
+
+@dataclass
+class Job:
+    """단일 비동기 작업"""
+    id: str
+    kind: str
+    params: Dict[str, Any] = field(default_factory=dict)
+    status: str = QUEUED
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    events: List[Dict[str, Any]] = field(default_factory=list)
+    result: Any = None
+    error: Optional[str] = None
+    _changed: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    def publish(self, event_type: str, **data):
+        """이벤트 추가 후 구독자 깨우기 (이벤트 루프 스레드에서 호출)"""
+        self.events.append({"type": event_type, "time": time.time(), **data})
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def summary(self) -> Dict[str, Any]:
+        """상태 조회 응답 (결과 본문 제외)"""
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "status": self.status,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+            "events": len(self.events),
+            "last_event": self.events[-1] if self.events else None,
+        }
+
+
+class JobStore:
+    """
+    TTL 만료와 최대 개수 제한이 있는 프로세스 내 작업 저장소
+
+    잠금이 없으므로 이벤트 루프 스레드에서만 사용합니다 (작업 조회 핸들러도 async def).
+    """
+
+    def __init__(self, max_jobs: int = 256, ttl_s: float = 600.0):
+        """
+        Args:
+            max_jobs: 보관할 최대 작업 수 (완료된 작업부터 오래된 순으로 제거)
+            ttl_s: 완료된 작업을 보관하는 시간 (초)
+        """
+        self.max_jobs = int(max_jobs)
+        self.ttl_s = float(ttl_s)
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._evicted = 0
+
+    def _evict(self):
+        """만료된 작업 제거 후, 여전히 가득 차 있으면 가장 오래된 완료 작업부터 제거"""
+        self._evict_expired()
+        while len(self._jobs) >= self.max_jobs:
+            oldest_finished = next((job_id for job_id, job in self._jobs.items() if job.finished), None)
+            if oldest_finished is None:
+                raise JobStoreFull(f"진행 중인 작업이 {len(self._jobs)}개로 가득 찼습니다")
+            del self._jobs[oldest_finished]
+            self._evicted += 1
+
+    def create(self, kind: str, **params) -> Job:
+        """새 작업 등록 (가득 차면 JobStoreFull)"""
+        self._evict()
+        job = Job(id=uuid.uuid4().hex, kind=kind, params=params)
+        self._jobs[job.id] = job
+        job.publish("status", status=QUEUED)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self._evict_expired()
+        return self._jobs.get(job_id)
+
+    def _evict_expired(self):
+        """보관 시간(TTL)이 지난 완료 작업 제거"""
+        now = time.time()
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job.finished and now - job.finished_at > self.ttl_s]:
+            del self._jobs[job_id]
+            self._evicted += 1
+
+    async def run(self, job: Job, work: Awaitable[Any]):
+        """
+        작업 실행: 진행 이벤트 리스너를 설정한 뒤 work를 기다리고 결과/오류를 기록
+
+        work 코루틴은 이 태스크의 컨텍스트에서 실행되므로, 그 안에서 asyncio.to_thread나
+        새 태스크로 실행된 metrics.stage()도 이 작업의 이벤트로 기록됩니다.
+        """
+        loop = asyncio.get_running_loop()
+
+        def listener(phase: str, stage_name: str, elapsed: float):
+            # 파이프라인 스레드에서 호출될 수 있으므로 이벤트 루프로 넘겨서 기록
+            data = {"stage": stage_name}
+            if phase == "end":
+                data["elapsed_ms"] = round(elapsed * 1000.0, 1)
+            loop.call_soon_threadsafe(job.publish, f"stage_{phase}", **data)
+
+        token = metrics.stage_listener.set(listener)
+        job.status = RUNNING
+        job.publish("status", status=RUNNING)
+        try:
+            job.result = await work
+            job.status = SUCCEEDED
+        except Exception as e:
+            logger.error(f"[Jobs] 작업 실패 ({job.kind} {job.id}): {e}", exc_info=True)
+            job.error = str(e)
+            job.status = FAILED
+        finally:
+            metrics.stage_listener.reset(token)
+            job.finished_at = time.time()
+
+        # 스레드에서 넘어온 stage 이벤트가 먼저 기록되도록 한 바퀴 양보한 뒤 종료 이벤트 발행
+        await asyncio.sleep(0)
+        job.publish("status", status=job.status, error=job.error)
+
+    async def sse(self, job: Job) -> AsyncIterator[bytes]:
+        """지금까지의 이벤트를 먼저 보내고, 작업이 끝날 때까지 새 이벤트를 SSE 형식으로 전송"""
+        index = 0
+        while True:
+            changed = job._changed
+            while index < len(job.events):
+                event = job.events[index]
+                index += 1
+                payload = json.dumps(event, ensure_ascii=False)
+                yield f"id: {index}\nevent: {event['type']}\ndata: {payload}\n\n".encode("utf-8")
+            if job.finished and job.events and job.events[-1]["type"] == "status" and \
+                    job.events[-1]["status"] in FINISHED_STATES:
+                return
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=SSE_KEEPALIVE_S)
+            except asyncio.TimeoutError:
+                yield b": keepalive\n\n"
+
+    def stats(self) -> dict:
+        counts = {state: 0 for state in (QUEUED, RUNNING, SUCCEEDED, FAILED)}
+        for job in self._jobs.values():
+            counts[job.status] += 1
+        return {
+            "jobs": len(self._jobs),
+            "max_jobs": self.max_jobs,
+            "ttl_s": self.ttl_s,
+            "evicted": self._evicted,
+            **counts,
+        }
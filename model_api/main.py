@@ -1,14 +1,34 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
-from fastapi.responses import Response, JSONResponse
+from fastapi import FastAPI, File, Form, UploadFile, HTTPException, Request
+from fastapi.responses import Response, JSONResponse, StreamingResponse, PlainTextResponse
 from pathlib import Path
+import os
 import sys
 import logging
 import asyncio
 import base64
+import json
+import time
+import numpy as np
+from typing import List, Optional
 from fastapi.middleware.cors import CORSMiddleware
+from pydantic import BaseModel
 
 from hair_removal import HairRemovalPipeline
-from prediction import PredictionPipeline
+from prediction import GRADCAM_TOP_K_MAX, PATH_ENSEMBLE_TTA, PredictionPipeline
+from preprocessing import new_batch_buffer
+from batching import MicroBatcher
+from batch_inputs import BatchItem, chunked, expand_uploads, mark_gradcam, parse_gradcam_selection
+from diagnose import HairRemovalOutput, hair_output_from_png, remove_hair_in_memory
+from bundle import BUNDLE_MEDIA_TYPE, iter_bundle, wants_bundle
+from result_cache import ResultCache, hair_model_fingerprint, hash_bytes, prediction_model_fingerprint
+from singleflight import SingleFlight
+from worker_pool import WorkerPool, WorkerPoolUnavailable
+from admission import AdmissionController, AdmissionRejected
+from jobs import JobStore, JobStoreFull, FAILED
+import metrics
+from shared_media import (
+    SharedPathError, map_file, output_path, relative_to_root, resolve_shared_path, shared_root, write_atomic,
+)
 
 # 로깅 설정
 logging.basicConfig(
@@ -28,88 +48,1025 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 요청 수/지연 시간을 기록할 엔드포인트 (경로 그대로 라벨로 사용)
+METERED_PATHS = {
+    "/remove-hair", "/predict", "/predict/batch", "/diagnose",
+    "/shared/remove-hair", "/shared/predict", "/shared/diagnose",
+}
+
+
+def _request_outcome(status_code: int) -> str:
+    if status_code < 400:
+        return "success"
+    if status_code == 429:
+        return "rejected"
+    if status_code == 503:
+        return "unavailable"
+    if status_code < 500:
+        return "client_error"
+    return "error"
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """엔드포인트별 요청 수(결과별)와 응답 시작까지의 지연 시간 기록"""
+    path = request.url.path
+    if path not in METERED_PATHS:
+        return await call_next(request)
+
+    started = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        metrics.REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=path)
+        metrics.REQUESTS_TOTAL.inc(endpoint=path, outcome=_request_outcome(status_code))
+
+
+# /predict 마이크로 배칭 설정
+# PREDICT_BATCH_MAX_SIZE: 한 번에 묶을 최대 이미지 수 (1이면 배칭 비활성화)
+# PREDICT_BATCH_MAX_WAIT_MS: 배치를 채우기 위해 기다리는 최대 시간 (밀리초)
+PREDICT_BATCH_MAX_SIZE = int(os.getenv('PREDICT_BATCH_MAX_SIZE', '8'))
+PREDICT_BATCH_MAX_WAIT_MS = float(os.getenv('PREDICT_BATCH_MAX_WAIT_MS', '10'))
+
+# /predict/batch 설정 (여러 이미지 / zip 일괄 분류, JSON lines 스트리밍 응답)
+# PREDICT_BATCH_ENDPOINT_SIZE: 한 번에 추론할 이미지 수
+# PREDICT_BATCH_MAX_ITEMS: 요청당 최대 이미지 수 (zip 내부 포함)
+PREDICT_BATCH_ENDPOINT_SIZE = int(os.getenv('PREDICT_BATCH_ENDPOINT_SIZE', '8'))
+PREDICT_BATCH_MAX_ITEMS = int(os.getenv('PREDICT_BATCH_MAX_ITEMS', '256'))
+
+# 입력 해시 기반 결과 캐시 설정
+# RESULT_CACHE_ENABLED: 0이면 캐시 비활성화
+# RESULT_CACHE_MEMORY_MB: 메모리 LRU 계층 최대 크기
+# RESULT_CACHE_DIR: 디스크 계층 디렉토리 (기본값: 빈 값 = 디스크 계층 비활성화)
+#   털 제거 PNG / GradCAM(환자 피부 사진)이 저장되므로 소스 트리가 아닌 데이터 볼륨을 지정
+# RESULT_CACHE_DISK_MB: 디스크 계층 최대 크기
+# RESULT_CACHE_MAX_AGE_S: 저장 후 이 시간(초)이 지난 항목은 메모리 / 디스크에서 삭제 (0이면 제한 없음)
+RESULT_CACHE_ENABLED = os.getenv('RESULT_CACHE_ENABLED', '1') == '1'
+RESULT_CACHE_MEMORY_MB = float(os.getenv('RESULT_CACHE_MEMORY_MB', '64'))
+RESULT_CACHE_DIR = os.getenv('RESULT_CACHE_DIR', '')
+RESULT_CACHE_DISK_MB = float(os.getenv('RESULT_CACHE_DISK_MB', '1024'))
+RESULT_CACHE_MAX_AGE_S = float(os.getenv('RESULT_CACHE_MAX_AGE_S', '86400'))
+
+# 워커 프로세스 풀 설정 (CPU 전용 추론 노드용)
+# MODEL_API_WORKERS: 워커 프로세스 수 (0이면 현재 프로세스에서 직접 추론)
+# MODEL_API_WORKER_THREADS: 워커당 torch 스레드 수 (0이면 허용된 CPU 수 / 워커 수)
+# MODEL_API_PIN_CPUS: 1이면 워커별로 겹치지 않는 CPU 집합에 고정
+MODEL_API_WORKERS = int(os.getenv('MODEL_API_WORKERS', '0'))
+MODEL_API_WORKER_THREADS = int(os.getenv('MODEL_API_WORKER_THREADS', '0'))
+MODEL_API_PIN_CPUS = os.getenv('MODEL_API_PIN_CPUS', '1') == '1'
+
+# 엔드포인트별 admission control (과부하 시 즉시 429 + Retry-After)
+# ADMISSION_ENABLED: 0이면 제한 없음
+# ADMISSION_<PREDICT|REMOVE_HAIR|DIAGNOSE>_MAX_IN_FLIGHT: 동시 실행 수 (기본값: 워커 수 또는 엔드포인트별 기본값)
+# ADMISSION_<...>_MAX_QUEUED: 최대 대기 수
+# ADMISSION_<...>_QUEUE_TIMEOUT_S: 대기 시간 예산 (초)
+ADMISSION_ENABLED = os.getenv('ADMISSION_ENABLED', '1') == '1'
+
+# 비동기 작업 API (POST /jobs/{kind} → 상태/결과 조회, SSE 진행 이벤트)
+# JOB_STORE_MAX_JOBS: 보관할 최대 작업 수 (완료된 작업부터 오래된 순으로 제거)
+# JOB_TTL_S: 완료된 작업 결과 보관 시간 (초)
+JOB_STORE_MAX_JOBS = int(os.getenv('JOB_STORE_MAX_JOBS', '256'))
+JOB_TTL_S = float(os.getenv('JOB_TTL_S', '600'))
+
 # 전역 파이프라인 인스턴스
 pipeline: HairRemovalPipeline = None
 prediction_pipeline: PredictionPipeline = None
+predict_batcher: MicroBatcher = None
+worker_pool: WorkerPool = None
+result_cache: ResultCache = None
+admission: dict = {}
+hair_fingerprint: str = ""
+prediction_fingerprint: str = ""
+
+# 동일 입력 + 파라미터로 진행 중인 계산 병합 (엔드포인트 공용)
+inflight = SingleFlight()
+
+# 비동기 작업 저장소 (실행 중인 작업 태스크는 GC되지 않도록 참조 유지)
+job_store = JobStore(max_jobs=JOB_STORE_MAX_JOBS, ttl_s=JOB_TTL_S)
+_job_tasks: set = set()
+
+
+def _queue_depths() -> dict:
+    depths = {("singleflight",): inflight.stats()["in_flight"]}
+    if predict_batcher is not None:
+        depths[("predict_batcher",)] = predict_batcher.stats()["occupancy"]
+    if worker_pool is not None:
+        depths[("worker_pool",)] = worker_pool.stats()["busy"]
+    for name, controller in admission.items():
+        depths[(f"admission_{name}",)] = controller.stats()["queued"]
+    return depths
+
+
+def _cache_events() -> dict:
+    if result_cache is None:
+        return {}
+    events = {}
+    for stage_name, stage_stats in result_cache.stats()["stages"].items():
+        for event, value in stage_stats.items():
+            events[(stage_name, event)] = value
+    return events
+
+
+metrics.QUEUE_DEPTH.set_function(_queue_depths)
+metrics.COALESCED_TOTAL.set_function(lambda: {(): inflight.coalesced})
+metrics.CACHE_EVENTS_TOTAL.set_function(_cache_events)
 
 
 @app.on_event("startup")
 async def startup_event():
     """서버 시작 시 모델 로드"""
-    global pipeline, prediction_pipeline
+    global pipeline, prediction_pipeline, predict_batcher, worker_pool
+    global result_cache, hair_fingerprint, prediction_fingerprint, admission
     try:
         models_dir = Path(__file__).parent / "models"
         logger.info(f"모델 디렉토리: {models_dir}")
 
-        # 털 제거 파이프라인 로드
-        pipeline = HairRemovalPipeline(models_dir=models_dir)
-        logger.info("털 제거 파이프라인 로드 완료")
+        if MODEL_API_WORKERS > 0:
+            # 워커 프로세스 풀 모드: 각 워커가 두 파이프라인을 로드하고, 이 프로세스는 요청 분배만 담당
+            worker_pool = WorkerPool(
+                models_dir,
+                num_workers=MODEL_API_WORKERS,
+                threads_per_worker=MODEL_API_WORKER_THREADS or None,
+                pin_cpus=MODEL_API_PIN_CPUS,
+            )
+            await worker_pool.start()
+            for pipeline_name, seconds in worker_pool.info["load_seconds"].items():
+                metrics.MODEL_LOAD_SECONDS.set(seconds, pipeline=pipeline_name)
+            # 결과 조립(한국어 매핑, 위험도)용 인스턴스 - 모델은 로드하지 않음
+            prediction_pipeline = PredictionPipeline(models_dir=models_dir)
+            logger.info(f"워커 풀 준비 완료 (워커 {MODEL_API_WORKERS}개)")
+        else:
+            # 털 제거 파이프라인 로드
+            load_started = time.perf_counter()
+            pipeline = HairRemovalPipeline(models_dir=models_dir)
+            metrics.MODEL_LOAD_SECONDS.set(time.perf_counter() - load_started, pipeline="hair_removal")
+            logger.info("털 제거 파이프라인 로드 완료")
+
+            # AI 예측 파이프라인 로드
+            load_started = time.perf_counter()
+            prediction_pipeline = PredictionPipeline(models_dir=models_dir)
+            prediction_pipeline.load_model()
+            metrics.MODEL_LOAD_SECONDS.set(time.perf_counter() - load_started, pipeline="prediction")
+            logger.info("AI 예측 파이프라인 로드 완료")
+
+        # 예측 요청 마이크로 배칭 큐 시작 (워커 풀 모드에서는 워커 단위로 처리하므로 사용하지 않음)
+        if PREDICT_BATCH_MAX_SIZE > 1 and worker_pool is None:
+            predict_batcher = MicroBatcher(
+                _predict_rows,
+                max_batch_size=PREDICT_BATCH_MAX_SIZE,
+                max_wait_ms=PREDICT_BATCH_MAX_WAIT_MS,
+            )
+            await predict_batcher.start()
 
-        # AI 예측 파이프라인 로드
-        prediction_pipeline = PredictionPipeline(models_dir=models_dir)
-        prediction_pipeline.load_model()
-        logger.info("AI 예측 파이프라인 로드 완료")
+        # 결과 캐시 준비
+        if RESULT_CACHE_ENABLED:
+            result_cache = ResultCache(
+                memory_max_bytes=int(RESULT_CACHE_MEMORY_MB * 1024 * 1024),
+                disk_dir=Path(RESULT_CACHE_DIR) if RESULT_CACHE_DIR else None,
+                disk_max_bytes=int(RESULT_CACHE_DISK_MB * 1024 * 1024),
+                max_age_s=RESULT_CACHE_MAX_AGE_S,
+            )
+            if worker_pool is not None:
+                hair_fingerprint = worker_pool.info["hair_fingerprint"]
+                prediction_fingerprint = worker_pool.info["prediction_fingerprint"]
+            else:
+                hair_fingerprint = hair_model_fingerprint(pipeline)
+                prediction_fingerprint = prediction_model_fingerprint(prediction_pipeline)
+            logger.info(
+                f"결과 캐시 활성화 (메모리 {RESULT_CACHE_MEMORY_MB}MB, "
+                f"디스크 {RESULT_CACHE_DIR or '비활성화'} {RESULT_CACHE_DISK_MB}MB, 보관 {RESULT_CACHE_MAX_AGE_S:.0f}초)"
+            )
+
+        # 엔드포인트별 admission control
+        if ADMISSION_ENABLED:
+            # 워커 풀 모드에서는 워커 수만큼, 아니면 CPU를 나눠 쓰는 무거운 요청은 소수만 동시에 실행
+            parallel = MODEL_API_WORKERS if MODEL_API_WORKERS > 0 else None
+            admission = {
+                "predict": _admission_controller("predict", parallel or max(PREDICT_BATCH_MAX_SIZE, 1), 32, 30),
+                "remove-hair": _admission_controller("remove-hair", parallel or 2, 8, 60),
+                "diagnose": _admission_controller("diagnose", parallel or 2, 8, 60),
+            }
 
     except Exception as e:
         logger.error(f"파이프라인 로드 실패: {e}", exc_info=True)
         raise
 
 
+def _admission_controller(endpoint: str, max_in_flight: int, max_queued: int, queue_timeout_s: float):
+    """ADMISSION_<ENDPOINT>_* 환경 변수로 기본값을 덮어쓴 AdmissionController 생성"""
+    prefix = "ADMISSION_" + endpoint.upper().replace("-", "_")
+    controller = AdmissionController(
+        endpoint,
+        max_in_flight=int(os.getenv(f"{prefix}_MAX_IN_FLIGHT", str(max_in_flight))),
+        max_queued=int(os.getenv(f"{prefix}_MAX_QUEUED", str(max_queued))),
+        queue_timeout_s=float(os.getenv(f"{prefix}_QUEUE_TIMEOUT_S", str(queue_timeout_s))),
+    )
+    logger.info(f"admission control: {controller.stats()}")
+    return controller
+
+
+async def _admitted(endpoint: Optional[str], fn):
+    """
+    엔드포인트 admission 슬롯을 얻은 뒤 fn() 실행 (제한 초과 시 AdmissionRejected)
+
+    캐시 히트는 슬롯을 차지하지 않도록 캐시 조회 뒤 실제 계산 경로만 감쌉니다.
+    endpoint가 None이면 이미 슬롯을 얻은 호출 안이므로 바로 실행합니다.
+    """
+    controller = admission.get(endpoint) if endpoint is not None else None
+    if controller is None:
+        return await fn()
+    async with controller.admit():
+        return await fn()
+
+
+def _too_many_requests(e: AdmissionRejected) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail=f"요청이 많아 지금은 처리할 수 없습니다: {e.reason}",
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """서버 종료 시 배치 큐 / 워커 풀 정리"""
+    if predict_batcher is not None:
+        await predict_batcher.stop()
+    if worker_pool is not None:
+        await worker_pool.stop()
+
+
 @app.get("/")
 def root():
     return {"message": "Early Dot Model API", "status": "running"}
 
 
+@app.get("/metrics")
+def prometheus_metrics():
+    """Prometheus text exposition 형식 메트릭 (단계별 지연 시간, 요청 수, 큐 깊이, 모델 로드 시간)"""
+    return PlainTextResponse(metrics.render_latest(), media_type=metrics.PROMETHEUS_CONTENT_TYPE)
+
+
+@app.get("/stats")
+async def stats():
+    """큐 점유 상태 등 런타임 통계"""
+    return {
+        "predict_batcher": predict_batcher.stats() if predict_batcher is not None else None,
+        "result_cache": result_cache.stats() if result_cache is not None else None,
+        "singleflight": inflight.stats(),
+        "worker_pool": worker_pool.stats() if worker_pool is not None else None,
+        "admission": {name: controller.stats() for name, controller in admission.items()},
+        "jobs": job_store.stats(),
+    }
+
+
+async def _cache_get(stage: str, input_hash: str, fingerprint: str, params: str = ""):
+    """결과 캐시 조회 (캐시 비활성화 시 None)"""
+    if result_cache is None:
+        return None
+    return await asyncio.to_thread(result_cache.get, stage, input_hash, fingerprint, params)
+
+
+async def _cache_put(stage: str, input_hash: str, fingerprint: str, value: bytes, params: str = ""):
+    """결과 캐시 저장 (저장 실패는 응답에 영향을 주지 않음)"""
+    if result_cache is None or value is None:
+        return
+    try:
+        await asyncio.to_thread(result_cache.put, stage, input_hash, fingerprint, value, params)
+    except Exception as e:
+        logger.warning(f"결과 캐시 저장 실패 ({stage}): {e}")
+
+
+async def _remove_hair_cached(image_bytes: bytes, image_hash: str) -> bytes:
+    """털 제거 PNG (캐시 우선, 캐시 미스일 때만 admission 후 추론)"""
+    processed_bytes = await _cache_get("hair", image_hash, hair_fingerprint)
+    if processed_bytes is not None:
+        return processed_bytes
+
+    async def compute() -> bytes:
+        with metrics.stage("hair_removal"):
+            if worker_pool is not None:
+                processed = await worker_pool.call("remove_hair", image_bytes)
+            else:
+                processed = await asyncio.to_thread(pipeline.process, image_bytes)
+        await _cache_put("hair", image_hash, hair_fingerprint, processed)
+        return processed
+
+    return await _admitted("remove-hair", compute)
+
+
+async def _run_remove_hair(image_bytes: bytes) -> bytes:
+    """털 제거 (중복 병합 → 캐시 → admission → 추론)"""
+    image_hash = hash_bytes(image_bytes)
+    return await inflight.do(
+        ("remove-hair", image_hash),
+        lambda: _remove_hair_cached(image_bytes, image_hash),
+    )
+
+
+def _remove_hair_response(processed_bytes: bytes) -> Response:
+    return Response(
+        content=processed_bytes,
+        media_type="image/png",
+        headers={"Content-Disposition": "attachment; filename=processed.png"}
+    )
+
+
 @app.post("/remove-hair")
 async def remove_hair(file: UploadFile = File(...)):
     """환부 이미지에서 털 제거 처리"""
-    if pipeline is None:
+    if pipeline is None and worker_pool is None:
         raise HTTPException(status_code=503, detail="파이프라인이 로드되지 않았습니다")
 
     try:
         image_bytes = await file.read()
-        processed_bytes = await asyncio.to_thread(pipeline.process, image_bytes)
-        return Response(
-            content=processed_bytes,
-            media_type="image/png",
-            headers={"Content-Disposition": "attachment; filename=processed.png"}
-        )
+        processed_bytes = await _run_remove_hair(image_bytes)
+        return _remove_hair_response(processed_bytes)
+    except AdmissionRejected as e:
+        raise _too_many_requests(e)
+    except WorkerPoolUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         logger.error(f"털 제거 처리 실패: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"이미지 처리 실패: {str(e)}")
 
 
+def _prediction_response(
+    request: Request,
+    prediction_result: dict,
+    extra_metadata: dict = None,
+    extra_blobs: list = (),
+) -> Response:
+    """
+    예측 결과 응답 생성
+
+    Accept 헤더에 바이너리 번들(BUNDLE_MEDIA_TYPE)이 있으면 JSON 메타데이터 + 원본 PNG 파트로,
+    아니면 기존과 동일하게 이미지를 base64 문자열로 담은 JSON으로 응답합니다.
+
+    Args:
+        extra_metadata: 메타데이터에 추가할 필드
+        extra_blobs: 추가 이미지 파트 목록 [(name, content_type, bytes)]
+    """
+    metadata = {**_prediction_metadata(prediction_result), **(extra_metadata or {})}
+    blobs = [("grad_cam_bytes", "image/png", prediction_result.get("grad_cam_bytes")), *extra_blobs]
+    top_k = prediction_result.get("grad_cam_top_k")
+    bundle = wants_bundle(request.headers.get("accept"))
+
+    if top_k is not None:
+        # 클래스별 GradCAM: 번들이면 grad_cam_top_k_<순위> 파트, JSON이면 항목 안의 base64
+        metadata["grad_cam_top_k"] = []
+        for rank, entry in enumerate(top_k):
+            item = {key: value for key, value in entry.items() if key != "grad_cam_bytes"}
+            body = entry.get("grad_cam_bytes")
+            if bundle:
+                item["part"] = f"grad_cam_top_k_{rank}" if body else None
+                blobs.append((f"grad_cam_top_k_{rank}", "image/png", body))
+            else:
+                item["grad_cam_bytes"] = base64.b64encode(body).decode('utf-8') if body else None
+            metadata["grad_cam_top_k"].append(item)
+
+    if bundle:
+        return StreamingResponse(iter_bundle(metadata, blobs), media_type=BUNDLE_MEDIA_TYPE)
+
+    # JSON 응답 (이미지는 base64 인코딩)
+    response_data = dict(metadata)
+    for name, _, body in blobs:
+        response_data[name] = base64.b64encode(body).decode('utf-8') if body else None
+    return JSONResponse(content=response_data)
+
+
+def _prediction_metadata(prediction_result: dict) -> dict:
+    """예측 결과에서 응답 메타데이터 필드만 추출"""
+    return {
+        "class_probs": prediction_result["class_probs"],
+        "risk_level": prediction_result["risk_level"],
+        "disease_name_ko": prediction_result["disease_name_ko"],
+        "disease_name_en": prediction_result["disease_name_en"],
+        "inference_path": prediction_result.get("inference_path"),
+    }
+
+
+async def _classify(image, image_tensor, generate_gradcam: bool, gradcam_top_k: int = 0) -> dict:
+    """전처리된 단일 입력으로 분류 (+GradCAM, top-k 클래스별 GradCAM) 수행"""
+    if generate_gradcam and prediction_pipeline.fused_gradcam:
+        # CNN forward 1회로 분류와 GradCAM++를 함께 계산 (배치 큐를 거치지 않음)
+        return await asyncio.to_thread(
+            prediction_pipeline.predict_prepared,
+            image,
+            image_tensor,
+            generate_gradcam,
+            None,
+            gradcam_top_k,
+        )
+
+    if prediction_pipeline.tta_mode == "always" and prediction_pipeline.tta_views:
+        # 원본 + 증강 뷰가 이미 한 배치이므로 배치 큐를 거치지 않음
+        probs = await asyncio.to_thread(prediction_pipeline.predict_probs_tta, image_tensor)
+        path = PATH_ENSEMBLE_TTA
+    else:
+        if predict_batcher is not None:
+            # 배치 큐에서 앙상블 (cascade) 추론 → 결과 조립 (GradCAM 포함)
+            probs, path = await predict_batcher.submit(image_tensor)
+        else:
+            probs, paths = await asyncio.to_thread(prediction_pipeline.predict_probs_with_paths, image_tensor)
+            probs, path = probs[0], paths[0]
+        # uncertain 모드: 원본 확률의 top-2 차이가 작을 때만 나머지 뷰를 한 배치로 추가 실행
+        probs, path = await asyncio.to_thread(prediction_pipeline.apply_tta_for_path, image_tensor, probs, path)
+    return await asyncio.to_thread(
+        prediction_pipeline.build_result,
+        probs,
+        image,
+        generate_gradcam,
+        inference_path=path,
+        gradcam_top_k=gradcam_top_k if generate_gradcam else 0,
+    )
+
+
+def _predict_rows(batch_tensor):
+    """배치 큐 추론 함수: 행별 (앙상블 확률, 추론 경로)"""
+    probs, paths = prediction_pipeline.predict_probs_with_paths(batch_tensor)
+    return list(zip(probs, paths))
+
+
+def _gradcam_cache_params() -> str:
+    # 결합 모드와 분리 모드는 오버레이 배경 이미지 처리가 달라 따로 저장
+    return f"fused={int(prediction_pipeline.fused_gradcam)}"
+
+
+async def _classify_cached(
+    input_hash: str,
+    image_bytes: bytes,
+    prepare,
+    generate_gradcam: bool,
+    gradcam_top_k: int = 0,
+    admission_endpoint: Optional[str] = None,
+) -> dict:
+    """
+    입력 해시 기준으로 확률/GradCAM 캐시를 확인하고 없는 단계만 계산
+
+    Args:
+        input_hash: 분류 입력 이미지 바이트의 SHA-256
+        image_bytes: 분류 입력 이미지 바이트 (워커 풀 모드에서 워커로 전달)
+        prepare: (image, image_tensor)를 반환하는 동기 함수 (현재 프로세스 추론 시 캐시 미스일 때만 호출)
+        generate_gradcam: GradCAM 생성 여부
+        gradcam_top_k: 0보다 크면 top-k 클래스별 GradCAM도 생성 (캐시 조회 없이 계산, 결과는 캐시에 저장)
+        admission_endpoint: 전체 캐시 히트가 아닐 때 계산 경로에 적용할 admission 엔드포인트 (None이면 적용 안 함)
+    """
+    gradcam_params = _gradcam_cache_params()
+    cached_probs = cached_gradcam = None
+    if not gradcam_top_k:
+        cached_probs = await _cache_get("probs", input_hash, prediction_fingerprint)
+        if generate_gradcam:
+            cached_gradcam = await _cache_get("gradcam", input_hash, prediction_fingerprint, gradcam_params)
+
+    if cached_probs is not None and (not generate_gradcam or cached_gradcam is not None):
+        # 전체 캐시 히트 - 이미지 디코딩/전처리 없이 결과 조립
+        probs = np.frombuffer(cached_probs, dtype=np.float32)
+        return await asyncio.to_thread(
+            prediction_pipeline.build_result, probs, None, False, cached_gradcam, inference_path="cached"
+        )
+
+    async def compute() -> dict:
+        image = image_tensor = None
+        if worker_pool is None:
+            image, image_tensor = await asyncio.to_thread(prepare)
+
+        if cached_probs is not None:
+            # 확률만 히트 - GradCAM만 계산 (ViT 추론 생략)
+            probs = np.frombuffer(cached_probs, dtype=np.float32)
+            if worker_pool is not None:
+                grad_cam_bytes = await worker_pool.call("gradcam", image_bytes)
+            else:
+                grad_cam_bytes = await asyncio.to_thread(prediction_pipeline.generate_gradcam_png, image)
+            await _cache_put("gradcam", input_hash, prediction_fingerprint, grad_cam_bytes, gradcam_params)
+            return await asyncio.to_thread(
+                prediction_pipeline.build_result, probs, None, False, grad_cam_bytes, inference_path="cached"
+            )
+
+        with metrics.stage("classify"):
+            if worker_pool is not None:
+                prediction_result = await worker_pool.call("predict", image_bytes, generate_gradcam, None, gradcam_top_k)
+            else:
+                prediction_result = await _classify(image, image_tensor, generate_gradcam, gradcam_top_k)
+        await _record_prediction(input_hash, prediction_result, generate_gradcam)
+        return prediction_result
+
+    return await _admitted(admission_endpoint, compute)
+
+
+async def _record_prediction(input_hash: str, prediction_result: dict, generate_gradcam: bool):
+    """새로 계산한 분류 결과의 추론 경로 메트릭 기록 + 확률 / GradCAM 캐시 저장"""
+    metrics.INFERENCE_PATH_TOTAL.inc(path=prediction_result.get("inference_path") or "unknown")
+    await _cache_put(
+        "probs", input_hash, prediction_fingerprint,
+        np.asarray(prediction_result["probs"], dtype=np.float32).tobytes()
+    )
+    if generate_gradcam:
+        await _cache_put(
+            "gradcam", input_hash, prediction_fingerprint,
+            prediction_result.get("grad_cam_bytes"), _gradcam_cache_params()
+        )
+
+
+async def _run_predict(image_bytes: bytes, generate_gradcam: bool, gradcam_top_k: int = 0) -> dict:
+    """분류 (+GradCAM) (중복 병합 → 캐시 → admission → 추론)"""
+    image_hash = hash_bytes(image_bytes)
+    return await inflight.do(
+        ("predict", image_hash, generate_gradcam, gradcam_top_k),
+        lambda: _classify_cached(
+            image_hash,
+            image_bytes,
+            lambda: prediction_pipeline.prepare_input(image_bytes),
+            generate_gradcam,
+            gradcam_top_k,
+            admission_endpoint="predict",
+        ),
+    )
+
+
 @app.post("/predict")
-async def predict(file: UploadFile = File(...), generate_gradcam: bool = False):
-    """AI 모델 예측 엔드포인트"""
+async def predict(
+    request: Request,
+    file: UploadFile = File(...),
+    generate_gradcam: bool = False,
+    gradcam_top_k: int = 0,
+):
+    """
+    AI 모델 예측 엔드포인트
+
+    gradcam_top_k > 0이면 확률 상위 k개 클래스의 GradCAM을 grad_cam_top_k 목록으로 함께 응답합니다
+    (GRADCAM_TOP_K_MAX까지, generate_gradcam 포함).
+    """
     if prediction_pipeline is None:
         raise HTTPException(status_code=503, detail="예측 파이프라인이 로드되지 않았습니다")
 
+    gradcam_top_k = max(0, min(gradcam_top_k, GRADCAM_TOP_K_MAX))
+    generate_gradcam = generate_gradcam or gradcam_top_k > 0
     try:
         image_bytes = await file.read()
-        prediction_result = await asyncio.to_thread(
-            prediction_pipeline.predict,
-            image_bytes,
-            generate_gradcam
+        prediction_result = await _run_predict(image_bytes, generate_gradcam, gradcam_top_k)
+
+        return _prediction_response(request, prediction_result)
+
+    except AdmissionRejected as e:
+        raise _too_many_requests(e)
+    except WorkerPoolUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        logger.error(f"예측 실패: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"예측 실패: {str(e)}")
+
+
+# ----------------------------------------------------------------------
+# 일괄 예측 (/predict/batch)
+# ----------------------------------------------------------------------
+async def _lookup_batch_item(item: BatchItem, out=None) -> dict:
+    """
+    항목 하나의 캐시 조회 → 전체 히트면 결과, 아니면 (워커 풀이 아니면) 디코딩 + 전처리
+
+    out: 전처리 결과를 기록할 청크 배치 버퍼의 행 (3, 512, 512)
+    """
+    state = {"hash": hash_bytes(item.data), "result": None, "image": None, "tensor": None, "error": None}
+    try:
+        cached_probs = await _cache_get("probs", state["hash"], prediction_fingerprint)
+        cached_gradcam = None
+        if item.generate_gradcam:
+            cached_gradcam = await _cache_get("gradcam", state["hash"], prediction_fingerprint, _gradcam_cache_params())
+        if cached_probs is not None and (not item.generate_gradcam or cached_gradcam is not None):
+            state["result"] = await asyncio.to_thread(
+                prediction_pipeline.build_result,
+                np.frombuffer(cached_probs, dtype=np.float32), None, False, cached_gradcam,
+                inference_path="cached",
+            )
+        elif worker_pool is None:
+            state["image"], state["tensor"] = await asyncio.to_thread(prediction_pipeline.prepare_input, item.data, out)
+    except Exception as e:
+        logger.warning(f"[Batch] {item.name} 준비 실패: {e}")
+        state["error"] = str(e)
+    return state
+
+
+async def _prepare_batch_chunk(chunk, buffer=None) -> list:
+    """청크의 모든 항목을 동시에 캐시 조회 / 디코딩 (전처리 결과는 buffer의 청크 내 순서 행에 기록)"""
+    return await asyncio.gather(*(
+        _lookup_batch_item(item, buffer[row] if buffer is not None else None) for row, item in enumerate(chunk)
+    ))
+
+
+async def _classify_batch_chunk(chunk, states: list, buffer=None):
+    """캐시 미스 항목만 한 배치로 분류하고 결과를 캐시에 저장"""
+    rows = [row for row, state in enumerate(states) if state["result"] is None and state["error"] is None]
+    pending = [(chunk[row], states[row]) for row in rows]
+    if not pending:
+        return
+    # 캐시 미스 항목이 버퍼 앞쪽 행에 연속으로 있으면 (보통 전부 미스) 버퍼를 그대로 배치 입력으로 사용
+    batch_buffer = buffer[:len(rows)] if buffer is not None and rows == list(range(len(rows))) else None
+
+    async def run():
+        with metrics.stage("classify"):
+            if worker_pool is not None:
+                return await asyncio.gather(*(
+                    worker_pool.call("predict", item.data, item.generate_gradcam) for item, _ in pending
+                ))
+            return await asyncio.to_thread(
+                prediction_pipeline.predict_prepared_batch,
+                [state["image"] for _, state in pending],
+                [state["tensor"] for _, state in pending],
+                [item.generate_gradcam for item, _ in pending],
+                batch_buffer,
+            )
+
+    try:
+        results = await _admitted("predict", run)
+    except AdmissionRejected as e:
+        for _, state in pending:
+            state["error"] = f"요청이 많아 지금은 처리할 수 없습니다: {e.reason}"
+        return
+    except Exception as e:
+        logger.error(f"[Batch] 일괄 예측 실패 (배치 크기: {len(pending)}): {e}", exc_info=True)
+        for _, state in pending:
+            state["error"] = f"예측 실패: {e}"
+        return
+
+    for (item, state), result in zip(pending, results):
+        state["result"] = result
+        metrics.INFERENCE_PATH_TOTAL.inc(path=result.get("inference_path") or "unknown")
+        await _cache_put("probs", state["hash"], prediction_fingerprint,
+                         np.asarray(result["probs"], dtype=np.float32).tobytes())
+        if item.generate_gradcam:
+            await _cache_put("gradcam", state["hash"], prediction_fingerprint,
+                             result.get("grad_cam_bytes"), _gradcam_cache_params())
+
+
+def _batch_line(item: BatchItem, state: dict) -> bytes:
+    """항목 하나의 JSON lines 응답 행"""
+    line = {"index": item.index, "filename": item.name}
+    if state["error"] is not None:
+        line["error"] = state["error"]
+    else:
+        result = state["result"]
+        grad_cam_bytes = result.get("grad_cam_bytes")
+        line.update(_prediction_metadata(result))
+        line["grad_cam_bytes"] = base64.b64encode(grad_cam_bytes).decode('utf-8') if grad_cam_bytes else None
+    return (json.dumps(line, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+async def _predict_batch_lines(items: List[BatchItem]):
+    """
+    고정 크기 청크 단위로 분류하며 항목별 결과를 JSON lines로 스트리밍
+
+    현재 청크를 추론하는 동안 다음 청크의 캐시 조회 / 디코딩을 미리 시작합니다.
+    전처리 결과는 청크 배치 버퍼 두 개에 번갈아 기록합니다 (추론 중인 청크의 버퍼는 덮어쓰지 않음).
+    """
+    chunks = chunked(items, PREDICT_BATCH_ENDPOINT_SIZE)
+    if worker_pool is None:
+        buffers = [new_batch_buffer(len(chunks[0])) for _ in range(min(2, len(chunks)))]
+    else:
+        buffers = [None]
+    next_states = asyncio.create_task(_prepare_batch_chunk(chunks[0], buffers[0]))
+    for i, chunk in enumerate(chunks):
+        states = await next_states
+        if i + 1 < len(chunks):
+            next_states = asyncio.create_task(_prepare_batch_chunk(chunks[i + 1], buffers[(i + 1) % len(buffers)]))
+        await _classify_batch_chunk(chunk, states, buffers[i % len(buffers)])
+        for item, state in zip(chunk, states):
+            yield _batch_line(item, state)
+
+
+@app.post("/predict/batch")
+async def predict_batch(
+    files: List[UploadFile] = File(...),
+    generate_gradcam: bool = False,
+    gradcam_items: Optional[str] = Form(None),
+):
+    """
+    여러 이미지(multipart 목록 또는 zip)를 일괄 분류하고 항목별 결과를 JSON lines로 스트리밍
+
+    generate_gradcam은 전체 항목 기본값이고, gradcam_items(쉼표로 구분한 index 또는 파일 이름)를
+    보내면 해당 항목만 GradCAM을 생성합니다. 실패한 항목은 error 필드를 가진 행으로 응답합니다.
+    """
+    if prediction_pipeline is None:
+        raise HTTPException(status_code=503, detail="예측 파이프라인이 로드되지 않았습니다")
+
+    uploads = [(file.filename, await file.read()) for file in files]
+    try:
+        items = await asyncio.to_thread(expand_uploads, uploads, PREDICT_BATCH_MAX_ITEMS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    del uploads
+    mark_gradcam(items, generate_gradcam, parse_gradcam_selection(gradcam_items))
+    logger.info(f"[Batch] 일괄 예측 요청: {len(items)}장 (GradCAM {sum(item.generate_gradcam for item in items)}장)")
+
+    return StreamingResponse(_predict_batch_lines(items), media_type="application/x-ndjson")
+
+
+async def _diagnose_cached(image_bytes: bytes, image_hash: str, generate_gradcam: bool):
+    """
+    털 제거 → 분류 (+GradCAM), 단계별 캐시 우선. (HairRemovalOutput, 예측 결과) 반환
+
+    털 제거가 캐시 히트면 분류 단계도 캐시 미스일 때만 admission을 거치고,
+    털 제거가 캐시 미스면 털 제거 + 분류 전체를 admission 슬롯 하나로 실행합니다.
+    """
+    # 1. 털 제거 (실패 시 원본 이미지로 계속 진행, 성공 결과만 캐시)
+    # 워커 풀 모드에서는 분류도 PNG 바이트로 워커에 보내므로 RGB 배열을 만들지 않음
+    cached_png = await _cache_get("hair", image_hash, hair_fingerprint)
+    if cached_png is not None:
+        if worker_pool is not None:
+            hair = HairRemovalOutput(rgb=None, processed_png=cached_png, hair_removed=True)
+        else:
+            hair = await asyncio.to_thread(hair_output_from_png, cached_png)
+        return hair, await _classify_hair_output(image_bytes, image_hash, hair, generate_gradcam, "diagnose")
+
+    async def compute():
+        if worker_pool is not None:
+            return await _diagnose_in_worker(image_bytes, image_hash, generate_gradcam)
+        with metrics.stage("hair_removal"):
+            hair = await asyncio.to_thread(remove_hair_in_memory, pipeline, image_bytes)
+        if hair.hair_removed:
+            await _cache_put("hair", image_hash, hair_fingerprint, hair.processed_png)
+        return hair, await _classify_hair_output(image_bytes, image_hash, hair, generate_gradcam)
+
+    return await _admitted("diagnose", compute)
+
+
+async def _diagnose_in_worker(image_bytes: bytes, image_hash: str, generate_gradcam: bool):
+    """
+    워커 풀 모드: 털 제거 → 분류 → GradCAM을 워커 한 곳에서 IPC 왕복 1회로 실행
+
+    털 제거 PNG / 확률 / GradCAM은 현재 프로세스 경로와 같은 키로 캐시합니다.
+    """
+    with metrics.stage("diagnose"):
+        processed_png, hair_removed, prediction_result = await worker_pool.call(
+            "diagnose", image_bytes, generate_gradcam
         )
+    hair = HairRemovalOutput(rgb=None, processed_png=processed_png, hair_removed=hair_removed)
+    if hair.hair_removed:
+        await _cache_put("hair", image_hash, hair_fingerprint, hair.processed_png)
+    classify_hash = hash_bytes(processed_png) if hair_removed else image_hash
+    await _record_prediction(classify_hash, prediction_result, generate_gradcam)
+    return hair, prediction_result
 
-        # GradCAM 이미지를 base64로 인코딩 (있는 경우)
-        grad_cam_base64 = None
-        if prediction_result.get("grad_cam_bytes"):
-            grad_cam_base64 = base64.b64encode(
-                prediction_result["grad_cam_bytes"]
-            ).decode('utf-8')
-
-        response_data = {
-            "class_probs": prediction_result["class_probs"],
-            "risk_level": prediction_result["risk_level"],
-            "disease_name_ko": prediction_result["disease_name_ko"],
-            "disease_name_en": prediction_result["disease_name_en"],
-            "grad_cam_bytes": grad_cam_base64,
-        }
 
-        return JSONResponse(content=response_data)
+async def _classify_hair_output(
+    image_bytes: bytes,
+    image_hash: str,
+    hair: HairRemovalOutput,
+    generate_gradcam: bool,
+    admission_endpoint: Optional[str] = None,
+) -> dict:
+    """
+    2. 분류 + GradCAM (ndarray를 그대로 전달)
+
+    털 제거 PNG 해시로 캐시하므로 같은 PNG를 /predict로 보낸 결과와 공유됨
+    """
+    classify_bytes = hair.processed_png if hair.hair_removed else image_bytes
+    classify_hash = hash_bytes(classify_bytes) if hair.hair_removed else image_hash
+    return await _classify_cached(
+        classify_hash,
+        classify_bytes,
+        lambda: prediction_pipeline.prepare_array(hair.rgb),
+        generate_gradcam,
+        admission_endpoint=admission_endpoint,
+    )
+
+
+async def _run_diagnose(image_bytes: bytes, generate_gradcam: bool):
+    """털 제거 → 분류 (+GradCAM) (중복 병합 → 단계별 캐시 → admission → 추론)"""
+    image_hash = hash_bytes(image_bytes)
+    return await inflight.do(
+        ("diagnose", image_hash, generate_gradcam),
+        lambda: _diagnose_cached(image_bytes, image_hash, generate_gradcam),
+    )
+
+
+def _diagnose_response(request: Request, hair: HairRemovalOutput, prediction_result: dict) -> Response:
+    return _prediction_response(
+        request,
+        prediction_result,
+        extra_metadata={"hair_removed": hair.hair_removed},
+        extra_blobs=[("processed_image", "image/png", hair.processed_png)],
+    )
+
 
+@app.post("/diagnose")
+async def diagnose(request: Request, file: UploadFile = File(...), generate_gradcam: bool = True):
+    """털 제거 → 환부 분류 → GradCAM을 한 번의 호출로 처리 (중간 이미지는 메모리에서 전달)"""
+    if (pipeline is None and worker_pool is None) or prediction_pipeline is None:
+        raise HTTPException(status_code=503, detail="파이프라인이 로드되지 않았습니다")
+
+    try:
+        image_bytes = await file.read()
+        hair, prediction_result = await _run_diagnose(image_bytes, generate_gradcam)
+
+        return _diagnose_response(request, hair, prediction_result)
+
+    except AdmissionRejected as e:
+        raise _too_many_requests(e)
+    except WorkerPoolUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
-        logger.error(f"예측 실패: {e}", exc_info=True)
+        logger.error(f"진단 실패: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"진단 실패: {str(e)}")
+
+
+# ----------------------------------------------------------------------
+# 공유 미디어 볼륨 경로 기반 엔드포인트 (/shared/*)
+# ----------------------------------------------------------------------
+class SharedPathRequest(BaseModel):
+    """SHARED_MEDIA_ROOT 기준 입력 이미지 상대 경로"""
+    path: str
+    generate_gradcam: Optional[bool] = None
+
+
+def _shared_input(relative_path: str) -> Path:
+    """검증된 공유 볼륨 입력 경로 (비활성화면 503, 잘못된 경로면 400)"""
+    if shared_root() is None:
+        raise HTTPException(status_code=503, detail="SHARED_MEDIA_ROOT가 설정되지 않았습니다")
+    try:
+        return resolve_shared_path(relative_path)
+    except SharedPathError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _mapped_input(mapped):
+    """워커 풀 모드에서는 워커 프로세스로 보내야 하므로 bytes로 복사, 아니면 mmap 그대로 사용"""
+    return bytes(mapped) if worker_pool is not None else mapped
+
+
+async def _write_shared_output(input_path: Path, suffix: str, data: Optional[bytes]) -> Optional[str]:
+    """입력 파일 옆에 결과 PNG를 원자적으로 기록하고 공유 루트 기준 상대 경로 반환 (데이터 없으면 None)"""
+    if not data:
+        return None
+    path = output_path(input_path, suffix)
+    await asyncio.to_thread(write_atomic, path, data)
+    return relative_to_root(path)
+
+
+@app.post("/shared/remove-hair")
+async def shared_remove_hair(body: SharedPathRequest):
+    """공유 볼륨의 이미지를 털 제거하고 입력 옆에 <이름>.processed.png로 저장"""
+    if pipeline is None and worker_pool is None:
+        raise HTTPException(status_code=503, detail="털 제거 파이프라인이 로드되지 않았습니다")
+    input_path = _shared_input(body.path)
+
+    try:
+        processed_bytes = await _run_remove_hair(_mapped_input(map_file(input_path)))
+        return {"processed_image_path": await _write_shared_output(input_path, "processed", processed_bytes)}
+    except AdmissionRejected as e:
+        raise _too_many_requests(e)
+    except WorkerPoolUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        logger.error(f"털 제거 실패 (공유 경로): {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"털 제거 실패: {str(e)}")
+
+
+@app.post("/shared/predict")
+async def shared_predict(body: SharedPathRequest):
+    """공유 볼륨의 이미지를 분류하고 GradCAM은 입력 옆에 <이름>.gradcam.png로 저장"""
+    if prediction_pipeline is None:
+        raise HTTPException(status_code=503, detail="예측 파이프라인이 로드되지 않았습니다")
+    input_path = _shared_input(body.path)
+
+    try:
+        prediction_result = await _run_predict(_mapped_input(map_file(input_path)), bool(body.generate_gradcam))
+        return {
+            **_prediction_metadata(prediction_result),
+            "grad_cam_path": await _write_shared_output(
+                input_path, "gradcam", prediction_result.get("grad_cam_bytes")
+            ),
+        }
+    except AdmissionRejected as e:
+        raise _too_many_requests(e)
+    except WorkerPoolUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        logger.error(f"예측 실패 (공유 경로): {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"예측 실패: {str(e)}")
+
+
+@app.post("/shared/diagnose")
+async def shared_diagnose(body: SharedPathRequest):
+    """
+    공유 볼륨의 이미지로 털 제거 → 분류 → GradCAM 수행
+
+    결과 이미지는 입력 옆에 <이름>.processed.png / <이름>.gradcam.png로 저장하고 상대 경로만 응답합니다.
+    """
+    if (pipeline is None and worker_pool is None) or prediction_pipeline is None:
+        raise HTTPException(status_code=503, detail="파이프라인이 로드되지 않았습니다")
+    input_path = _shared_input(body.path)
+    generate_gradcam = True if body.generate_gradcam is None else body.generate_gradcam
+
+    try:
+        hair, prediction_result = await _run_diagnose(_mapped_input(map_file(input_path)), generate_gradcam)
+        return {
+            **_prediction_metadata(prediction_result),
+            "hair_removed": hair.hair_removed,
+            "processed_image_path": await _write_shared_output(input_path, "processed", hair.processed_png),
+            "grad_cam_path": await _write_shared_output(
+                input_path, "gradcam", prediction_result.get("grad_cam_bytes")
+            ),
+        }
+    except AdmissionRejected as e:
+        raise _too_many_requests(e)
+    except WorkerPoolUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        logger.error(f"진단 실패 (공유 경로): {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"진단 실패: {str(e)}")
+
+
+# ----------------------------------------------------------------------
+# 비동기 작업 API
+# ----------------------------------------------------------------------
+JOB_KINDS = ("remove-hair", "predict", "diagnose")
+
+
+def _job_runner(kind: str, image_bytes: bytes, generate_gradcam: bool):
+    if kind == "remove-hair":
+        return _run_remove_hair(image_bytes)
+    if kind == "predict":
+        return _run_predict(image_bytes, generate_gradcam)
+    return _run_diagnose(image_bytes, generate_gradcam)
+
+
+@app.post("/jobs/{kind}", status_code=202)
+async def create_job(kind: str, file: UploadFile = File(...), generate_gradcam: Optional[bool] = None):
+    """
+    털 제거 / 예측 / 진단을 비동기 작업으로 등록하고 job id를 바로 반환
+
+    진행 상황은 GET /jobs/{job_id}/events (SSE), 결과는 GET /jobs/{job_id}/result 로 조회합니다.
+    generate_gradcam 기본값은 동기 엔드포인트와 같습니다 (predict: False, diagnose: True).
+    """
+    if kind not in JOB_KINDS:
+        raise HTTPException(status_code=404, detail=f"지원하지 않는 작업 종류입니다: {kind}")
+    if kind in ("remove-hair", "diagnose") and pipeline is None and worker_pool is None:
+        raise HTTPException(status_code=503, detail="파이프라인이 로드되지 않았습니다")
+    if kind in ("predict", "diagnose") and prediction_pipeline is None:
+        raise HTTPException(status_code=503, detail="예측 파이프라인이 로드되지 않았습니다")
+
+    if generate_gradcam is None:
+        generate_gradcam = kind == "diagnose"
+    image_bytes = await file.read()
+
+    try:
+        params = {} if kind == "remove-hair" else {"generate_gradcam": generate_gradcam}
+        job = job_store.create(kind, **params)
+    except JobStoreFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "10"})
+
+    task = asyncio.create_task(job_store.run(job, _job_runner(kind, image_bytes, generate_gradcam)))
+    _job_tasks.add(task)
+    task.add_done_callback(_job_tasks.discard)
+
+    return JSONResponse(status_code=202, content={
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.id}",
+        "result_url": f"/jobs/{job.id}/result",
+        "events_url": f"/jobs/{job.id}/events",
+    })
+
+
+def _get_job(job_id: str):
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다 (만료되었거나 존재하지 않음)")
+    return job
+
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    """작업 상태와 마지막 진행 이벤트"""
+    return _get_job(job_id).summary()
+
+
+@app.get("/jobs/{job_id}/result")
+async def job_result(request: Request, job_id: str):
+    """작업 결과 (동기 엔드포인트와 같은 응답 형식, 완료 전이면 409)"""
+    job = _get_job(job_id)
+    if not job.finished:
+        raise HTTPException(status_code=409, detail=f"작업이 아직 끝나지 않았습니다 ({job.status})")
+    if job.status == FAILED:
+        raise HTTPException(status_code=500, detail=f"작업 실패: {job.error}")
+
+    if job.kind == "remove-hair":
+        return _remove_hair_response(job.result)
+    if job.kind == "predict":
+        return _prediction_response(request, job.result)
+    hair, prediction_result = job.result
+    return _diagnose_response(request, hair, prediction_result)
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """작업 진행 이벤트 스트림 (Server-Sent Events: status / stage_start / stage_end)"""
+    job = _get_job(job_id)
+    return StreamingResponse(
+        job_store.sse(job),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,331 @@
+"""
+모델 API 런타임 메트릭 (Prometheus text exposition 형식)
+
+외부 라이브러리나 별도 수집 서비스 없이 프로세스 안에서 카운터/게이지/히스토그램을 집계하고
+GET /metrics 에서 Prometheus가 읽을 수 있는 텍스트로 내보냅니다.
+관측 1회는 락 한 번 + bisect 한 번이라 운영 환경에서 항상 켜 두어도 부담이 거의 없습니다.
+
+사용 방법:
+    from metrics import stage
+    with stage("unet_mask"):
+        mask = self._predict_mask(bgr)
+"""
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# 단계 지연 시간 버킷 (초) - 수 ms 전처리부터 수십 초 LaMa/BSRGAN까지
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames: Tuple[str, ...], labelvalues: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    """메트릭 공통 부분 (이름, 설명, 라벨)"""
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._callback: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} 라벨 불일치: {sorted(labels)} != {sorted(self.labelnames)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def set_function(self, fn: Callable[[], Dict[Tuple[str, ...], float]]):
+        """
+        수집 시점에 값을 계산하는 콜백 등록 (큐 깊이처럼 다른 객체가 가진 값을 노출할 때)
+
+        Args:
+            fn: {라벨 값 튜플: 값}을 반환하는 함수 (라벨이 없으면 키는 빈 튜플)
+        """
+        self._callback = fn
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        if self._callback is not None:
+            try:
+                values = self._callback() or {}
+            except Exception:
+                values = {}
+            for labelvalues, value in values.items():
+                lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}")
+        else:
+            lines.extend(self._samples())
+        return lines
+
+
+class Counter(_Metric):
+    """단조 증가 카운터"""
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items]
+
+
+class Gauge(_Metric):
+    """임의로 오르내리는 값"""
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items]
+
+
+class Histogram(_Metric):
+    """누적 버킷 히스토그램"""
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+        # 라벨별 [버킷별 개수 (+Inf 포함), 합계]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def snapshot(self, reset: bool = False) -> Dict[Tuple[str, ...], tuple]:
+        """
+        현재 관측값 복사 (워커 프로세스에서 기록한 값을 부모 프로세스로 옮길 때 사용)
+
+        Args:
+            reset: True면 복사 후 비움 (다음 snapshot에는 그 이후 관측값만 포함)
+        """
+        with self._lock:
+            snap = {key: (list(counts), total) for key, (counts, total) in self._values.items()}
+            if reset:
+                self._values.clear()
+        return snap
+
+    def merge(self, snap: Dict[Tuple[str, ...], tuple]):
+        """snapshot() 결과를 현재 히스토그램에 더함 (버킷 구성이 같아야 함)"""
+        with self._lock:
+            for key, (counts, total) in snap.items():
+                entry = self._values.get(key)
+                if entry is None:
+                    entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+                for i, count in enumerate(counts):
+                    entry[0][i] += count
+                entry[1] += total
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        lines = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """메트릭 모음"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"이미 등록된 메트릭입니다: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Prometheus text exposition (version 0.0.4)"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "model_api_stage_seconds",
+    "Latency of individual pipeline stages in seconds",
+    labelnames=("stage",),
+))
+REQUESTS_TOTAL = REGISTRY.register(Counter(
+    "model_api_requests_total",
+    "Requests handled by endpoint and outcome",
+    labelnames=("endpoint", "outcome"),
+))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "model_api_request_seconds",
+    "End-to-end request latency in seconds",
+    labelnames=("endpoint",),
+))
+MODEL_LOAD_SECONDS = REGISTRY.register(Gauge(
+    "model_api_model_load_seconds",
+    "Time spent loading each pipeline at startup in seconds",
+    labelnames=("pipeline",),
+))
+QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "model_api_queue_depth",
+    "Requests waiting or running in each internal queue",
+    labelnames=("queue",),
+))
+COALESCED_TOTAL = REGISTRY.register(Counter(
+    "model_api_coalesced_requests_total",
+    "Requests served by awaiting an identical in-flight computation",
+))
+CACHE_EVENTS_TOTAL = REGISTRY.register(Counter(
+    "model_api_result_cache_events_total",
+    "Result cache lookups and evictions by stage and event",
+    labelnames=("stage", "event"),
+))
+INFERENCE_PATH_TOTAL = REGISTRY.register(Counter(
+    "model_api_inference_path_total",
+    "Classifications by inference path (cnn_only, ensemble, ensemble_tta)",
+    labelnames=("path",),
+))
+
+
+# 단계 시작/종료 리스너 (비동기 작업 API가 작업 단위로 설정, listener(phase, stage, elapsed_s))
+# 여러 요청이 계산 하나를 공유하면(single-flight, 마이크로 배칭, 워커 풀) 각 요청의 리스너로 전달됩니다.
+# 컨텍스트 변수이므로 asyncio 태스크와 asyncio.to_thread 실행 스레드로 전파됩니다.
+stage_listener: ContextVar[Optional[Callable[[str, str, float], None]]] = ContextVar("stage_listener", default=None)
+
+
+def notify_listener(listener, phase: str, name: str, elapsed: float):
+    try:
+        listener(phase, name, elapsed)
+    except Exception:
+        # 진행 이벤트 실패가 추론을 멈추게 하지 않음
+        pass
+
+
+@contextmanager
+def stage(name: str):
+    """블록 실행 시간을 model_api_stage_seconds{stage=name}에 기록 (리스너가 있으면 시작/종료 알림)"""
+    listener = stage_listener.get()
+    if listener is not None:
+        notify_listener(listener, "start", name, 0.0)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=name)
+        if listener is not None:
+            notify_listener(listener, "end", name, elapsed)
+
+
+class StageFanout:
+    """
+    단계 이벤트를 여러 리스너로 전달하는 stage_listener (계산 하나를 여러 요청이 공유할 때 사용)
+
+    single-flight 병합 대기자, 마이크로 배치에 함께 묶인 요청처럼 한 계산의 결과를 기다리는 요청마다
+    진행 이벤트를 받도록 합니다. 파이프라인 스레드에서 호출될 수 있어 잠금으로 보호합니다.
+    나중에 add()된 리스너에는 지금까지의 이벤트를 먼저 재생합니다.
+    """
+
+    def __init__(self, listeners: Iterable[Callable[[str, str, float], None]] = ()):
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[str, str, float], None]] = [l for l in listeners if l is not None]
+        self._history: List[Tuple[str, str, float]] = []
+
+    def __call__(self, phase: str, name: str, elapsed: float):
+        with self._lock:
+            self._history.append((phase, name, elapsed))
+            listeners = tuple(self._listeners)
+        for listener in listeners:
+            # 한 리스너의 오류가 다른 리스너나 계산에 영향을 주지 않음
+            notify_listener(listener, phase, name, elapsed)
+
+    def add(self, listener: Optional[Callable[[str, str, float], None]]):
+        """리스너 등록 (지금까지의 이벤트를 먼저 재생)"""
+        if listener is None:
+            return
+        with self._lock:
+            history = tuple(self._history)
+            self._listeners.append(listener)
+        for event in history:
+            notify_listener(listener, *event)
+
+    def remove(self, listener: Optional[Callable[[str, str, float], None]]):
+        if listener is None:
+            return
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+
+def render_latest() -> str:
+    """/metrics 응답 본문"""
+    return REGISTRY.render()
@@ -0,0 +1,161 @@
+"""
+ONNX Runtime 실행 백엔드 (CNN 앙상블 + ViT Soft Voting 분류기)
+
+PREDICTION_BACKEND=onnx이면 cnn_model / vit_model을 한 번 ONNX로 export해 체크포인트 옆에 저장하고
+(<체크포인트 이름>.onnx + 원본 식별용 .onnx.json), ONNX Runtime CPU 실행 프로바이더로 실행합니다.
+로드할 때 PyTorch 경로와 클래스 확률을 비교해 차이가 ONNX_PARITY_TOLERANCE를 넘으면 PyTorch로 돌아갑니다.
+
+GradCAM++는 PyTorch autograd가 필요하므로 항상 FP32 PyTorch cnn_model로 계산합니다.
+
+사용 방법:
+    cnn_onnx = load_or_export(cnn_model, cnn_checkpoint_path)
+    logits = cnn_onnx(image_tensor)   # torch.Tensor 입력/출력 (CPU)
+"""
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from weights_io import source_signature
+
+logger = logging.getLogger(__name__)
+
+try:
+    import onnxruntime as ort
+    HAS_ONNXRUNTIME = True
+except ImportError:
+    HAS_ONNXRUNTIME = False
+
+# 분류기 실행 백엔드
+# PREDICTION_BACKEND: torch | onnx (기본값: torch)
+# ONNX_INTRA_OP_THREADS: ONNX Runtime intra-op 스레드 수 (기본값: 0 = ONNX Runtime 기본값)
+# ONNX_PARITY_TOLERANCE: PyTorch 대비 허용 최대 클래스 확률 차이 (기본값: 0.001)
+PREDICTION_BACKEND = os.getenv('PREDICTION_BACKEND', 'torch').strip().lower()
+ONNX_INTRA_OP_THREADS = int(os.getenv('ONNX_INTRA_OP_THREADS', '0'))
+ONNX_PARITY_TOLERANCE = float(os.getenv('ONNX_PARITY_TOLERANCE', '1e-3'))
+
+ONNX_OPSET = 17
+INPUT_SIZE = 512
+
+
+def onnx_path(checkpoint_path: Path) -> Path:
+    """체크포인트 옆 ONNX 파일 경로"""
+    return Path(checkpoint_path).with_suffix(".onnx")
+
+
+def _export_info(checkpoint_path: Path) -> dict:
+    return {"source": source_signature(checkpoint_path), "torch": torch.__version__, "opset": ONNX_OPSET}
+
+
+def export_onnx(model: nn.Module, checkpoint_path: Path) -> Path:
+    """model을 동적 배치 ONNX로 export (임시 파일 → rename)"""
+    path = onnx_path(checkpoint_path)
+    tmp_path = path.with_suffix(f".onnx.tmp{os.getpid()}")
+    model.eval()
+    dummy = torch.randn(1, 3, INPUT_SIZE, INPUT_SIZE)
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            dummy,
+            str(tmp_path),
+            input_names=["input"],
+            output_names=["logits"],
+            dynamic_axes={"input": {0: "batch"}, "logits": {0: "batch"}},
+            opset_version=ONNX_OPSET,
+            do_constant_folding=True,
+        )
+    os.replace(tmp_path, path)
+    path.with_suffix(".onnx.json").write_text(json.dumps(_export_info(checkpoint_path), indent=2))
+    logger.info(f"[ONNX] export 완료: {path}")
+    return path
+
+
+def _is_current(checkpoint_path: Path) -> bool:
+    """ONNX 파일이 현재 체크포인트 / torch 버전으로 export된 것인지"""
+    path = onnx_path(checkpoint_path)
+    info_path = path.with_suffix(".onnx.json")
+    if not path.exists() or not info_path.exists():
+        return False
+    try:
+        return json.loads(info_path.read_text()) == _export_info(checkpoint_path)
+    except (OSError, ValueError):
+        return False
+
+
+class OnnxModel:
+    """ONNX Runtime 세션을 PyTorch 모듈처럼 호출 (torch.Tensor → logits torch.Tensor)"""
+
+    def __init__(self, path: Path, intra_op_threads: int = ONNX_INTRA_OP_THREADS):
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.inter_op_num_threads = 1
+        if intra_op_threads > 0:
+            options.intra_op_num_threads = intra_op_threads
+        self.path = Path(path)
+        self.session = ort.InferenceSession(str(path), sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, x: torch.Tensor) -> torch.Tensor:
+        array = np.ascontiguousarray(x.detach().to("cpu", torch.float32).numpy())
+        (logits,) = self.session.run(None, {self.input_name: array})
+        return torch.from_numpy(logits)
+
+
+def load_or_export(model: nn.Module, checkpoint_path: Path) -> OnnxModel:
+    """캐시된 ONNX가 최신이면 로드, 아니면 export 후 로드"""
+    if not _is_current(checkpoint_path):
+        export_onnx(model, checkpoint_path)
+    return OnnxModel(onnx_path(checkpoint_path))
+
+
+def build_onnx_ensemble(predictor) -> Optional[nn.Module]:
+    """
+    ONNX Runtime 기반 Soft Voting 앙상블 생성 및 PyTorch 대비 확률 비교
+
+    Returns:
+        ONNX 앙상블 또는 None (onnxruntime 없음 / CPU가 아님 / export 실패 / 허용 오차 초과)
+    """
+    from prediction import SoftVotingEnsemble
+
+    if not HAS_ONNXRUNTIME:
+        logger.warning("[ONNX] onnxruntime이 설치되지 않아 PyTorch 백엔드를 사용합니다")
+        return None
+    if predictor.device.type != "cpu":
+        logger.warning(f"[ONNX] CPU 실행 프로바이더만 지원합니다 (현재 {predictor.device}), PyTorch 백엔드 사용")
+        return None
+
+    try:
+        cnn_onnx = load_or_export(predictor.cnn_model, predictor.cnn_model_path)
+        vit_onnx = load_or_export(predictor.vit_model, predictor.vit_model_path)
+    except Exception as e:
+        logger.error(f"[ONNX] export/로드 실패, PyTorch 백엔드 사용: {e}", exc_info=True)
+        return None
+
+    onnx_model = SoftVotingEnsemble(
+        cnn_model=cnn_onnx,
+        vit_model=vit_onnx,
+        num_classes=predictor.model.num_classes,
+        weights=predictor.model.weights,
+    )
+
+    # 동적 배치까지 확인하도록 배치 2 입력으로 비교
+    generator = torch.Generator().manual_seed(0)
+    sample = torch.randn(2, 3, INPUT_SIZE, INPUT_SIZE, generator=generator)
+    with torch.no_grad():
+        expected = predictor.model(sample).float()
+        actual = onnx_model(sample).float()
+    max_diff = float((expected - actual).abs().max())
+    if max_diff > ONNX_PARITY_TOLERANCE:
+        logger.warning(
+            f"[ONNX] PyTorch 대비 클래스 확률 차이 {max_diff:.2e} > 허용 {ONNX_PARITY_TOLERANCE:.0e}, "
+            f"PyTorch 백엔드를 사용합니다"
+        )
+        return None
+    logger.info(f"[ONNX] ONNX Runtime 백엔드 사용 (PyTorch 대비 최대 확률 차이 {max_diff:.2e})")
+    return onnx_model
@@ -0,0 +1,98 @@
+"""
+CNN 앙상블 / ViT 브랜치 동시 실행 (CPU 전용, 선택 사항)
+
+SoftVotingEnsemble은 cnn_model(x) → vit_model(x)를 차례로 실행합니다. 코어가 많은 CPU 노드에서는
+배치 크기 1일 때 두 브랜치 모두 코어를 다 쓰지 못하므로, ENSEMBLE_PARALLEL=1이면 브랜치마다
+전용 스레드 하나를 두고 intra-op 스레드 수를 나눠 준 뒤 동시에 실행하고 가중 평균 전에 합칩니다.
+단일 요청 지연 시간은 두 브랜치 중 느린 쪽에 가까워집니다.
+
+torch.jit.fork는 eager 모드에서 호출하면 동기적으로 실행되므로 (TorchScript 그래프 안에서만 비동기),
+eager / TorchScript / ONNX Runtime 브랜치를 모두 다룰 수 있도록 파이썬 스레드를 사용합니다.
+PyTorch 연산은 GIL을 풀고 실행되고, OpenMP 스레드 수는 호출한 스레드별 설정이므로
+각 브랜치 스레드에서 torch.set_num_threads()로 정한 스레드 수만큼만 코어를 사용합니다.
+
+사용 방법:
+    runner = BranchRunner({"cnn": 4, "vit": 12})
+    cnn_future = runner.submit("cnn", cnn_model, x)
+    vit_future = runner.submit("vit", vit_model, x)
+    cnn_logits, vit_logits = cnn_future.result(), vit_future.result()
+"""
+import contextvars
+import logging
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict
+
+import torch
+
+from metrics import stage
+
+logger = logging.getLogger(__name__)
+
+# 브랜치 동시 실행 설정
+# ENSEMBLE_PARALLEL: 1이면 CNN 앙상블과 ViT를 동시에 실행 (기본값: 0)
+# ENSEMBLE_PARALLEL_CNN_THREADS / ENSEMBLE_PARALLEL_VIT_THREADS: 브랜치별 intra-op 스레드 수
+#   (기본값: 0 = 현재 torch 스레드 수를 CNN 1/4, ViT 3/4로 나눔 - 512px ViT-B/16의 연산량이 더 많음)
+ENSEMBLE_PARALLEL = os.getenv('ENSEMBLE_PARALLEL', '0') == '1'
+ENSEMBLE_PARALLEL_CNN_THREADS = int(os.getenv('ENSEMBLE_PARALLEL_CNN_THREADS', '0'))
+ENSEMBLE_PARALLEL_VIT_THREADS = int(os.getenv('ENSEMBLE_PARALLEL_VIT_THREADS', '0'))
+
+
+def split_thread_budget(total: int) -> Dict[str, int]:
+    """브랜치별 intra-op 스레드 수 (환경변수 지정값 우선)"""
+    total = max(2, total)
+    cnn_threads = ENSEMBLE_PARALLEL_CNN_THREADS or max(1, total // 4)
+    vit_threads = ENSEMBLE_PARALLEL_VIT_THREADS or max(1, total - cnn_threads)
+    return {"cnn": cnn_threads, "vit": vit_threads}
+
+
+def _init_branch_thread(num_threads: int):
+    torch.set_num_threads(num_threads)
+
+
+class BranchRunner:
+    """브랜치 이름별 전용 스레드 (스레드 수 고정)에서 모델을 실행"""
+
+    def __init__(self, thread_budgets: Dict[str, int]):
+        self.thread_budgets = dict(thread_budgets)
+        self._executors = {
+            name: ThreadPoolExecutor(
+                max_workers=1,
+                thread_name_prefix=f"branch-{name}",
+                initializer=_init_branch_thread,
+                initargs=(num_threads,),
+            )
+            for name, num_threads in self.thread_budgets.items()
+        }
+
+    def submit(self, name: str, fn: Callable, *args) -> Future:
+        """
+        브랜치 스레드에서 fn(*args) 실행 (stage(name) 지연 시간 기록)
+
+        grad 모드는 스레드별 상태이므로 호출한 스레드의 설정을 그대로 적용하고,
+        단계 리스너(컨텍스트 변수)도 복사해 전달합니다.
+        """
+        grad_enabled = torch.is_grad_enabled()
+
+        def run():
+            with torch.set_grad_enabled(grad_enabled):
+                with stage(name):
+                    return fn(*args)
+
+        return self._executors[name].submit(contextvars.copy_context().run, run)
+
+    def shutdown(self):
+        for executor in self._executors.values():
+            executor.shutdown(wait=False)
+
+
+def build_branch_runner(device: torch.device):
+    """설정에 맞는 BranchRunner (비활성화 / CPU가 아니면 None)"""
+    if not ENSEMBLE_PARALLEL:
+        return None
+    if torch.device(device).type != "cpu":
+        logger.info(f"[Parallel] 브랜치 동시 실행은 CPU 전용입니다 (현재 {device}), 순차 실행")
+        return None
+    budgets = split_thread_budget(torch.get_num_threads())
+    logger.info(f"[Parallel] CNN / ViT 브랜치 동시 실행 (intra-op 스레드: {budgets})")
+    return BranchRunner(budgets)
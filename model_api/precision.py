@@ -0,0 +1,132 @@
+"""
+추론 정밀도 설정 (fp32 / bf16 autocast / channels_last + bf16)
+
+모든 네트워크(U-Net++, BSRGAN, LaMa, CNN 앙상블, ViT)는 기본적으로 float32 + NCHW 연속 텐서로 실행됩니다.
+bfloat16을 지원하는 CPU(AVX512-BF16 / AMX)나 GPU에서는 autocast로 행렬곱/컨볼루션을 bf16으로 실행하고,
+channels_last 메모리 형식을 쓰면 oneDNN 컨볼루션이 형식 변환 없이 실행되어 더 빨라집니다.
+
+모드
+  fp32                : 기존과 동일
+  bf16                : torch.autocast(bfloat16) 안에서 실행, 출력은 float32로 되돌림
+  channels_last_bf16  : 로드 시 모델을 channels_last로 한 번 변환 + 입력도 channels_last + bf16 autocast
+
+설정
+  INFERENCE_PRECISION=fp32|bf16|channels_last_bf16 (전체 기본값)
+  INFERENCE_PRECISION_<UNET|BSRGAN|LAMA|CNN|VIT>=...  (모델별 덮어쓰기, 예: LaMa FFT 경로는 fp32 유지)
+
+사용 방법:
+    model = wrap_model(model, "unet", device)   # fp32면 model 그대로 반환
+"""
+import logging
+import os
+from typing import Dict
+
+import torch
+import torch.nn as nn
+
+logger = logging.getLogger(__name__)
+
+FP32 = "fp32"
+BF16 = "bf16"
+CHANNELS_LAST_BF16 = "channels_last_bf16"
+PRECISION_MODES = (FP32, BF16, CHANNELS_LAST_BF16)
+
+MODEL_NAMES = ("unet", "bsrgan", "lama", "cnn", "vit")
+
+# 전체 기본 정밀도
+# 환경변수로 변경 가능: INFERENCE_PRECISION (기본값: fp32)
+INFERENCE_PRECISION = os.getenv('INFERENCE_PRECISION', FP32).strip().lower()
+
+
+def _bf16_supported(device: torch.device) -> bool:
+    if device.type == "cuda":
+        return torch.cuda.is_available() and torch.cuda.is_bf16_supported()
+    if device.type == "cpu":
+        try:
+            return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+        except (AttributeError, RuntimeError):
+            return False
+    return False
+
+
+def precision_for(name: str, device: torch.device) -> str:
+    """모델별 실제 적용 정밀도 (덮어쓰기 반영, bf16 미지원 디바이스면 fp32)"""
+    mode = os.getenv(f"INFERENCE_PRECISION_{name.upper()}", INFERENCE_PRECISION).strip().lower()
+    if mode not in PRECISION_MODES:
+        logger.warning(f"[Precision] 알 수 없는 정밀도 '{mode}' ({name}), fp32 사용 (가능한 값: {PRECISION_MODES})")
+        return FP32
+    if mode != FP32 and not _bf16_supported(torch.device(device)):
+        logger.warning(f"[Precision] {device}에서 bfloat16을 지원하지 않아 {name}은 fp32로 실행합니다")
+        return FP32
+    return mode
+
+
+def _convert_input(value, channels_last: bool):
+    if channels_last and isinstance(value, torch.Tensor) and value.dim() == 4 and value.is_floating_point():
+        return value.contiguous(memory_format=torch.channels_last)
+    if isinstance(value, dict):
+        return {k: _convert_input(v, channels_last) for k, v in value.items()}
+    return value
+
+
+def _to_float(value):
+    if isinstance(value, torch.Tensor):
+        return value.float() if value.is_floating_point() else value
+    if isinstance(value, dict):
+        return {k: _to_float(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(_to_float(v) for v in value)
+    return value
+
+
+class PrecisionModule(nn.Module):
+    """입력 형식 변환 + bf16 autocast 실행 + 출력 float32 변환 래퍼"""
+
+    def __init__(self, model: nn.Module, mode: str, device_type: str):
+        super().__init__()
+        self.model = model
+        self.mode = mode
+        self.device_type = device_type
+        self.channels_last = mode == CHANNELS_LAST_BF16
+
+    def autocast(self):
+        return torch.autocast(device_type=self.device_type, dtype=torch.bfloat16)
+
+    def forward(self, *args, **kwargs):
+        args = tuple(_convert_input(a, self.channels_last) for a in args)
+        kwargs = {k: _convert_input(v, self.channels_last) for k, v in kwargs.items()}
+        with self.autocast():
+            output = self.model(*args, **kwargs)
+        return _to_float(output)
+
+
+def wrap_model(model, name: str, device: torch.device):
+    """
+    정밀도 설정에 맞게 모델을 한 번 변환/래핑 (fp32면 그대로 반환)
+
+    TorchScript 아티팩트(frozen)는 가중치가 상수로 고정되어 변환할 수 없으므로 fp32로 둡니다.
+    """
+    if model is None:
+        return model
+    device = torch.device(device)
+    mode = precision_for(name, device)
+    if mode == FP32:
+        return model
+    if isinstance(model, torch.jit.ScriptModule) or not isinstance(model, nn.Module):
+        logger.info(f"[Precision] {name}은 TorchScript 아티팩트라 fp32로 실행합니다")
+        return model
+
+    if mode == CHANNELS_LAST_BF16:
+        model = model.to(memory_format=torch.channels_last)
+    logger.info(f"[Precision] {name}: {mode}")
+    return PrecisionModule(model, mode, device.type)
+
+
+def model_precision(model) -> str:
+    """wrap_model() 결과의 정밀도 (fingerprint / 통계용)"""
+    return model.mode if isinstance(model, PrecisionModule) else FP32
+
+
+def describe(models: Dict[str, object]) -> str:
+    """fingerprint용 정밀도 문자열 (예: "cnn=fp32,vit=bf16")"""
+    return ",".join(f"{name}={model_precision(model)}" for name, model in models.items())
@@ -10,11 +10,31 @@ import torch
 import torch.nn as nn
 import torch.nn.functional as F
 
+from metrics import stage
+from weights_io import MODEL_LOAD_LEGACY, build_and_load, load_checkpoint
+from artifact_cache import default_cache
+from quantization import PREDICTION_QUANTIZE, quantize_ensemble, shares_cnn_backbone
+from precision import describe as describe_precision, wrap_model
+from onnx_backend import PREDICTION_BACKEND, build_onnx_ensemble
+from parallel_branches import build_branch_runner
+from image_io import open_rgb
+from preprocessing import INPUT_SIZE, PreparedImage, prepare_image
+
 logger = logging.getLogger(__name__)
 
 # gradcam_web_inference 모듈 import 시도
 try:
-    from gradcam_web_inference import generate_gradcam_overlay
+    from gradcam_web_inference import (
+        GradCAMPlusPlus,
+        generate_gradcam_overlay_with_model,
+        generate_gradcam_overlays_with_model,
+        forward_with_layer4_activations,
+        gradcampp_from_activations,
+        gradcampp_multi_from_activations,
+        apply_class_specific_threshold,
+        create_overlay_image,
+        denormalize_image,
+    )
     HAS_GRADCAM_MODULE = True
     logger.info("[Prediction] gradcam_web_inference 모듈 import 성공")
 except ImportError as e:
@@ -60,9 +80,25 @@ KOREAN_TO_ENGLISH = {
     "혈관종": "Vascular",
 }
 
-# ImageNet 정규화 상수
-MEAN = [0.485, 0.456, 0.406]
-STD = [0.229, 0.224, 0.225]
+# Confidence cascade 기준 (PREDICTION_CASCADE=1일 때 사용)
+# CNN 앙상블 예측 클래스별 (최소 최대 확률, 최소 top-2 확률 차이)
+# 두 기준을 모두 넘으면 ViT를 건너뛰고 CNN 확률을 그대로 사용합니다.
+# None이면 해당 클래스로 예측되어도 항상 ViT까지 실행 (악성 / 전암성 병변)
+CASCADE_THRESHOLDS = {
+    0: None,          # 광선 각화증 (AK)
+    1: None,          # 기저세포암 (BCC)
+    2: (0.95, 0.90),  # 양성 각화증 (BKL)
+    3: (0.95, 0.90),  # 피부섬유종 (DF)
+    4: None,          # 흑색종 (MEL)
+    5: (0.92, 0.85),  # 모반 (NV)
+    6: None,          # 편평세포암 (SCC)
+    7: (0.95, 0.90),  # 혈관종 (VASC)
+}
+
+# 응답의 inference_path 값 (어떤 경로로 확률을 계산했는지)
+PATH_CNN_ONLY = "cnn_only"          # cascade: CNN 앙상블만 실행 (ViT 생략)
+PATH_ENSEMBLE = "ensemble"          # CNN + ViT Soft Voting
+PATH_ENSEMBLE_TTA = "ensemble_tta"  # CNN + ViT Soft Voting + 테스트 시점 증강
 
 # 클래스 수
 NUM_CLASSES = 8
@@ -73,6 +109,72 @@ import os
 DEFAULT_CNN_WEIGHT = float(os.getenv('ENSEMBLE_CNN_WEIGHT', '0.5'))
 DEFAULT_VIT_WEIGHT = float(os.getenv('ENSEMBLE_VIT_WEIGHT', '0.5'))
 
+# GradCAM 결합 모드: 분류용 CNN forward 1회를 GradCAM++ backward에도 재사용
+# 환경변수로 변경 가능: GRADCAM_FUSED (기본값: 1, 0이면 분류와 GradCAM을 따로 실행)
+GRADCAM_FUSED = os.getenv('GRADCAM_FUSED', '1') == '1'
+
+# 요청당 top-k 클래스 GradCAM 최대 개수 (/predict?gradcam_top_k=k, forward 1회 + head backward k회)
+# 환경변수로 변경 가능: GRADCAM_TOP_K_MAX (기본값: 3)
+GRADCAM_TOP_K_MAX = int(os.getenv('GRADCAM_TOP_K_MAX', '3'))
+
+# 테스트 시점 증강(TTA): 전처리된 512x512 텐서 하나에서 뒤집기/회전 뷰를 만들어 한 배치로 추론 후 평균
+# 환경변수로 변경 가능:
+#   PREDICTION_TTA: off | always | uncertain (기본값: off, uncertain은 top-2 확률 차이가 작을 때만 실행)
+#   TTA_MARGIN_THRESHOLD: uncertain 모드 기준 top-2 확률 차이 (기본값: 0.15)
+#   TTA_VIEWS: 원본에 추가할 뷰 목록 (기본값: hflip,vflip,rot90,rot270)
+TTA_MODES = ("off", "always", "uncertain")
+PREDICTION_TTA = os.getenv('PREDICTION_TTA', 'off').strip().lower()
+TTA_MARGIN_THRESHOLD = float(os.getenv('TTA_MARGIN_THRESHOLD', '0.15'))
+TTA_VIEWS = [v.strip() for v in os.getenv('TTA_VIEWS', 'hflip,vflip,rot90,rot270').split(',') if v.strip()]
+
+# Confidence cascade: CNN 앙상블을 먼저 실행하고 CASCADE_THRESHOLDS를 통과하면 ViT를 건너뜀
+# 환경변수로 변경 가능: PREDICTION_CASCADE (기본값: 0)
+PREDICTION_CASCADE = os.getenv('PREDICTION_CASCADE', '0') == '1'
+
+_TTA_TRANSFORMS = {
+    "hflip": lambda x: torch.flip(x, dims=[3]),
+    "vflip": lambda x: torch.flip(x, dims=[2]),
+    "rot90": lambda x: torch.rot90(x, 1, dims=[2, 3]),
+    "rot180": lambda x: torch.rot90(x, 2, dims=[2, 3]),
+    "rot270": lambda x: torch.rot90(x, 3, dims=[2, 3]),
+}
+
+
+def build_tta_views(image_tensor: torch.Tensor, views: List[str], include_identity: bool = True) -> torch.Tensor:
+    """
+    전처리된 (1, 3, H, W) 텐서에서 증강 뷰 배치 생성 (V, 3, H, W)
+
+    ImageNet 정규화는 채널별 연산이라 뒤집기/회전과 순서를 바꿔도 같으므로 전처리를 다시 하지 않습니다.
+    """
+    batch = [image_tensor] if include_identity else []
+    batch.extend(_TTA_TRANSFORMS[view](image_tensor) for view in views)
+    return torch.cat(batch, dim=0)
+
+
+def top_k_classes(probs, k: int) -> List[int]:
+    """확률이 높은 순서의 클래스 인덱스 k개"""
+    if k <= 0:
+        return []
+    return [int(i) for i in np.argsort(-np.asarray(probs), kind="stable")[:k]]
+
+
+def top2_margin(probs: np.ndarray) -> float:
+    """가장 높은 두 클래스 확률의 차이"""
+    top2 = np.partition(np.asarray(probs), -2)[-2:]
+    return float(top2[1] - top2[0])
+
+
+def cascade_accepts(cnn_probs: np.ndarray, thresholds: Dict) -> np.ndarray:
+    """CNN 확률 (B, num_classes) 중 클래스별 기준을 통과해 ViT를 건너뛸 수 있는 행 (B,) bool"""
+    accepted = np.zeros(len(cnn_probs), dtype=bool)
+    for i, probs in enumerate(cnn_probs):
+        pred = int(np.argmax(probs))
+        threshold = thresholds.get(pred)
+        if threshold is not None:
+            min_prob, min_margin = threshold
+            accepted[i] = probs[pred] >= min_prob and top2_margin(probs) >= min_margin
+    return accepted
+
 
 class SoftVotingEnsemble(nn.Module):
     """Soft Voting 앙상블 모델 (CNN 앙상블 + ViT)"""
@@ -84,23 +186,35 @@ class SoftVotingEnsemble(nn.Module):
         # 가중치 정규화 (합이 1이 되도록)
         weight_sum = sum(weights)
         self.weights = [w / weight_sum for w in weights]
+        self.branch_runner = None  # 설정 시 CNN / ViT 브랜치를 동시에 실행 (ENSEMBLE_PARALLEL)
         logger.info(f"[Ensemble] Soft Voting 가중치: CNN={self.weights[0]:.2f}, ViT={self.weights[1]:.2f}")
         
-    def forward(self, x):
-        # CNN 앙상블 모델 예측
-        cnn_logits = self.cnn_model(x)
+    def combine(self, cnn_logits, vit_logits):
+        """CNN / ViT logits를 softmax 후 가중 평균"""
         cnn_probs = F.softmax(cnn_logits, dim=1)
-        
-        # ViT 모델 예측
-        vit_logits = self.vit_model(x)
         vit_probs = F.softmax(vit_logits, dim=1)
         
         # 가중 평균
-        ensemble_probs = self.weights[0] * cnn_probs + self.weights[1] * vit_probs
+        return self.weights[0] * cnn_probs + self.weights[1] * vit_probs
+        
+    def forward(self, x):
+        if self.branch_runner is not None:
+            # CNN / ViT 브랜치를 동시에 실행하고 가중 평균 전에 합침
+            cnn_future = self.branch_runner.submit("cnn", self.cnn_model, x)
+            vit_future = self.branch_runner.submit("vit", self.vit_model, x)
+            return self.combine(cnn_future.result(), vit_future.result())
+        
+        # CNN 앙상블 모델 예측
+        with stage("cnn"):
+            cnn_logits = self.cnn_model(x)
+        
+        # ViT 모델 예측
+        with stage("vit"):
+            vit_logits = self.vit_model(x)
         
         # 확률을 logits로 변환 (다음 단계에서 softmax를 다시 적용할 수 있도록)
         # 하지만 이미 확률이므로 그대로 반환
-        return ensemble_probs
+        return self.combine(cnn_logits, vit_logits)
 
 
 class PredictionPipeline:
@@ -119,16 +233,31 @@ class PredictionPipeline:
             models_dir: 모델 파일이 있는 디렉토리 경로
         """
         self.models_dir = models_dir
+        self.cnn_model_path = self.models_dir / "ensemble_finetune_best_60epochst.pt"
+        self.vit_model_path = self.models_dir / "vit_b16_512px_best_train_loss_86epochs.pt"
         self.model = None
         self.is_loaded = False
         self.device = None
         self.cnn_model = None
         self.vit_model = None
+        self.gradcampp = None  # cnn_model에 hook을 한 번만 등록해 재사용하는 GradCAM++
+        self.fused_gradcam = GRADCAM_FUSED and HAS_GRADCAM_MODULE
+        self.backend = "torch"  # Soft Voting 분류기 실행 백엔드 (PREDICTION_BACKEND: torch | onnx)
+        self.quantized = False  # INT8 동적 양자화 앙상블 사용 여부 (PREDICTION_QUANTIZE)
+        self.tta_mode = PREDICTION_TTA if PREDICTION_TTA in TTA_MODES else "off"
+        self.tta_views = [view for view in TTA_VIEWS if view in _TTA_TRANSFORMS]
+        self.tta_margin_threshold = TTA_MARGIN_THRESHOLD
+        self.cascade = PREDICTION_CASCADE  # CNN 확신 시 ViT 생략 (PREDICTION_CASCADE)
+        self.cascade_thresholds = dict(CASCADE_THRESHOLDS)
+        self.precision = "cnn=fp32,vit=fp32"  # 적용된 추론 정밀도 (INFERENCE_PRECISION)
     
     def _build_combined_model(self, state_dict, device):
         """
         combined_resnet50_effnetb4 모델 아키텍처 정의
         gradcam_visualization.py의 EnsembleModel 구조를 그대로 사용
+
+        백본은 사전학습 가중치 없이 만들고 (체크포인트가 곧바로 덮어쓰므로) meta 디바이스에서
+        체크포인트 텐서를 그대로 할당합니다. MODEL_LOAD_LEGACY=1이면 기존처럼 IMAGENET1K_V1로 생성합니다.
         """
         import torch
         import torch.nn as nn
@@ -141,31 +270,31 @@ class PredictionPipeline:
         
         # gradcam_visualization.py의 EnsembleModel 구조를 그대로 사용
         class EnsembleModel(nn.Module):
-            def __init__(self, num_classes=8):  # 기본 8개 클래스
+            def __init__(self, num_classes=8, pretrained=False):  # 기본 8개 클래스
                 super(EnsembleModel, self).__init__()
                 
                 # ResNet50 (백본 A) - gradcam_visualization.py와 동일
                 try:
                     from torchvision.models import ResNet50_Weights
-                    self.model_A = models.resnet50(weights=ResNet50_Weights.IMAGENET1K_V1)
+                    self.model_A = models.resnet50(weights=ResNet50_Weights.IMAGENET1K_V1 if pretrained else None)
                 except:
-                    self.model_A = models.resnet50(pretrained=True)
+                    self.model_A = models.resnet50(pretrained=pretrained)
                 self.model_A.fc = nn.Identity()
                 
                 # EfficientNetB4 (백본 B) - gradcam_visualization.py와 동일
                 try:
                     from torchvision.models import EfficientNet_B4_Weights
-                    self.model_B = models.efficientnet_b4(weights=EfficientNet_B4_Weights.IMAGENET1K_V1)
+                    self.model_B = models.efficientnet_b4(weights=EfficientNet_B4_Weights.IMAGENET1K_V1 if pretrained else None)
                     num_ftrs_b = self.model_B.classifier[1].in_features
                     self.model_B.classifier = nn.Identity()
                 except:
                     try:
                         import timm
-                        self.model_B = timm.create_model('efficientnet_b4', pretrained=True, num_classes=0)
+                        self.model_B = timm.create_model('efficientnet_b4', pretrained=pretrained, num_classes=0)
                         num_ftrs_b = 1792
                     except ImportError:
                         logger.warning("[Prediction] timm이 없어 EfficientNet-B0로 대체합니다.")
-                        self.model_B = models.efficientnet_b0(pretrained=True)
+                        self.model_B = models.efficientnet_b0(pretrained=pretrained)
                         num_ftrs_b = 1280
                         self.model_B.classifier = nn.Identity()
                 
@@ -209,17 +338,20 @@ class PredictionPipeline:
                     num_classes = weight_shape[0]
                     logger.info(f"[Prediction] state_dict에서 num_classes 추론 (마지막 레이어): {num_classes} (키: {last_key})")
         
-        model = EnsembleModel(num_classes=num_classes)
-        
         # state_dict 로드 (strict=False로 일부 키가 맞지 않아도 로드)
         try:
             # 먼저 ResNet 백본과 EfficientNet 백본 가중치는 그대로 로드
-            model.load_state_dict(state_dict, strict=False)
+            model = build_and_load(
+                lambda: EnsembleModel(num_classes=num_classes, pretrained=MODEL_LOAD_LEGACY),
+                state_dict,
+                strict=False,
+            )
             
             logger.info("[Prediction] state_dict 로드 완료 (strict=False, 앙상블 모델)")
         except Exception as e:
             logger.warning(f"[Prediction] state_dict 로드 중 일부 키 불일치 (무시): {e}")
             # 일부 키만 로드 시도
+            model = EnsembleModel(num_classes=num_classes, pretrained=MODEL_LOAD_LEGACY)
             model_dict = model.state_dict()
             pretrained_dict = {k: v for k, v in state_dict.items() if k in model_dict and model_dict[k].shape == v.shape}
             
@@ -229,10 +361,13 @@ class PredictionPipeline:
         
         return model
     
-    def _get_vit_model_512(self, num_classes: int) -> nn.Module:
+    def _get_vit_model_512(self, num_classes: int, pretrained: bool = False) -> nn.Module:
         """
         ViT-B/16 모델 생성 (512px 입력 크기)
         Positional Embedding을 224px에서 512px로 interpolation
+
+        pretrained=False면 사전학습 가중치 없이 만들고, 체크포인트가 덮어쓸 512px Positional Embedding
+        자리만 만듭니다 (meta 디바이스 생성 시 보간 연산 생략).
         """
         import math
         from torchvision.models import vit_b_16, ViT_B_16_Weights
@@ -240,9 +375,20 @@ class PredictionPipeline:
         logger.info("[Prediction] ViT-B/16 구조 생성 및 512px 리사이징 (Interpolation) 수행...")
         
         # 1. 기본 모델 로드
-        model = vit_b_16(weights=ViT_B_16_Weights.IMAGENET1K_V1)
+        model = vit_b_16(weights=ViT_B_16_Weights.IMAGENET1K_V1 if pretrained else None)
         model.image_size = 512
         
+        if not pretrained:
+            grid_size_new = 512 // 16
+            hidden_dim = model.encoder.pos_embedding.shape[-1]
+            model.encoder.pos_embedding = nn.Parameter(
+                torch.empty(1, grid_size_new * grid_size_new + 1, hidden_dim).normal_(std=0.02)
+            )
+            in_features = model.heads.head.in_features
+            model.heads.head = nn.Linear(in_features, num_classes)
+            logger.info(f"[Prediction] ViT-B/16 모델 생성 완료 (512px, {num_classes} classes, 사전학습 가중치 없음)")
+            return model
+        
         # 2. Positional Embedding Interpolation (224 -> 512)
         pos_embed_old = model.encoder.pos_embedding
         
@@ -288,14 +434,8 @@ class PredictionPipeline:
         """CNN 앙상블 모델 로드"""
         logger.info(f"[Prediction] CNN 앙상블 모델 로드 시작: {model_path}")
         
-        checkpoint = torch.load(model_path, map_location=device, weights_only=False)
-        
-        # state_dict 추출
-        if isinstance(checkpoint, dict) and 'model_state_dict' in checkpoint:
-            state_dict = checkpoint['model_state_dict']
-            logger.info(f"[Prediction] 체크포인트에서 model_state_dict 발견")
-        else:
-            state_dict = checkpoint
+        # state_dict 추출 (mmap 또는 safetensors, model_state_dict / DataParallel 접두사 처리 포함)
+        state_dict, _ = load_checkpoint(model_path)
         
         # 모델 아키텍처 정의 및 로드
         model = self._build_combined_model(state_dict, device)
@@ -309,27 +449,16 @@ class PredictionPipeline:
         """ViT 모델 로드"""
         logger.info(f"[Prediction] ViT 모델 로드 시작: {model_path}")
         
-        # ViT 모델 생성 (512px 구조)
-        model = self._get_vit_model_512(NUM_CLASSES)
-        model = model.to(device)
-        
-        checkpoint = torch.load(model_path, map_location=device, weights_only=False)
+        # state_dict 추출 (mmap 또는 safetensors, model_state_dict / DataParallel 접두사 처리 포함)
+        state_dict, _ = load_checkpoint(model_path)
         
-        # state_dict 추출
-        state_dict = None
-        if isinstance(checkpoint, dict) and 'model_state_dict' in checkpoint:
-            state_dict = checkpoint['model_state_dict']
-            logger.info(f"[Prediction] 체크포인트에서 model_state_dict 발견")
-        else:
-            state_dict = checkpoint
-        
-        # DataParallel 키 처리
-        new_state_dict = {}
-        for k, v in state_dict.items():
-            name = k.replace("module.", "") if k.startswith("module.") else k
-            new_state_dict[name] = v
-        
-        model.load_state_dict(new_state_dict, strict=False)
+        # ViT 모델 생성 (512px 구조) 후 체크포인트 할당
+        model = build_and_load(
+            lambda: self._get_vit_model_512(NUM_CLASSES, pretrained=MODEL_LOAD_LEGACY),
+            state_dict,
+            strict=False,
+            device=device,
+        )
         model.eval()
         
         logger.info("[Prediction] ✅ ViT 모델 로드 완료")
@@ -344,8 +473,8 @@ class PredictionPipeline:
         logger.info(f"[Prediction] 모델 디렉토리: {self.models_dir}")
         
         # 모델 파일 경로 확인
-        cnn_model_path = self.models_dir / "ensemble_finetune_best_60epochst.pt"
-        vit_model_path = self.models_dir / "vit_b16_512px_best_train_loss_86epochs.pt"
+        cnn_model_path = self.cnn_model_path
+        vit_model_path = self.vit_model_path
         
         if not cnn_model_path.exists():
             logger.error(f"[Prediction] CNN 앙상블 모델 파일을 찾을 수 없습니다: {cnn_model_path}")
@@ -373,8 +502,13 @@ class PredictionPipeline:
             logger.info("[Prediction] ========== 하이브리드 모델 로드 시작 ==========")
             self.cnn_model = self._load_cnn_ensemble_model(cnn_model_path, device)
             
-            # 2. ViT 모델 로드
-            self.vit_model = self._load_vit_model(vit_model_path, device)
+            # 2. ViT 모델 로드 (사전 빌드된 TorchScript 아티팩트가 있으면 우선 사용)
+            artifacts = default_cache()
+            loaded = artifacts.load("vit", [vit_model_path], device) if artifacts else None
+            if loaded is not None:
+                self.vit_model = loaded[0]
+            else:
+                self.vit_model = self._load_vit_model(vit_model_path, device)
             
             # 3. Soft Voting 앙상블 생성
             logger.info("[Prediction] Soft Voting 앙상블 모델 생성 중...")
@@ -387,6 +521,59 @@ class PredictionPipeline:
             self.model = self.model.to(device)
             self.model.eval()
             
+            # 3-1. ONNX Runtime 백엔드 (선택, PyTorch 대비 확률 차이 검증 통과 시에만)
+            #      self.cnn_model은 GradCAM++ backward를 위해 PyTorch FP32로 유지
+            if PREDICTION_BACKEND == "onnx":
+                onnx_model = build_onnx_ensemble(self)
+                if onnx_model is not None:
+                    self.model = onnx_model
+                    self.vit_model = onnx_model.vit_model
+                    self.backend = "onnx"
+            
+            # 3-2. INT8 동적 양자화 (선택, 보정 이미지 top-1 일치율 검증 통과 시에만)
+            #      self.cnn_model은 GradCAM++ backward를 위해 FP32로 유지
+            if PREDICTION_QUANTIZE and self.backend == "torch":
+                quantized = quantize_ensemble(self)
+                if quantized is not None:
+                    self.model, self.vit_model = quantized
+                    self.quantized = True
+                    logger.info("[Prediction] INT8 동적 양자화 앙상블 사용")
+            
+            # 3-3. 추론 정밀도 (INFERENCE_PRECISION, 모델별 INFERENCE_PRECISION_CNN / _VIT)
+            #      CNN은 Soft Voting 경로만 래핑하고 GradCAM++용 self.cnn_model은 fp32로 계산
+            #      (channels_last 변환은 같은 모듈에 적용되므로 GradCAM도 channels_last 가중치 사용)
+            if self.quantized or self.backend != "torch":
+                logger.info("[Prediction] ONNX / INT8 양자화 모드에서는 bf16 정밀도 설정을 적용하지 않습니다")
+            else:
+                cnn_for_voting = wrap_model(self.cnn_model, "cnn", device)
+                self.vit_model = wrap_model(self.vit_model, "vit", device)
+                if cnn_for_voting is not self.cnn_model or self.vit_model is not self.model.vit_model:
+                    self.model = SoftVotingEnsemble(
+                        cnn_model=cnn_for_voting,
+                        vit_model=self.vit_model,
+                        num_classes=NUM_CLASSES,
+                        weights=self.model.weights,
+                    ).eval()
+            self.precision = describe_precision({"cnn": self.model.cnn_model, "vit": self.model.vit_model})
+            
+            if (
+                self.fused_gradcam
+                and self.model.cnn_model is not self.cnn_model
+                and not shares_cnn_backbone(self.model.cnn_model, self.cnn_model)
+            ):
+                logger.info(
+                    f"[Prediction] GradCAM 결합 모드: 확률은 {self.backend} / {self.precision} 경로로 계산하고 "
+                    f"GradCAM++ backward만 FP32 cnn_model로 실행합니다 (CNN forward 추가 1회)"
+                )
+            
+            # 3-4. CNN / ViT 브랜치 동시 실행 (선택, ENSEMBLE_PARALLEL, CPU 전용)
+            self.model.branch_runner = build_branch_runner(device)
+            
+            # 4. GradCAM++ 준비 (이미 로드된 CNN 앙상블을 재사용, 체크포인트 재로딩 없음)
+            if HAS_GRADCAM_MODULE:
+                self.gradcampp = GradCAMPlusPlus(self.cnn_model, self.cnn_model.model_A.layer4)
+                logger.info("[Prediction] GradCAM++ hook 등록 완료 (cnn_model.model_A.layer4)")
+            
             logger.info("[Prediction] ✅ 하이브리드 모델 로드 완료 (CNN 앙상블 + ViT)")
             self.is_loaded = True
         except Exception as e:
@@ -438,13 +625,496 @@ class PredictionPipeline:
             korean_probs[korean_name] = prob
         return korean_probs
     
-    def predict(self, image_bytes: bytes, generate_gradcam: bool = False) -> Dict:
+    def load_image(self, image_bytes: bytes):
+        """
+        이미지 바이트를 RGB PIL Image로 변환
+        
+        Args:
+            image_bytes: 이미지 바이트 데이터 (또는 읽기 전용 mmap)
+            
+        Returns:
+            RGB PIL Image
+        """
+        with stage("predict_decode"):
+            # 큰 JPEG는 두 변이 모두 모델 입력 크기 이상인 가장 작은 배율로 축소 디코딩
+            image = open_rgb(image_bytes, min_size=(INPUT_SIZE, INPUT_SIZE))
+        logger.info(f"[Prediction] [1/3] 이미지 로드 완료: {image.size}")
+        return image
+    
+    def prepare(self, image, out: Optional[np.ndarray] = None) -> PreparedImage:
+        """
+        RGB PIL Image 또는 uint8 array를 모델 입력 텐서 + GradCAM 오버레이 배경으로 변환
+        (512x512, ImageNet 정규화, preprocessing.prepare_image)
+        
+        Args:
+            image: RGB PIL Image 또는 uint8 (H, W, 3) array
+            out: 정규화 결과를 기록할 배치 버퍼의 한 행 (3, 512, 512) (None이면 새로 할당)
+        """
+        logger.info("[Prediction] [2/3] 이미지 전처리 시작")
+        with stage("predict_preprocess"):
+            prepared = prepare_image(image, self.device, out=out)
+        logger.info(f"[Prediction] [2/3] 이미지 전처리 완료: {prepared.tensor.shape}")
+        return prepared
+    
+    def preprocess(self, image) -> torch.Tensor:
+        """
+        PIL Image를 모델 입력 텐서로 변환 (512x512, ImageNet 정규화)
+        
+        Args:
+            image: RGB PIL Image
+            
+        Returns:
+            전처리된 텐서 (1, 3, 512, 512), self.device에 위치
+        """
+        return self.prepare(image).tensor
+    
+    def prepare_input(self, image_bytes: bytes, out: Optional[np.ndarray] = None) -> Tuple[PreparedImage, torch.Tensor]:
+        """
+        이미지 바이트를 디코딩하고 전처리까지 수행 (배치 큐 제출용)
+        
+        Returns:
+            (전처리 결과 (GradCAM에서 재사용), 전처리된 텐서 (1, 3, 512, 512))
+        """
+        if not self.is_loaded:
+            raise RuntimeError("모델이 로드되지 않았습니다. load_model()을 먼저 호출하세요.")
+        
+        prepared = self.prepare(self.load_image(image_bytes), out)
+        return prepared, prepared.tensor
+    
+    def prepare_array(self, rgb: np.ndarray) -> Tuple[PreparedImage, torch.Tensor]:
+        """
+        이미 디코딩된 RGB numpy array를 전처리 (인코딩/디코딩 없이 메모리에서 바로 사용)
+        
+        Args:
+            rgb: RGB 이미지 (H, W, 3) uint8
+            
+        Returns:
+            (전처리 결과 (GradCAM에서 재사용), 전처리된 텐서 (1, 3, 512, 512))
+        """
+        if not self.is_loaded:
+            raise RuntimeError("모델이 로드되지 않았습니다. load_model()을 먼저 호출하세요.")
+        
+        logger.info(f"[Prediction] [1/3] 메모리 이미지 사용: {rgb.shape[1]}x{rgb.shape[0]}")
+        prepared = self.prepare(rgb)
+        return prepared, prepared.tensor
+    
+    def predict_probs(self, image_tensor: torch.Tensor) -> np.ndarray:
+        """
+        전처리된 배치 텐서를 Soft Voting 앙상블로 한 번에 추론
+        
+        Args:
+            image_tensor: 전처리된 텐서 (B, 3, 512, 512)
+            
+        Returns:
+            앙상블 확률 numpy array (B, num_classes)
+        """
+        if not self.is_loaded:
+            raise RuntimeError("모델이 로드되지 않았습니다. load_model()을 먼저 호출하세요.")
+        
+        logger.info(f"[Prediction] [3/3] 하이브리드 모델 예측 시작 (CNN + ViT, 배치 크기: {image_tensor.shape[0]})")
+        with torch.no_grad():
+            # Soft Voting 앙상블은 이미 확률을 반환함
+            ensemble_probs = self.model(image_tensor.to(self.device))
+            if len(ensemble_probs.shape) == 1:
+                ensemble_probs = ensemble_probs.unsqueeze(0)
+            return ensemble_probs.cpu().numpy()
+    
+    def predict_probs_with_paths(
+        self,
+        image_tensor: torch.Tensor,
+        cascade: Optional[bool] = None,
+    ) -> Tuple[np.ndarray, List[str]]:
+        """
+        전처리된 배치 텐서를 추론하고 행별 추론 경로를 함께 반환
+        
+        cascade 모드에서는 CNN 앙상블을 먼저 실행하고, CASCADE_THRESHOLDS를 통과한 행은
+        CNN 확률을 그대로 사용합니다. 나머지 행만 ViT를 실행해 기존과 같이 Soft Voting합니다.
+        
+        Args:
+            image_tensor: 전처리된 텐서 (B, 3, 512, 512)
+            cascade: cascade 사용 여부 (None이면 PREDICTION_CASCADE 설정)
+            
+        Returns:
+            (앙상블 확률 numpy array (B, num_classes), 행별 추론 경로 목록)
+        """
+        cascade = self.cascade if cascade is None else cascade
+        if not cascade:
+            probs_np = self.predict_probs(image_tensor)
+            return probs_np, [PATH_ENSEMBLE] * len(probs_np)
+        if not self.is_loaded:
+            raise RuntimeError("모델이 로드되지 않았습니다. load_model()을 먼저 호출하세요.")
+        
+        logger.info(f"[Prediction] [3/3] cascade 예측 시작 (CNN 우선, 배치 크기: {image_tensor.shape[0]})")
+        with torch.no_grad():
+            image_tensor = image_tensor.to(self.device)
+            with stage("cnn"):
+                cnn_logits = self.model.cnn_model(image_tensor)
+            probs_np = F.softmax(cnn_logits.float(), dim=1).cpu().numpy()
+            accepted = cascade_accepts(probs_np, self.cascade_thresholds)
+            rest = np.flatnonzero(~accepted)
+            if len(rest):
+                index = torch.as_tensor(rest, device=image_tensor.device)
+                with stage("vit"):
+                    vit_logits = self.model.vit_model(image_tensor.index_select(0, index))
+                cnn_rest = cnn_logits.index_select(0, index.to(cnn_logits.device))
+                probs_np[rest] = self.model.combine(cnn_rest, vit_logits).float().cpu().numpy()
+        logger.info(f"[Prediction] [3/3] cascade: ViT 생략 {int(accepted.sum())}/{len(accepted)}장")
+        return probs_np, [PATH_CNN_ONLY if skip else PATH_ENSEMBLE for skip in accepted]
+    
+    def predict_probs_tta(self, image_tensor: torch.Tensor, base_probs: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        증강 뷰를 한 배치로 만들어 CNN / ViT를 각각 한 번씩 실행하고 확률을 평균
+        
+        Soft Voting은 확률의 가중 합(선형)이므로 뷰별 앙상블 확률의 평균은
+        모델별 확률을 먼저 평균한 뒤 Soft Voting한 값과 같습니다.
+        
+        Args:
+            image_tensor: 전처리된 텐서 (1, 3, 512, 512)
+            base_probs: 원본 뷰의 앙상블 확률 (이미 계산했으면 원본 뷰는 다시 실행하지 않음)
+            
+        Returns:
+            평균 앙상블 확률 numpy array (num_classes,)
+        """
+        views = build_tta_views(image_tensor, self.tta_views, include_identity=base_probs is None)
+        with stage("tta"):
+            view_probs = self.predict_probs(views)
+        if base_probs is not None:
+            view_probs = np.concatenate([np.asarray(base_probs)[None, :], view_probs], axis=0)
+        logger.info(f"[Prediction] TTA 적용 ({len(view_probs)}개 뷰)")
+        return view_probs.mean(axis=0)
+    
+    def apply_tta(self, image_tensor: torch.Tensor, probs_np: np.ndarray, tta: Optional[str] = None) -> np.ndarray:
+        """
+        원본 뷰 확률에 TTA 모드를 적용 (off면 그대로, uncertain이면 top-2 차이가 작을 때만)
+        
+        Args:
+            image_tensor: 전처리된 텐서 (1, 3, 512, 512)
+            probs_np: 원본 뷰의 앙상블 확률 (num_classes,)
+            tta: off | always | uncertain (None이면 PREDICTION_TTA 설정)
+        """
+        tta = self.tta_mode if tta is None else tta
+        if tta == "off" or not self.tta_views:
+            return probs_np
+        if tta == "uncertain":
+            margin = top2_margin(probs_np)
+            if margin >= self.tta_margin_threshold:
+                return probs_np
+            logger.info(f"[Prediction] top-2 확률 차이 {margin:.3f} < {self.tta_margin_threshold:.3f}, TTA 실행")
+        return self.predict_probs_tta(image_tensor, base_probs=probs_np)
+    
+    def apply_tta_for_path(
+        self,
+        image_tensor: torch.Tensor,
+        probs_np: np.ndarray,
+        path: str,
+        tta: Optional[str] = None,
+    ) -> Tuple[np.ndarray, str]:
+        """
+        추론 경로를 반영해 TTA 적용 → (확률, 최종 추론 경로)
+        
+        cascade에서 CNN만으로 확정된 입력은 이미 확신이 높으므로 TTA를 실행하지 않습니다.
+        """
+        if path == PATH_CNN_ONLY:
+            return probs_np, path
+        tta_probs = self.apply_tta(image_tensor, probs_np, tta)
+        return tta_probs, (PATH_ENSEMBLE if tta_probs is probs_np else PATH_ENSEMBLE_TTA)
+    
+    def _voting_cnn_logits(
+        self,
+        image_tensor: torch.Tensor,
+        cnn_logits: torch.Tensor,
+        features: Optional[torch.Tensor] = None,
+    ) -> torch.Tensor:
+        """
+        결합 모드에서 Soft Voting / cascade에 쓸 CNN logits (요청 배치 경로와 같은 백엔드)
+        
+        self.model.cnn_model이 GradCAM용 FP32 self.cnn_model 그대로면 결합 forward의 logits를 재사용합니다.
+        INT8 양자화 CNN(백본 공유, 분류기만 INT8)이면 결합 forward의 분류기 입력 특징에 INT8 분류기만 실행하고,
+        ONNX / bf16 등 다른 실행 경로면 그 경로로 한 번 더 실행합니다 (GradCAM backward만 FP32 eager).
+        """
+        voting_cnn = self.model.cnn_model
+        if voting_cnn is self.cnn_model:
+            return cnn_logits.detach()
+        if features is not None and shares_cnn_backbone(voting_cnn, self.cnn_model):
+            return voting_cnn.classifier(features)
+        with stage("cnn_voting"):
+            return voting_cnn(image_tensor)
+    
+    def _predict_fused(
+        self,
+        image_tensor: torch.Tensor,
+        cascade: bool = False,
+        display: Optional[np.ndarray] = None,
+        gradcam_top_k: int = 0,
+    ) -> Tuple[np.ndarray, Optional[bytes], str, Optional[Dict[int, bytes]]]:
+        """
+        CNN forward 1회로 Soft Voting 확률과 GradCAM++를 함께 계산
+        
+        layer4 activation을 캡처한 CNN logits를 Soft Voting에 그대로 사용하고,
+        같은 그래프(layer4 → 분류기)로 GradCAM++ backward를 수행합니다.
+        Soft Voting용 CNN이 ONNX / bf16 등 다른 실행 경로면 확률은 그 경로로 계산합니다 (_voting_cnn_logits).
+        
+        Args:
+            image_tensor: 전처리된 텐서 (1, 3, 512, 512)
+            cascade: CNN 확률이 CASCADE_THRESHOLDS를 통과하면 ViT 생략
+            display: 전처리 단계의 리사이즈된 uint8 이미지 (오버레이 배경, None이면 텐서를 역정규화)
+            gradcam_top_k: 0보다 크면 앙상블 확률 top-k 클래스의 GradCAM도 같은 activation으로 함께 계산
+            
+        Returns:
+            (앙상블 확률 numpy array (num_classes,), GradCAM PNG 바이트 또는 None, 추론 경로,
+             top-k 클래스별 GradCAM PNG {클래스 인덱스: 바이트} 또는 None)
+        """
+        image_tensor = image_tensor.to(self.device)
+        logger.info("[Prediction] [3/3] 하이브리드 모델 예측 시작 (CNN + ViT, GradCAM 결합 모드)")
+        
+        runner = None if cascade else self.model.branch_runner
+        vit_future = None
+        if runner is not None:
+            # ViT를 먼저 브랜치 스레드에 넘기고 GradCAM용 CNN forward와 동시에 실행
+            with torch.no_grad():
+                vit_future = runner.submit("vit", self.vit_model, image_tensor)
+            cnn_logits, activations, features = runner.submit(
+                "cnn", forward_with_layer4_activations, self.cnn_model, image_tensor, True
+            ).result()
+        else:
+            with stage("cnn"):
+                cnn_logits, activations, features = forward_with_layer4_activations(
+                    self.cnn_model, image_tensor, return_features=True
+                )
+        with torch.no_grad():
+            voting_logits = self._voting_cnn_logits(image_tensor, cnn_logits, features)
+            cnn_probs = F.softmax(voting_logits.float(), dim=1).cpu().numpy()
+            if cascade and cascade_accepts(cnn_probs, self.cascade_thresholds)[0]:
+                probs_np, path = cnn_probs[0], PATH_CNN_ONLY
+                logger.info("[Prediction] [3/3] cascade: CNN 확신 기준 통과, ViT 생략")
+            else:
+                if vit_future is not None:
+                    vit_logits = vit_future.result()
+                else:
+                    with stage("vit"):
+                        vit_logits = self.vit_model(image_tensor)
+                probs_np, path = self.model.combine(voting_logits, vit_logits)[0].cpu().numpy(), PATH_ENSEMBLE
+        
+        grad_cam_bytes = None
+        class_grad_cams = None
+        try:
+            # GradCAM 타깃은 기존과 동일하게 CNN 앙상블의 예측 클래스
+            with stage("gradcam"):
+                pred_class = int(torch.argmax(cnn_logits, dim=1).item())
+                background = display if display is not None else denormalize_image(image_tensor)
+                if gradcam_top_k > 0:
+                    # 예측 클래스 + 앙상블 top-k 클래스를 같은 activation에서 batched backward로 계산
+                    top_classes = top_k_classes(probs_np, gradcam_top_k)
+                    heatmaps = gradcampp_multi_from_activations(cnn_logits, activations, [pred_class, *top_classes])
+                    pngs = {
+                        class_index: self._overlay_to_png(
+                            create_overlay_image(background, apply_class_specific_threshold(heatmap, class_index))
+                        )
+                        for class_index, heatmap in heatmaps.items()
+                    }
+                    grad_cam_bytes = pngs[pred_class]
+                    class_grad_cams = {class_index: pngs[class_index] for class_index in top_classes}
+                else:
+                    heatmap = gradcampp_from_activations(cnn_logits, activations, pred_class)
+                    heatmap_processed = apply_class_specific_threshold(heatmap, pred_class)
+                    overlay_image = create_overlay_image(background, heatmap_processed)
+                    grad_cam_bytes = self._overlay_to_png(overlay_image)
+            logger.info(f"[GradCAM] 결합 모드 GradCAM 생성 완료: {len(grad_cam_bytes) if grad_cam_bytes else 0} bytes")
+        except Exception as e:
+            logger.error(f"[GradCAM] 결합 모드 GradCAM 생성 실패: {e}", exc_info=True)
+        finally:
+            del cnn_logits, activations, features
+        
+        return probs_np, grad_cam_bytes, path, class_grad_cams
+    
+    def predict_prepared(
+        self,
+        image,
+        image_tensor: torch.Tensor,
+        generate_gradcam: bool = False,
+        tta: Optional[str] = None,
+        gradcam_top_k: int = 0,
+    ) -> Dict:
+        """
+        전처리된 단일 입력으로 분류 (+GradCAM) 수행
+        
+        GradCAM 결합 모드(GRADCAM_FUSED)에서는 CNN을 한 번만 실행하고,
+        아니면 앙상블 추론 후 GradCAM을 따로 생성합니다.
+        GradCAM은 TTA와 관계없이 원본 뷰 기준으로 생성합니다.
+        TTA always 모드에서는 cascade를 사용하지 않습니다.
+        
+        Args:
+            tta: off | always | uncertain (None이면 PREDICTION_TTA 설정)
+            gradcam_top_k: 0보다 크면 확률 top-k 클래스별 GradCAM도 생성 (결합 모드는 TTA 전 확률 기준)
+        """
+        gradcam_top_k = gradcam_top_k if generate_gradcam else 0
+        tta = self.tta_mode if tta is None else tta
+        tta_always = tta == "always" and bool(self.tta_views)
+        cascade = self.cascade and not tta_always
+        if generate_gradcam and self.fused_gradcam:
+            display = image.display if isinstance(image, PreparedImage) else None
+            probs_np, grad_cam_bytes, path, class_grad_cams = self._predict_fused(
+                image_tensor, cascade, display, gradcam_top_k
+            )
+            probs_np, path = self.apply_tta_for_path(image_tensor, probs_np, path, tta)
+            return self.build_result(
+                probs_np, image=image, grad_cam_bytes=grad_cam_bytes, inference_path=path,
+                class_grad_cams=class_grad_cams,
+            )
+        
+        if tta_always:
+            # 원본 + 증강 뷰를 한 배치로 실행
+            probs_np, path = self.predict_probs_tta(image_tensor), PATH_ENSEMBLE_TTA
+        else:
+            # 모델 예측 (Soft Voting 앙상블 / cascade) - 배치 차원 제거 (첫 번째 샘플만 사용)
+            probs, paths = self.predict_probs_with_paths(image_tensor, cascade)
+            probs_np, path = self.apply_tta_for_path(image_tensor, probs[0], paths[0], tta)
+        return self.build_result(
+            probs_np, image=image, generate_gradcam=generate_gradcam, inference_path=path,
+            gradcam_top_k=gradcam_top_k,
+        )
+    
+    def predict_prepared_batch(
+        self,
+        images: List,
+        image_tensors: List[torch.Tensor],
+        gradcam_flags: List[bool],
+        batch_buffer: Optional[np.ndarray] = None,
+    ) -> List[Dict]:
+        """
+        전처리된 여러 입력을 한 배치로 분류 (GradCAM은 항목별 선택, /predict/batch용)
+        
+        Args:
+            images: 전처리 결과 목록 (GradCAM 생성 시 필요)
+            image_tensors: 전처리된 텐서 목록 (각각 (1, 3, 512, 512))
+            gradcam_flags: 항목별 GradCAM 생성 여부
+            batch_buffer: image_tensors가 순서대로 기록된 배치 버퍼 (B, 3, 512, 512) (있으면 torch.cat 생략)
+            
+        Returns:
+            predict()와 동일한 형식의 결과 딕셔너리 목록 (입력 순서)
+        """
+        if self.tta_mode == "always" and self.tta_views:
+            # 항목마다 원본 + 증강 뷰가 이미 한 배치
+            probs_list = [self.predict_probs_tta(tensor) for tensor in image_tensors]
+            paths = [PATH_ENSEMBLE_TTA] * len(image_tensors)
+        else:
+            if batch_buffer is not None:
+                batch_tensor = torch.from_numpy(batch_buffer)
+            else:
+                batch_tensor = torch.cat(image_tensors, dim=0)
+            probs, paths = self.predict_probs_with_paths(batch_tensor)
+            probs_list = list(probs)
+            for i, tensor in enumerate(image_tensors):
+                probs_list[i], paths[i] = self.apply_tta_for_path(tensor, probs_list[i], paths[i])
+        
+        return [
+            self.build_result(probs_np, image=image, generate_gradcam=flag, inference_path=path)
+            for probs_np, image, flag, path in zip(probs_list, images, gradcam_flags, paths)
+        ]
+    
+    def build_result(
+        self,
+        probs_np: np.ndarray,
+        image=None,
+        generate_gradcam: bool = False,
+        grad_cam_bytes: Optional[bytes] = None,
+        inference_path: Optional[str] = None,
+        gradcam_top_k: int = 0,
+        class_grad_cams: Optional[Dict[int, bytes]] = None,
+    ) -> Dict:
+        """
+        단일 이미지의 앙상블 확률로 응답 딕셔너리 생성 (한국어 매핑, 위험도, GradCAM)
+        
+        Args:
+            probs_np: 앙상블 확률 numpy array (num_classes,)
+            image: 전처리 결과 PreparedImage 또는 원본 PIL Image (GradCAM 생성 시 필요)
+            generate_gradcam: GradCAM 생성 여부
+            grad_cam_bytes: 이미 생성된 GradCAM PNG 바이트 (결합 모드)
+            inference_path: 확률 계산 경로 (cnn_only | ensemble | ensemble_tta | cached)
+            gradcam_top_k: 0보다 크면 확률 top-k 클래스별 GradCAM도 생성 (generate_gradcam일 때)
+            class_grad_cams: 이미 생성된 클래스별 GradCAM PNG {클래스 인덱스: 바이트} (결합 모드)
+            
+        Returns:
+            predict()와 동일한 형식의 결과 딕셔너리
+        """
+        logger.info(f"[Prediction] [3/3] 앙상블 확률 분포: {probs_np}")
+        
+        # 클래스 인덱스를 확률로 변환
+        # 모델은 8개 클래스만 분류함
+        num_classes = len(probs_np)
+        logger.info(f"[Prediction] [3/3] 예측된 클래스 수: {num_classes}")
+        
+        # 모델 출력이 8개가 아니면 에러
+        if num_classes != 8:
+            logger.error(f"[Prediction] [3/3] 모델 출력이 8개가 아닙니다: {num_classes}개")
+            raise ValueError(f"모델 출력이 8개 클래스가 아닙니다. 실제 출력: {num_classes}개")
+        
+        # 클래스 인덱스를 딕셔너리로 변환 (8개만)
+        raw_class_probs = {i: float(probs_np[i]) for i in range(8)}
+        logger.info(f"[Prediction] [3/3] 원시 확률 (8개): {raw_class_probs}")
+        
+        # 한국어로 변환
+        korean_class_probs = self._convert_class_probs_to_korean(raw_class_probs)
+        logger.info(f"[Prediction] [3/3] 한국어 변환된 확률: {korean_class_probs}")
+        
+        # 가장 높은 확률의 질병 찾기
+        if not korean_class_probs:
+            raise ValueError("예측 결과가 비어있습니다.")
+        
+        max_class = max(korean_class_probs.items(), key=lambda x: x[1])
+        disease_name_ko = max_class[0]
+        disease_name_en = self._map_to_english(disease_name_ko)
+        
+        logger.info(f"[Prediction] [3/3] 예측된 질병: {disease_name_ko} (확률: {max_class[1]:.4f})")
+        
+        # 위험도 계산
+        risk_level = self.get_risk_level(korean_class_probs)
+        logger.info(f"[Prediction] [3/3] 위험도: {risk_level}")
+        
+        # GradCAM 생성 (선택적)
+        if grad_cam_bytes is not None:
+            logger.info(f"[Prediction] [3/3] GradCAM 결합 모드 결과 사용: {len(grad_cam_bytes)} bytes")
+        elif generate_gradcam and image is not None:
+            try:
+                if gradcam_top_k > 0:
+                    grad_cam_bytes, class_grad_cams = self._generate_gradcam_top_k(
+                        image, top_k_classes(probs_np, gradcam_top_k)
+                    )
+                else:
+                    grad_cam_bytes = self._generate_gradcam(image)
+                logger.info(f"[Prediction] [3/3] GradCAM 생성 완료: {len(grad_cam_bytes) if grad_cam_bytes else 0} bytes")
+            except Exception as e:
+                logger.error(f"[Prediction] [3/3] GradCAM 생성 실패: {e}", exc_info=True)
+        else:
+            logger.info(f"[Prediction] [3/3] GradCAM 생성 스킵 (generate_gradcam={generate_gradcam})")
+        
+        return {
+            "class_probs": korean_class_probs,  # 한국어 키로 변환된 확률
+            "risk_level": risk_level,
+            "disease_name_ko": disease_name_ko,
+            "disease_name_en": disease_name_en,
+            "grad_cam_bytes": grad_cam_bytes,
+            "vlm_analysis_text": None,  # VLM 분석은 제거됨
+            "inference_path": inference_path,
+            "grad_cam_top_k": self._top_k_entries(probs_np, class_grad_cams),  # 클래스별 GradCAM (요청 시)
+            "probs": [float(p) for p in probs_np],  # 클래스 인덱스 순서 원시 확률 (결과 캐시 저장용)
+        }
+    
+    def predict(
+        self,
+        image_bytes: bytes,
+        generate_gradcam: bool = False,
+        tta: Optional[str] = None,
+        gradcam_top_k: int = 0,
+    ) -> Dict:
         """
         이미지 예측 메서드
         
         Args:
             image_bytes: 예측할 이미지 바이트 데이터 (털 제거된 이미지)
             generate_gradcam: GradCAM 생성 여부 (기본값: False)
+            tta: 테스트 시점 증강 모드 off | always | uncertain (None이면 PREDICTION_TTA 설정)
+            gradcam_top_k: 0보다 크면 확률 top-k 클래스별 GradCAM도 생성 (grad_cam_top_k)
             
         Returns:
             {
@@ -454,104 +1124,21 @@ class PredictionPipeline:
                 "disease_name_en": "Malignant Melanoma",  # 가장 높은 확률의 질병명 (영문)
                 "grad_cam_bytes": Optional[bytes],  # GradCAM 이미지 바이트 (선택적)
                 "vlm_analysis_text": Optional[str],  # VLM 분석 텍스트 (선택적)
+                "grad_cam_top_k": Optional[List[Dict]],  # [{"class_index", "disease_name_ko", "probability", "grad_cam_bytes"}]
+                "probs": List[float],  # 클래스 인덱스 순서 원시 확률 (내부용, 응답에는 포함하지 않음)
             }
         """
         if not self.is_loaded:
             raise RuntimeError("모델이 로드되지 않았습니다. load_model()을 먼저 호출하세요.")
         
-        import torch
-        import torchvision.transforms as transforms
-        from PIL import Image
-        import io
-        import numpy as np
-        
         logger.info("[Prediction] ========== 환부 분류 파이프라인 시작 (총 3단계) ==========")
         logger.info(f"[Prediction] [1/3] 예측 시작: 이미지 크기 {len(image_bytes)} bytes")
         
         try:
-            # 이미지 바이트를 PIL Image로 변환
-            image = Image.open(io.BytesIO(image_bytes)).convert('RGB')
-            logger.info(f"[Prediction] [1/3] 이미지 로드 완료: {image.size}")
-            
-            # 이미지 전처리 (512x512 입력 크기)
-            logger.info("[Prediction] [2/3] 이미지 전처리 시작")
-            transform = transforms.Compose([
-                transforms.Resize((512, 512)),  # 모델 입력 크기: 512x512
-                transforms.ToTensor(),
-                transforms.Normalize(mean=MEAN, std=STD)  # ImageNet 정규화
-            ])
-            
-            image_tensor = transform(image).unsqueeze(0).to(self.device)
-            logger.info(f"[Prediction] [2/3] 이미지 전처리 완료: {image_tensor.shape}")
-            
-            # 모델 예측 (Soft Voting 앙상블)
-            logger.info("[Prediction] [3/3] 하이브리드 모델 예측 시작 (CNN + ViT)")
-            with torch.no_grad():
-                # Soft Voting 앙상블은 이미 확률을 반환함
-                ensemble_probs = self.model(image_tensor)
-                
-                # 배치 차원 제거 (첫 번째 샘플만 사용)
-                if len(ensemble_probs.shape) > 1:
-                    probs = ensemble_probs[0]  # [num_classes]
-                else:
-                    probs = ensemble_probs
-                
-                probs_np = probs.cpu().numpy()
-                logger.info(f"[Prediction] [3/3] 앙상블 확률 분포: {probs_np}")
-            
-            # 클래스 인덱스를 확률로 변환
-            # 모델은 8개 클래스만 분류함
-            num_classes = len(probs_np)
-            logger.info(f"[Prediction] [3/3] 예측된 클래스 수: {num_classes}")
-            
-            # 모델 출력이 8개가 아니면 에러
-            if num_classes != 8:
-                logger.error(f"[Prediction] [3/3] 모델 출력이 8개가 아닙니다: {num_classes}개")
-                raise ValueError(f"모델 출력이 8개 클래스가 아닙니다. 실제 출력: {num_classes}개")
-            
-            # 클래스 인덱스를 딕셔너리로 변환 (8개만)
-            raw_class_probs = {i: float(probs_np[i]) for i in range(8)}
-            logger.info(f"[Prediction] [3/3] 원시 확률 (8개): {raw_class_probs}")
-            
-            # 한국어로 변환
-            korean_class_probs = self._convert_class_probs_to_korean(raw_class_probs)
-            logger.info(f"[Prediction] [3/3] 한국어 변환된 확률: {korean_class_probs}")
-            
-            # 가장 높은 확률의 질병 찾기
-            if not korean_class_probs:
-                raise ValueError("예측 결과가 비어있습니다.")
-            
-            max_class = max(korean_class_probs.items(), key=lambda x: x[1])
-            disease_name_ko = max_class[0]
-            disease_name_en = self._map_to_english(disease_name_ko)
-            
-            logger.info(f"[Prediction] [3/3] 예측된 질병: {disease_name_ko} (확률: {max_class[1]:.4f})")
-            
-            # 위험도 계산
-            risk_level = self.get_risk_level(korean_class_probs)
-            logger.info(f"[Prediction] [3/3] 위험도: {risk_level}")
-            
-            # GradCAM 생성 (선택적)
-            grad_cam_bytes = None
-            if generate_gradcam:
-                try:
-                    grad_cam_bytes = self._generate_gradcam(original_image=image)
-                    logger.info(f"[Prediction] [3/3] GradCAM 생성 완료: {len(grad_cam_bytes) if grad_cam_bytes else 0} bytes")
-                except Exception as e:
-                    logger.error(f"[Prediction] [3/3] GradCAM 생성 실패: {e}", exc_info=True)
-            else:
-                logger.info(f"[Prediction] [3/3] GradCAM 생성 스킵 (generate_gradcam=False)")
-            
+            image, image_tensor = self.prepare_input(image_bytes)
+            result = self.predict_prepared(image, image_tensor, generate_gradcam, tta, gradcam_top_k)
             logger.info("[Prediction] ========== 환부 분류 파이프라인 완료 ==========")
-            
-            return {
-                "class_probs": korean_class_probs,  # 한국어 키로 변환된 확률
-                "risk_level": risk_level,
-                "disease_name_ko": disease_name_ko,
-                "disease_name_en": disease_name_en,
-                "grad_cam_bytes": grad_cam_bytes,
-                "vlm_analysis_text": None,  # VLM 분석은 제거됨
-            }
+            return result
         except Exception as e:
             logger.error(f"[Prediction] 예측 중 오류 발생: {e}", exc_info=True)
             raise
@@ -606,86 +1193,148 @@ class PredictionPipeline:
             else:
                 return "낮음"
     
-    def _generate_gradcam(self, original_image) -> Optional[bytes]:
+    def _overlay_to_png(self, overlay_image: np.ndarray) -> Optional[bytes]:
         """
-        GradCAM 히트맵 생성 및 이미지 바이트로 반환
-        gradcam_web_inference.py의 generate_gradcam_overlay 함수를 사용
+        GradCAM 오버레이 numpy array를 검증 후 PNG 바이트로 변환
         
         Args:
-            original_image: 원본 PIL Image
+            overlay_image: 오버레이 이미지 (H, W, 3) uint8
             
         Returns:
-            GradCAM 이미지 바이트 또는 None
+            PNG 바이트 또는 None
         """
-        if not HAS_GRADCAM_MODULE:
-            logger.error("[GradCAM] gradcam_web_inference 모듈을 사용할 수 없습니다.")
-            logger.error("[GradCAM] 필요한 패키지가 설치되어 있는지 확인하세요: scipy, matplotlib")
+        import io
+        from PIL import Image as PILImage
+        
+        # numpy array 검증 및 PIL Image로 변환
+        logger.info(f"[GradCAM] overlay_image shape: {overlay_image.shape}, dtype: {overlay_image.dtype}")
+        
+        # dtype이 uint8이 아니면 변환
+        if overlay_image.dtype != np.uint8:
+            logger.warning(f"[GradCAM] dtype이 uint8이 아닙니다: {overlay_image.dtype}, 변환합니다.")
+            overlay_image = np.clip(overlay_image, 0, 255).astype(np.uint8)
+        
+        # shape 검증 (H, W, 3) 또는 (H, W)
+        if len(overlay_image.shape) == 2:
+            # Grayscale인 경우 RGB로 변환
+            overlay_image = np.stack([overlay_image] * 3, axis=-1)
+            logger.info("[GradCAM] Grayscale 이미지를 RGB로 변환했습니다.")
+        elif len(overlay_image.shape) == 3 and overlay_image.shape[2] != 3:
+            logger.error(f"[GradCAM] 예상치 못한 이미지 shape: {overlay_image.shape}")
             return None
         
+        # PIL Image로 변환 (RGB 모드 명시)
         try:
-            import io
-            from PIL import Image as PILImage
-            
-            logger.info("[GradCAM] GradCAM 생성 시작 (gradcam_web_inference 모듈 사용)")
+            cam_pil = PILImage.fromarray(overlay_image, mode='RGB')
+        except Exception as e:
+            logger.error(f"[GradCAM] PIL Image 변환 실패: {e}")
+            logger.error(f"[GradCAM] overlay_image shape: {overlay_image.shape}, dtype: {overlay_image.dtype}, min: {overlay_image.min()}, max: {overlay_image.max()}")
+            return None
+        
+        # 바이트로 변환
+        buffer = io.BytesIO()
+        try:
+            cam_pil.save(buffer, format='PNG')
+            buffer.seek(0)  # 버퍼 위치를 처음으로 리셋
+            grad_cam_bytes = buffer.getvalue()
             
-            # GradCAM은 CNN 앙상블 모델 사용 (기존 로직 유지)
-            model_path = self.models_dir / "ensemble_finetune_best_60epochst.pt"
-            if not model_path.exists():
-                logger.error(f"[GradCAM] 모델 파일을 찾을 수 없습니다: {model_path}")
+            # PNG 헤더 검증 (첫 8바이트: 89 50 4E 47 0D 0A 1A 0A)
+            if len(grad_cam_bytes) < 8 or grad_cam_bytes[:8] != b'\x89PNG\r\n\x1a\n':
+                logger.error(f"[GradCAM] PNG 헤더가 올바르지 않습니다. 첫 8바이트: {grad_cam_bytes[:8]}")
                 return None
             
-            # gradcam_web_inference의 generate_gradcam_overlay 함수 사용
-            overlay_image = generate_gradcam_overlay(
-                image_input=original_image,  # PIL Image 객체
-                model_path=str(model_path),  # 문자열 경로로 변환
-                target_class=None,  # 예측된 클래스 사용
+            logger.info(f"[GradCAM] 이미지 변환 완료: {len(grad_cam_bytes)} bytes (PNG 검증 통과)")
+        except Exception as e:
+            logger.error(f"[GradCAM] PNG 저장 실패: {e}", exc_info=True)
+            return None
+        
+        return grad_cam_bytes
+    
+    def generate_gradcam_png(self, image) -> Optional[bytes]:
+        """
+        분류 없이 GradCAM PNG만 생성 (확률은 캐시에서 가져온 경우)
+        
+        Args:
+            image: 전처리 결과 PreparedImage 또는 원본 PIL Image
+        """
+        grad_cam_bytes = self._generate_gradcam(image)
+        logger.info(f"[GradCAM] GradCAM 단독 생성 완료: {len(grad_cam_bytes) if grad_cam_bytes else 0} bytes")
+        return grad_cam_bytes
+    
+    def _top_k_entries(self, probs_np: np.ndarray, class_grad_cams: Optional[Dict[int, bytes]]) -> Optional[List[Dict]]:
+        """클래스별 GradCAM을 응답 항목 목록으로 (확률 높은 순서)"""
+        if class_grad_cams is None:
+            return None
+        return [
+            {
+                "class_index": class_index,
+                "disease_name_ko": self._map_to_korean(class_index),
+                "probability": float(probs_np[class_index]),
+                "grad_cam_bytes": png,
+            }
+            for class_index, png in class_grad_cams.items()
+        ]
+    
+    def _generate_gradcam_top_k(self, image, top_classes: List[int]) -> Tuple[Optional[bytes], Dict[int, bytes]]:
+        """
+        예측 클래스 + top_classes의 GradCAM PNG를 forward 1회로 생성 (head만 클래스별 batched backward)
+        
+        Args:
+            image: 전처리 결과 PreparedImage 또는 원본 PIL Image
+            top_classes: 확률 높은 순서의 클래스 인덱스 목록
+            
+        Returns:
+            (예측 클래스 GradCAM PNG 또는 None, {클래스 인덱스: PNG})
+        """
+        if not HAS_GRADCAM_MODULE or self.gradcampp is None:
+            logger.error("[GradCAM] gradcam_web_inference 모듈을 사용할 수 없습니다.")
+            return None, {}
+        
+        with stage("gradcam"):
+            overlays, pred_class = generate_gradcam_overlays_with_model(
+                image_input=image,
+                model=self.cnn_model,
+                target_classes=top_classes,
+                gradcampp=self.gradcampp,
                 image_size=512,
                 device=self.device
             )
+            pngs = {class_index: self._overlay_to_png(overlay) for class_index, overlay in overlays.items()}
+        logger.info(f"[GradCAM] top-{len(top_classes)} 클래스 GradCAM 생성 완료: {top_classes}")
+        return pngs[pred_class], {class_index: pngs[class_index] for class_index in top_classes}
+    
+    def _generate_gradcam(self, image) -> Optional[bytes]:
+        """
+        GradCAM 히트맵 생성 및 이미지 바이트로 반환
+        이미 로드된 cnn_model과 hook을 재사용 (요청당 forward 1회 + backward 1회)
+        PreparedImage면 분류에 쓴 전처리 텐서 / 오버레이 배경을 그대로 사용 (다시 전처리하지 않음)
+        
+        Args:
+            image: 전처리 결과 PreparedImage 또는 원본 PIL Image
             
-            # numpy array 검증 및 PIL Image로 변환
-            logger.info(f"[GradCAM] overlay_image shape: {overlay_image.shape}, dtype: {overlay_image.dtype}")
-            
-            # dtype이 uint8이 아니면 변환
-            if overlay_image.dtype != np.uint8:
-                logger.warning(f"[GradCAM] dtype이 uint8이 아닙니다: {overlay_image.dtype}, 변환합니다.")
-                overlay_image = np.clip(overlay_image, 0, 255).astype(np.uint8)
-            
-            # shape 검증 (H, W, 3) 또는 (H, W)
-            if len(overlay_image.shape) == 2:
-                # Grayscale인 경우 RGB로 변환
-                overlay_image = np.stack([overlay_image] * 3, axis=-1)
-                logger.info("[GradCAM] Grayscale 이미지를 RGB로 변환했습니다.")
-            elif len(overlay_image.shape) == 3 and overlay_image.shape[2] != 3:
-                logger.error(f"[GradCAM] 예상치 못한 이미지 shape: {overlay_image.shape}")
-                return None
-            
-            # PIL Image로 변환 (RGB 모드 명시)
-            try:
-                cam_pil = PILImage.fromarray(overlay_image, mode='RGB')
-            except Exception as e:
-                logger.error(f"[GradCAM] PIL Image 변환 실패: {e}")
-                logger.error(f"[GradCAM] overlay_image shape: {overlay_image.shape}, dtype: {overlay_image.dtype}, min: {overlay_image.min()}, max: {overlay_image.max()}")
-                return None
+        Returns:
+            GradCAM 이미지 바이트 또는 None
+        """
+        if not HAS_GRADCAM_MODULE or self.gradcampp is None:
+            logger.error("[GradCAM] gradcam_web_inference 모듈을 사용할 수 없습니다.")
+            logger.error("[GradCAM] 필요한 패키지가 설치되어 있는지 확인하세요: opencv-python")
+            return None
+        
+        try:
+            logger.info("[GradCAM] GradCAM 생성 시작 (로드된 CNN 앙상블 재사용)")
             
-            # 바이트로 변환
-            buffer = io.BytesIO()
-            try:
-                cam_pil.save(buffer, format='PNG')
-                buffer.seek(0)  # 버퍼 위치를 처음으로 리셋
-                grad_cam_bytes = buffer.getvalue()
-                
-                # PNG 헤더 검증 (첫 8바이트: 89 50 4E 47 0D 0A 1A 0A)
-                if len(grad_cam_bytes) < 8 or grad_cam_bytes[:8] != b'\x89PNG\r\n\x1a\n':
-                    logger.error(f"[GradCAM] PNG 헤더가 올바르지 않습니다. 첫 8바이트: {grad_cam_bytes[:8]}")
-                    return None
+            # GradCAM은 CNN 앙상블 모델 사용 (기존 로직 유지)
+            with stage("gradcam"):
+                overlay_image = generate_gradcam_overlay_with_model(
+                    image_input=image,  # PreparedImage 또는 PIL Image 객체
+                    model=self.cnn_model,
+                    gradcampp=self.gradcampp,
+                    target_class=None,  # 예측된 클래스 사용
+                    image_size=512,
+                    device=self.device
+                )
                 
-                logger.info(f"[GradCAM] 이미지 변환 완료: {len(grad_cam_bytes)} bytes (PNG 검증 통과)")
-            except Exception as e:
-                logger.error(f"[GradCAM] PNG 저장 실패: {e}", exc_info=True)
-                return None
-            
-            return grad_cam_bytes
+                return self._overlay_to_png(overlay_image)
             
         except Exception as e:
             logger.error(f"[GradCAM] 생성 중 오류: {e}", exc_info=True)
@@ -0,0 +1,100 @@
+"""
+분류 / GradCAM 공용 입력 전처리 (512x512 리사이즈 + ImageNet 정규화)
+
+torchvision transforms.Compose([Resize, ToTensor, Normalize])는 float 중간 텐서를 단계마다 새로 만들고,
+GradCAM은 같은 이미지를 다시 전처리한 뒤 오버레이 배경을 얻으려고 정규화를 CPU에서 되돌렸습니다.
+여기서는 uint8 리사이즈 결과를 채널별 256개 항목 조회 테이블(LUT)로 한 번에 정규화하면서
+HWC → CHW 변환까지 출력 버퍼에 바로 기록하고, 리사이즈된 uint8 이미지를 오버레이 배경으로 함께 돌려줍니다.
+
+LUT 값은 ToTensor(x / 255) → Normalize((x - mean) / std)를 float32로 계산한 값과 같습니다.
+리사이즈는 torchvision Resize(PIL 입력)와 같은 PIL bilinear(안티에일리어싱)입니다.
+
+사용 방법:
+    prepared = prepare_image(pil_image, device)   # PreparedImage(tensor (1, 3, 512, 512), display (512, 512, 3) uint8)
+    buffer = new_batch_buffer(8)                  # 여러 장을 한 배치 버퍼에 바로 기록
+    prepare_image(rgb_array, device, out=buffer[0])
+"""
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import torch
+from PIL import Image
+
+# 모델 입력 크기 (정사각형)
+INPUT_SIZE = 512
+
+# ImageNet 정규화 상수
+MEAN = [0.485, 0.456, 0.406]
+STD = [0.229, 0.224, 0.225]
+
+# 채널별 uint8 → 정규화 값 조회 테이블 (3, 256), torchvision과 같은 float32 연산 순서
+_NORMALIZE_LUT = (
+    (np.arange(256, dtype=np.float32)[None, :] / np.float32(255) - np.asarray(MEAN, dtype=np.float32)[:, None])
+    / np.asarray(STD, dtype=np.float32)[:, None]
+)
+
+
+@dataclass
+class PreparedImage:
+    """전처리 결과 (분류 입력 텐서 + GradCAM 오버레이 배경)"""
+    tensor: torch.Tensor   # (1, 3, 512, 512) 정규화된 모델 입력
+    display: np.ndarray    # (512, 512, 3) uint8 RGB, tensor와 같은 리사이즈 결과
+
+
+def resize_rgb(image, size: int = INPUT_SIZE) -> np.ndarray:
+    """
+    RGB PIL Image 또는 uint8 (H, W, 3) array를 size x size uint8 array로 리사이즈
+
+    이미 size x size인 array는 복사하지 않고 그대로 반환합니다.
+    """
+    if isinstance(image, np.ndarray):
+        if image.shape[:2] == (size, size):
+            return np.ascontiguousarray(image, dtype=np.uint8)
+        image = Image.fromarray(image, mode='RGB')
+    elif image.mode != 'RGB':
+        image = image.convert('RGB')
+    if image.size != (size, size):
+        image = image.resize((size, size), Image.BILINEAR)
+    return np.asarray(image, dtype=np.uint8)
+
+
+def normalize_into(rgb: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    uint8 (H, W, 3) → 정규화된 float32 (3, H, W)
+
+    채널마다 LUT 조회 한 번으로 정규화 + HWC → CHW 변환 + dtype 변환을 함께 수행합니다.
+
+    Args:
+        rgb: uint8 RGB array (H, W, 3)
+        out: 결과를 기록할 float32 C-연속 버퍼 (3, H, W) (None이면 새로 할당)
+    """
+    height, width, _ = rgb.shape
+    if out is None:
+        out = np.empty((3, height, width), dtype=np.float32)
+    for channel in range(3):
+        # mode='clip': uint8 인덱스는 항상 범위 안이고, 'raise'는 out을 임시 버퍼에 한 번 더 복사함
+        np.take(_NORMALIZE_LUT[channel], rgb[:, :, channel], out=out[channel], mode='clip')
+    return out
+
+
+def new_batch_buffer(batch_size: int, size: int = INPUT_SIZE) -> np.ndarray:
+    """prepare_image(out=buffer[i])로 채울 배치 입력 버퍼 (B, 3, size, size) float32"""
+    return np.empty((batch_size, 3, size, size), dtype=np.float32)
+
+
+def prepare_image(image, device=None, size: int = INPUT_SIZE, out: Optional[np.ndarray] = None) -> PreparedImage:
+    """
+    RGB PIL Image 또는 uint8 array를 모델 입력 텐서 + 오버레이 배경으로 변환
+
+    Args:
+        image: RGB PIL Image 또는 uint8 (H, W, 3) array
+        device: 텐서를 올릴 디바이스 (None이면 CPU)
+        out: 정규화 결과를 기록할 버퍼 (3, size, size) (예: new_batch_buffer()의 한 행).
+             CPU에서는 반환 텐서가 이 버퍼를 공유하므로 텐서를 다 쓸 때까지 버퍼를 재사용하면 안 됩니다.
+    """
+    display = resize_rgb(image, size)
+    tensor = torch.from_numpy(normalize_into(display, out)).unsqueeze(0)
+    if device is not None:
+        tensor = tensor.to(device)
+    return PreparedImage(tensor=tensor, display=display)
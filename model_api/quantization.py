@@ -0,0 +1,145 @@
+"""
+하이브리드 분류기 INT8 동적 양자화 (CPU 전용, 선택 사항)
+
+CPU 노드에서 /predict 지연 시간의 대부분은 512px ViT-B/16(1024 토큰)의 nn.Linear 연산입니다.
+PREDICTION_QUANTIZE=1이면 로드 시점에
+  - vit_model의 nn.Linear (MLP 블록, head)
+  - cnn_model.classifier (3840 → 512 → 8)
+를 torch.ao.quantization.quantize_dynamic으로 INT8 가중치로 바꾼 Soft Voting 앙상블을 만들고,
+보정(calibration) 이미지에서 FP32 앙상블과의 top-1 일치율이 QUANTIZE_MIN_AGREEMENT 이상일 때만 사용합니다.
+
+GradCAM++는 layer4 → 분류기 backward가 필요하므로 FP32 cnn_model을 그대로 사용합니다
+(양자화 CNN은 백본을 FP32 모델과 공유하고 분류기만 INT8로 교체한 얕은 복사본입니다).
+GradCAM 결합 모드에서도 Soft Voting 확률은 이 양자화 앙상블과 같은 경로로 계산합니다:
+FP32 백본 forward 1회의 분류기 입력 특징에 INT8 분류기를 적용하고 ViT는 INT8로 실행하므로,
+아래에서 측정하는 top-1 일치율 / 지연 시간이 실제 요청 경로와 같습니다.
+
+사용 방법:
+    result = quantize_ensemble(predictor, calibration_dir)
+    if result is not None:
+        predictor.model, predictor.vit_model = result
+"""
+import copy
+import logging
+import os
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import torch
+import torch.nn as nn
+
+logger = logging.getLogger(__name__)
+
+# 양자화 모드 설정
+# PREDICTION_QUANTIZE: 1이면 양자화 시도 (기본값: 0)
+# QUANTIZE_MIN_AGREEMENT: 보정 이미지에서 FP32 대비 최소 top-1 일치율 (기본값: 0.98)
+# QUANTIZE_CALIBRATION_DIR: 보정 이미지 디렉토리 (기본값: <models_dir>/calibration)
+# QUANTIZE_CALIBRATION_MAX_IMAGES: 사용할 최대 보정 이미지 수 (기본값: 64)
+PREDICTION_QUANTIZE = os.getenv('PREDICTION_QUANTIZE', '0') == '1'
+QUANTIZE_MIN_AGREEMENT = float(os.getenv('QUANTIZE_MIN_AGREEMENT', '0.98'))
+QUANTIZE_CALIBRATION_DIR = os.getenv('QUANTIZE_CALIBRATION_DIR', '')
+QUANTIZE_CALIBRATION_MAX_IMAGES = int(os.getenv('QUANTIZE_CALIBRATION_MAX_IMAGES', '64'))
+
+CALIBRATION_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+
+
+def quantize_linear(module: nn.Module) -> nn.Module:
+    """module 안의 nn.Linear를 INT8 동적 양자화한 복사본 (원본은 그대로)"""
+    return torch.ao.quantization.quantize_dynamic(module, {nn.Linear}, dtype=torch.qint8, inplace=False)
+
+
+def quantize_cnn_head(cnn_model: nn.Module) -> nn.Module:
+    """
+    분류기만 INT8로 바꾼 CNN 앙상블 (백본 model_A / model_B는 FP32 모델과 공유)
+
+    얕은 복사 후 자식 모듈 dict만 새로 만들어 classifier를 교체하므로 백본 가중치를 복제하지 않습니다.
+    """
+    quantized = copy.copy(cnn_model)
+    quantized._modules = type(cnn_model._modules)(cnn_model._modules)
+    quantized._modules["classifier"] = quantize_linear(cnn_model.classifier)
+    return quantized
+
+
+def shares_cnn_backbone(candidate: nn.Module, cnn_model: nn.Module) -> bool:
+    """candidate가 quantize_cnn_head(cnn_model)처럼 cnn_model과 백본(model_A / model_B)을 공유하는지"""
+    return (
+        candidate is not cnn_model
+        and getattr(candidate, "model_A", None) is getattr(cnn_model, "model_A", False)
+        and getattr(candidate, "model_B", None) is getattr(cnn_model, "model_B", False)
+    )
+
+
+def load_calibration_tensors(predictor, calibration_dir: Path, max_images: int) -> List[torch.Tensor]:
+    """보정 이미지를 파이프라인 전처리로 텐서 목록으로 변환"""
+    paths = sorted(p for p in Path(calibration_dir).iterdir() if p.suffix.lower() in CALIBRATION_EXTENSIONS)
+    tensors = []
+    for path in paths[:max_images]:
+        try:
+            tensors.append(predictor.preprocess(predictor.load_image(path.read_bytes())).cpu())
+        except Exception as e:
+            logger.warning(f"[Quantize] 보정 이미지 건너뜀: {path.name} ({e})")
+    return tensors
+
+
+def _run(model: nn.Module, tensors: List[torch.Tensor]) -> Tuple[torch.Tensor, float]:
+    """(top-1 예측, 이미지당 평균 지연 시간 초)"""
+    predictions = []
+    with torch.no_grad():
+        model(tensors[0])  # 워밍업
+        started = time.perf_counter()
+        for tensor in tensors:
+            predictions.append(int(torch.argmax(model(tensor), dim=1)[0]))
+        elapsed = time.perf_counter() - started
+    return torch.tensor(predictions), elapsed / len(tensors)
+
+
+def quantize_ensemble(predictor, calibration_dir: Optional[Path] = None) -> Optional[Tuple[nn.Module, nn.Module]]:
+    """
+    양자화 Soft Voting 앙상블 생성 및 검증
+
+    Returns:
+        (양자화 앙상블, 양자화 ViT) 또는 None (조건 미충족 / 일치율 미달이면 FP32 유지)
+    """
+    from prediction import SoftVotingEnsemble
+
+    if predictor.device.type != "cpu":
+        logger.warning(f"[Quantize] 동적 양자화는 CPU 전용입니다 (현재 {predictor.device}), FP32 유지")
+        return None
+    if isinstance(predictor.vit_model, torch.jit.ScriptModule):
+        logger.warning("[Quantize] ViT가 TorchScript 아티팩트로 로드되어 양자화할 수 없습니다, FP32 유지")
+        return None
+
+    calibration_dir = Path(calibration_dir or QUANTIZE_CALIBRATION_DIR or predictor.models_dir / "calibration")
+    if not calibration_dir.is_dir():
+        logger.warning(f"[Quantize] 보정 이미지 디렉토리가 없어 양자화를 사용하지 않습니다: {calibration_dir}")
+        return None
+    tensors = load_calibration_tensors(predictor, calibration_dir, QUANTIZE_CALIBRATION_MAX_IMAGES)
+    if not tensors:
+        logger.warning(f"[Quantize] 보정 이미지가 없어 양자화를 사용하지 않습니다: {calibration_dir}")
+        return None
+
+    started = time.perf_counter()
+    vit_q = quantize_linear(predictor.vit_model).eval()
+    cnn_q = quantize_cnn_head(predictor.cnn_model).eval()
+    model_q = SoftVotingEnsemble(
+        cnn_model=cnn_q,
+        vit_model=vit_q,
+        num_classes=predictor.model.num_classes,
+        weights=predictor.model.weights,
+    ).eval()
+    logger.info(f"[Quantize] INT8 동적 양자화 완료 ({time.perf_counter() - started:.1f}초)")
+
+    fp32_top1, fp32_latency = _run(predictor.model, tensors)
+    int8_top1, int8_latency = _run(model_q, tensors)
+    agreement = float((fp32_top1 == int8_top1).float().mean())
+
+    logger.info(
+        f"[Quantize] 보정 이미지 {len(tensors)}장: top-1 일치율 {agreement:.3f} "
+        f"(기준 {QUANTIZE_MIN_AGREEMENT:.3f}), 지연 시간 FP32 {fp32_latency * 1000:.0f}ms → "
+        f"INT8 {int8_latency * 1000:.0f}ms (x{fp32_latency / max(int8_latency, 1e-9):.2f})"
+    )
+    if agreement < QUANTIZE_MIN_AGREEMENT:
+        logger.warning("[Quantize] top-1 일치율이 기준보다 낮아 양자화를 사용하지 않습니다 (FP32 유지)")
+        return None
+    return model_q, vit_q
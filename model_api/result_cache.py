@@ -0,0 +1,318 @@
+"""
+입력 이미지 내용 해시 기반 결과 캐시 (메모리 LRU + 디스크 2단계)
+
+같은 사진을 다시 올리거나 재분석 작업이 동일한 바이트를 보내면 털 제거/분류를 처음부터
+다시 계산하지 않도록, SHA-256(입력 바이트) + 모델 버전 fingerprint를 키로 결과를 저장합니다.
+단계(stage)별로 따로 저장하므로 털 제거 PNG, 클래스 확률, GradCAM이 각각 독립적으로 히트합니다.
+털 제거 PNG / GradCAM은 환자 피부 사진이므로 max_age_s가 지난 항목은 메모리 / 디스크 모두에서 삭제합니다.
+
+사용 방법:
+    cache = ResultCache(memory_max_bytes=64 << 20, disk_dir=Path("/data/result_cache"), disk_max_bytes=1 << 30,
+                        max_age_s=86400)
+    input_hash = hash_bytes(image_bytes)
+    png = cache.get("hair", input_hash, fingerprint)
+    if png is None:
+        png = pipeline.process(image_bytes)
+        cache.put("hair", input_hash, fingerprint, png)
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+from image_io import IMAGE_DECODE_REDUCED
+from precision import describe as describe_precision
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("hair", "probs", "gradcam")
+
+# 디스크 계층 만료 항목 정리 최소 간격 (초, 저장 시 확인)
+DISK_PURGE_INTERVAL_S = 60.0
+
+
+def hash_bytes(data: bytes) -> str:
+    """입력 바이트의 SHA-256 hex digest"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_fingerprint(paths: Iterable[Path], extra: str = "") -> str:
+    """
+    모델 버전 fingerprint 생성
+
+    수백 MB 체크포인트 전체를 해시하지 않고 파일 이름/크기/수정 시각과 추가 설정 문자열로 만듭니다.
+    체크포인트를 교체하면 값이 바뀌어 이전 캐시가 자동으로 무효화됩니다.
+    """
+    h = hashlib.sha256()
+    for path in paths:
+        path = Path(path)
+        if path.exists():
+            st = path.stat()
+            h.update(f"{path.name}:{st.st_size}:{int(st.st_mtime)};".encode())
+        else:
+            h.update(f"{path.name}:missing;".encode())
+    h.update(extra.encode())
+    return h.hexdigest()[:16]
+
+
+def hair_model_fingerprint(hair_pipeline) -> str:
+    """털 제거 모델 버전 fingerprint (체크포인트 + 주요 설정)"""
+    return file_fingerprint(
+        [
+            hair_pipeline.hair_mask_model_path,
+            hair_pipeline.bsrgan_model_path,
+            hair_pipeline.lama_weights_dir / "models" / "best.ckpt",
+        ],
+        extra=(
+            f"threshold={hair_pipeline.unet_threshold};size={hair_pipeline.IMG_SIZE};"
+            f"bsrgan={hair_pipeline.BSRGAN_EDGE_TINY},{hair_pipeline.BSRGAN_EDGE_SMALL},{hair_pipeline.BSRGAN_MAX_PASSES};"
+            f"post={hair_pipeline.POST_TARGET_LONG_EDGE};decode_reduced={IMAGE_DECODE_REDUCED};"
+            f"precision={describe_precision({'unet': hair_pipeline.unet_model, 'bsrgan': hair_pipeline.bsrgan_model, 'lama': hair_pipeline.lama_model})}"
+        ),
+    )
+
+
+def prediction_model_fingerprint(predictor) -> str:
+    """분류 모델 버전 fingerprint (체크포인트 + 앙상블 가중치, load_model() 이후 호출)"""
+    return file_fingerprint(
+        [predictor.cnn_model_path, predictor.vit_model_path],
+        extra=(
+            f"weights={predictor.model.weights};decode_reduced={IMAGE_DECODE_REDUCED};quantized={getattr(predictor, 'quantized', False)};"
+            f"precision={getattr(predictor, 'precision', 'fp32')};backend={getattr(predictor, 'backend', 'torch')};"
+            f"tta={getattr(predictor, 'tta_mode', 'off')}:{getattr(predictor, 'tta_margin_threshold', '')}:"
+            f"{','.join(getattr(predictor, 'tta_views', []))};"
+            f"cascade={getattr(predictor, 'cascade_thresholds', None) if getattr(predictor, 'cascade', False) else 'off'}"
+        ),
+    )
+
+
+class _StageStats:
+    """단계별 캐시 통계"""
+
+    def __init__(self):
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.puts = 0
+        self.memory_evictions = 0
+        self.disk_evictions = 0
+        self.expired = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return dict(self.__dict__)
+
+
+class ResultCache:
+    """메모리 LRU + 용량 제한 디스크 캐시"""
+
+    def __init__(
+        self,
+        memory_max_bytes: int = 64 * 1024 * 1024,
+        disk_dir: Optional[Path] = None,
+        disk_max_bytes: int = 1024 * 1024 * 1024,
+        max_age_s: float = 0.0,
+    ):
+        """
+        Args:
+            memory_max_bytes: 메모리 계층 최대 크기 (0이면 메모리 계층 비활성화)
+            disk_dir: 디스크 계층 디렉토리 (None이면 디스크 계층 비활성화)
+            disk_max_bytes: 디스크 계층 최대 크기
+            max_age_s: 저장 후 이 시간(초)이 지난 항목은 히트로 돌려주지 않고 삭제 (0이면 제한 없음)
+        """
+        self.memory_max_bytes = int(memory_max_bytes)
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.disk_max_bytes = int(disk_max_bytes)
+        self.max_age_s = float(max_age_s)
+        self._last_disk_purge = 0.0
+
+        self._lock = threading.Lock()
+        # 메모리 계층: 키 → (단계, 값, 저장 시각) (축출 통계를 축출된 항목의 단계로 집계)
+        self._memory: "OrderedDict[str, Tuple[str, bytes, float]]" = OrderedDict()
+        self._memory_bytes = 0
+        # 디스크 인덱스: 파일 경로 → (크기, 저장 시각) (오래 사용하지 않은 순서)
+        self._disk_index: "OrderedDict[Path, Tuple[int, float]]" = OrderedDict()
+        self._disk_bytes = 0
+        self._stats = {stage: _StageStats() for stage in STAGES}
+
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            self._load_disk_index()
+
+    # ------------------------------------------------------------------
+    # 키 / 경로
+    # ------------------------------------------------------------------
+    @staticmethod
+    def make_key(stage: str, input_hash: str, fingerprint: str, params: str = "") -> str:
+        """단계 + 입력 해시 + 모델 fingerprint + 파라미터로 캐시 키 생성"""
+        return hashlib.sha256(f"{stage}|{input_hash}|{fingerprint}|{params}".encode()).hexdigest()
+
+    def _disk_path(self, stage: str, key: str) -> Path:
+        return self.disk_dir / stage / key[:2] / f"{key}.bin"
+
+    def _expired(self, written_at: float, now: Optional[float] = None) -> bool:
+        return self.max_age_s > 0 and (now or time.time()) - written_at > self.max_age_s
+
+    def _load_disk_index(self):
+        """기존 디스크 캐시 파일을 저장 시각 순으로 인덱싱 (만료된 파일은 삭제)"""
+        entries = []
+        for path in self.disk_dir.glob("*/*/*.bin"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, path, st.st_size))
+        for written_at, path, size in sorted(entries):
+            self._disk_index[path] = (size, written_at)
+            self._disk_bytes += size
+        if entries:
+            logger.info(f"[Cache] 디스크 캐시 로드: {len(entries)}개, {self._disk_bytes} bytes ({self.disk_dir})")
+        self._purge_expired_disk()
+        self._evict_disk()
+
+    # ------------------------------------------------------------------
+    # 조회 / 저장
+    # ------------------------------------------------------------------
+    def get(self, stage: str, input_hash: str, fingerprint: str, params: str = "") -> Optional[bytes]:
+        """캐시 조회 (메모리 → 디스크 순, 디스크 히트는 메모리로 승격)"""
+        key = self.make_key(stage, input_hash, fingerprint, params)
+        stats = self._stats[stage]
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._expired(entry[2]):
+                    self._memory.move_to_end(key)
+                    stats.memory_hits += 1
+                    return entry[1]
+                del self._memory[key]
+                self._memory_bytes -= len(entry[1])
+                stats.expired += 1
+
+        if self.disk_dir is not None:
+            path = self._disk_path(stage, key)
+            try:
+                # 파일 수정 시각 = 저장 시각 (히트해도 갱신하지 않으므로 재시작 후 LRU 순서는 저장 순서)
+                written_at = path.stat().st_mtime
+                value = path.read_bytes()
+            except OSError:
+                value = None
+            if value is not None and self._expired(written_at):
+                with self._lock:
+                    self._remove_disk_entry(path)
+                    stats.expired += 1
+                value = None
+            if value is not None:
+                with self._lock:
+                    if path in self._disk_index:
+                        self._disk_index.move_to_end(path)
+                    stats.disk_hits += 1
+                    self._put_memory(stage, key, value, written_at)
+                return value
+
+        with self._lock:
+            stats.misses += 1
+        return None
+
+    def put(self, stage: str, input_hash: str, fingerprint: str, value: bytes, params: str = ""):
+        """캐시 저장 (메모리 + 디스크)"""
+        if value is None:
+            return
+        key = self.make_key(stage, input_hash, fingerprint, params)
+        with self._lock:
+            self._stats[stage].puts += 1
+            self._put_memory(stage, key, value)
+
+        if self.disk_dir is not None:
+            self._put_disk(stage, key, value)
+
+    def _put_memory(self, stage: str, key: str, value: bytes, written_at: Optional[float] = None):
+        """메모리 계층 저장 (self._lock 보유 상태에서 호출, written_at: 원래 저장 시각 - 디스크 히트 승격 시)"""
+        if len(value) > self.memory_max_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= len(old[1])
+        self._memory[key] = (stage, value, written_at or time.time())
+        self._memory_bytes += len(value)
+        while self._memory_bytes > self.memory_max_bytes and self._memory:
+            _, (evicted_stage, evicted, _) = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self._stats[evicted_stage].memory_evictions += 1
+
+    def _put_disk(self, stage: str, key: str, value: bytes):
+        """디스크 계층 저장 (임시 파일에 쓴 뒤 rename으로 교체)"""
+        if len(value) > self.disk_max_bytes:
+            return
+        path = self._disk_path(stage, key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".tmp{threading.get_ident()}")
+            tmp_path.write_bytes(value)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"[Cache] 디스크 캐시 저장 실패 ({stage}): {e}")
+            return
+
+        with self._lock:
+            old = self._disk_index.pop(path, None)
+            if old is not None:
+                self._disk_bytes -= old[0]
+            self._disk_index[path] = (len(value), time.time())
+            self._disk_bytes += len(value)
+            self._purge_expired_disk()
+            self._evict_disk()
+
+    def _remove_disk_entry(self, path: Path):
+        """디스크 캐시 파일과 인덱스 항목 삭제 (self._lock 보유 상태에서 호출)"""
+        entry = self._disk_index.pop(path, None)
+        if entry is not None:
+            self._disk_bytes -= entry[0]
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+    def _purge_expired_disk(self):
+        """max_age_s가 지난 디스크 캐시 파일 삭제 (DISK_PURGE_INTERVAL_S마다 최대 1회, self._lock 보유 상태에서 호출)"""
+        now = time.time()
+        if self.max_age_s <= 0 or now - self._last_disk_purge < DISK_PURGE_INTERVAL_S:
+            return
+        self._last_disk_purge = now
+        for path in [path for path, (_, written_at) in self._disk_index.items() if self._expired(written_at, now)]:
+            self._remove_disk_entry(path)
+            stage = path.parent.parent.name
+            if stage in self._stats:
+                self._stats[stage].expired += 1
+
+    def _evict_disk(self):
+        """디스크 용량 초과 시 가장 오래 사용하지 않은 파일부터 삭제 (self._lock 보유 상태에서 호출)"""
+        while self._disk_bytes > self.disk_max_bytes and self._disk_index:
+            path = next(iter(self._disk_index))
+            self._remove_disk_entry(path)
+            stage = path.parent.parent.name
+            if stage in self._stats:
+                self._stats[stage].disk_evictions += 1
+
+    def stats(self) -> dict:
+        """계층별 사용량과 단계별 히트/미스/축출 통계"""
+        with self._lock:
+            return {
+                "memory": {
+                    "entries": len(self._memory),
+                    "bytes": self._memory_bytes,
+                    "max_bytes": self.memory_max_bytes,
+                },
+                "disk": {
+                    "enabled": self.disk_dir is not None,
+                    "dir": str(self.disk_dir) if self.disk_dir else None,
+                    "entries": len(self._disk_index),
+                    "bytes": self._disk_bytes,
+                    "max_bytes": self.disk_max_bytes,
+                },
+                "max_age_s": self.max_age_s,
+                "stages": {stage: stats.as_dict() for stage, stats in self._stats.items()},
+            }
@@ -0,0 +1,114 @@
+"""
+공유 미디어 볼륨 경로 기반 입출력 (/shared/* 엔드포인트)
+
+Django와 모델 API가 같은 호스트에서 미디어 볼륨을 공유하면, 이미지를 multipart로 보내고
+결과 이미지를 다시 받아 저장할 필요 없이 SHARED_MEDIA_ROOT 기준 상대 경로만 주고받을 수 있습니다.
+모델 API는 입력 파일을 mmap으로 열어 그대로 디코딩하고, 처리된 이미지 / GradCAM은 입력 파일 옆에
+임시 파일 → rename으로 원자적으로 기록합니다.
+
+경로 검증: 절대 경로 / 심볼릭 링크를 따라간 결과까지 SHARED_MEDIA_ROOT 밖이면 거부합니다.
+
+사용 방법:
+    path = resolve_shared_path("uploads/1/default/photo.jpg")
+    data = map_file(path)                 # mmap (bytes처럼 사용, 복사 없음)
+    write_atomic(output_path(path, "gradcam"), png_bytes)
+"""
+import logging
+import mmap
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# 공유 미디어 볼륨 루트 (Django MEDIA_ROOT와 같은 디렉토리를 마운트한 경로)
+# 환경변수로 변경 가능: SHARED_MEDIA_ROOT (기본값: 빈 값 = /shared/* 엔드포인트 비활성화)
+SHARED_MEDIA_ROOT = os.getenv('SHARED_MEDIA_ROOT', '')
+
+# 입력 파일 최대 크기 (바이트)
+MAX_SHARED_FILE_BYTES = 64 * 1024 * 1024
+
+
+class SharedPathError(ValueError):
+    """공유 루트 밖 / 존재하지 않는 / 읽을 수 없는 경로"""
+
+
+def shared_root() -> Optional[Path]:
+    """설정된 공유 루트 (실제 경로, 비활성화면 None)"""
+    if not SHARED_MEDIA_ROOT:
+        return None
+    return Path(SHARED_MEDIA_ROOT).resolve()
+
+
+def _inside(root: Path, path: Path) -> bool:
+    return os.path.commonpath([str(root), str(path)]) == str(root)
+
+
+def resolve_shared_path(relative_path: str, root: Optional[Path] = None) -> Path:
+    """
+    공유 루트 기준 상대 경로를 검증된 입력 파일 경로로 변환
+
+    Raises:
+        SharedPathError: 공유 루트가 없음 / 절대 경로 / 루트 밖 / 파일 아님 / 너무 큼
+    """
+    root = root or shared_root()
+    if root is None:
+        raise SharedPathError("SHARED_MEDIA_ROOT가 설정되지 않았습니다")
+    if not relative_path or "\x00" in relative_path or os.path.isabs(relative_path):
+        raise SharedPathError(f"공유 루트 기준 상대 경로가 필요합니다: {relative_path!r}")
+
+    # 심볼릭 링크를 모두 따라간 실제 경로로 검사
+    path = (root / relative_path).resolve()
+    if not _inside(root, path) or path == root:
+        raise SharedPathError(f"공유 루트 밖의 경로입니다: {relative_path!r}")
+    if not path.is_file():
+        raise SharedPathError(f"파일을 찾을 수 없습니다: {relative_path!r}")
+    size = path.stat().st_size
+    if size == 0 or size > MAX_SHARED_FILE_BYTES:
+        raise SharedPathError(f"파일 크기가 허용 범위를 벗어났습니다: {relative_path!r} ({size} bytes)")
+    return path
+
+
+def relative_to_root(path: Path, root: Optional[Path] = None) -> str:
+    """응답용 공유 루트 기준 상대 경로 (POSIX 구분자)"""
+    return Path(path).relative_to(root or shared_root()).as_posix()
+
+
+def output_path(input_path: Path, suffix: str) -> Path:
+    """입력 파일 옆 출력 경로 (예: photo.jpg → photo.gradcam.png)"""
+    return input_path.with_name(f"{input_path.stem}.{suffix}.png")
+
+
+def map_file(path: Path) -> mmap.mmap:
+    """
+    읽기 전용 mmap (np.frombuffer / hashlib / PIL에 복사 없이 전달)
+
+    명시적으로 닫지 않고 마지막 참조가 사라질 때 닫힙니다. 요청이 끊어져도 single-flight로
+    병합된 계산 태스크는 같은 mmap을 계속 사용할 수 있어야 하기 때문입니다.
+    """
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def write_atomic(path: Path, data: bytes, root: Optional[Path] = None):
+    """
+    같은 디렉토리의 임시 파일에 쓴 뒤 rename (읽는 쪽은 이전 파일 또는 완성된 파일만 봄)
+
+    출력 디렉토리도 공유 루트 안인지 다시 확인합니다 (rename은 기존 심볼릭 링크 자체를 교체).
+    """
+    root = root or shared_root()
+    if root is None or not _inside(root, path.parent.resolve()):
+        raise SharedPathError(f"공유 루트 밖에는 쓸 수 없습니다: {path}")
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    tmp_path = Path(tmp_name)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            os.fchmod(f.fileno(), 0o644)  # mkstemp 기본 권한(0600) 대신 Django가 읽을 수 있게
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
@@ -0,0 +1,91 @@
+"""
+동일한 진행 중 요청 병합 (single-flight)
+
+업로드 재시도나 중복 제출로 같은 이미지가 몇 초 안에 두 번 들어오면 두 요청 모두 전체 CPU 파이프라인을
+실행하게 됩니다. 같은 키(엔드포인트 + 입력 해시 + 파라미터)의 계산이 이미 진행 중이면 새로 시작하지 않고
+첫 번째 계산의 결과를 함께 기다립니다.
+
+진행 이벤트(metrics.stage_listener, 비동기 작업 API의 SSE)는 계산 하나를 기다리는 모든 요청에 전달합니다.
+나중에 합류한 요청에는 그때까지 발생한 이벤트를 먼저 재생한 뒤 이후 이벤트를 이어서 전달합니다.
+
+사용 방법:
+    inflight = SingleFlight()
+    result = await inflight.do(("predict", image_hash, generate_gradcam), lambda: compute(image_bytes))
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Hashable, Tuple, TypeVar
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """키별로 진행 중인 계산을 하나만 실행하는 비동기 병합기"""
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, Tuple[asyncio.Task, metrics.StageFanout]] = {}
+
+        # 통계
+        self._leaders = 0
+        self._coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        키에 해당하는 계산을 실행하거나 이미 진행 중인 계산 결과를 기다림
+
+        계산은 별도 태스크로 실행되므로 처음 요청한 클라이언트가 끊어져도
+        함께 기다리는 요청은 결과를 받습니다. 예외도 모든 대기자에게 그대로 전달됩니다.
+        대기 중인 동안 호출자의 metrics.stage_listener로 계산의 단계 이벤트를 받습니다.
+
+        Args:
+            key: 병합 키 (해시 가능한 값)
+            fn: 계산 코루틴을 만드는 인자 없는 함수 (첫 요청에서만 호출)
+        """
+        flight = self._inflight.get(key)
+        if flight is not None:
+            task, fanout = flight
+            self._coalesced += 1
+            logger.info(f"[SingleFlight] 진행 중인 동일 요청에 병합: {key}")
+        else:
+            self._leaders += 1
+            fanout = metrics.StageFanout()
+            task = asyncio.ensure_future(self._run(fn, fanout))
+            self._inflight[key] = (task, fanout)
+            task.add_done_callback(lambda _task, _key=key: self._forget(_key, _task))
+
+        listener = metrics.stage_listener.get()
+        fanout.add(listener)
+        try:
+            return await asyncio.shield(task)
+        finally:
+            fanout.remove(listener)
+
+    @staticmethod
+    async def _run(fn: Callable[[], Awaitable[T]], fanout: metrics.StageFanout) -> T:
+        # 계산 태스크의 컨텍스트에서만 리스너를 교체 (호출자 컨텍스트는 그대로)
+        metrics.stage_listener.set(fanout)
+        return await fn()
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        flight = self._inflight.get(key)
+        if flight is not None and flight[0] is task:
+            del self._inflight[key]
+        # 모든 대기자가 취소된 경우에도 "exception was never retrieved" 경고가 남지 않도록 회수
+        if not task.cancelled():
+            task.exception()
+
+    @property
+    def coalesced(self) -> int:
+        """지금까지 병합된 요청 수"""
+        return self._coalesced
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._inflight),
+            "leaders": self._leaders,
+            "coalesced": self._coalesced,
+        }
@@ -0,0 +1,26 @@
+"""
+model_api 테스트 공용 설정
+
+model_api 모듈은 서버와 같이 평면 import(from prediction import ...)를 사용하므로
+model_api 디렉토리를 sys.path에 추가합니다.
+"""
+import os
+import sys
+from pathlib import Path
+
+MODEL_API_DIR = Path(__file__).resolve().parent.parent
+if str(MODEL_API_DIR) not in sys.path:
+    sys.path.insert(0, str(MODEL_API_DIR))
+
+# 실제 피부 사진 (Django 업로드 미디어) - 없으면 테스트가 합성 이미지를 사용
+# 환경변수로 변경 가능: MODEL_API_TEST_IMAGES_DIR
+TEST_IMAGES_DIR = Path(os.getenv('MODEL_API_TEST_IMAGES_DIR', MODEL_API_DIR.parent / "backend" / "media" / "uploads"))
+TEST_IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+
+
+def sample_image_paths(max_images: int = 4):
+    """테스트용 실제 이미지 경로 (정렬 순서로 최대 max_images장)"""
+    if not TEST_IMAGES_DIR.is_dir():
+        return []
+    paths = sorted(p for p in TEST_IMAGES_DIR.rglob("*") if p.suffix.lower() in TEST_IMAGE_EXTENSIONS)
+    return paths[:max_images]
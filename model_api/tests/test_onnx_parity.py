@@ -0,0 +1,114 @@
+"""
+ONNX Runtime 백엔드와 PyTorch의 클래스 확률 차이가 ONNX_PARITY_TOLERANCE 이내인지 확인
+
+- 작은 분류기를 export해 항상 실행되는 테스트
+- 실제 체크포인트(models/)가 있을 때만 실행되는 CNN 앙상블 + ViT Soft Voting 테스트
+입력은 실제 피부 사진(tests/conftest.py의 TEST_IMAGES_DIR)을 서버와 같은 전처리로 변환하고,
+사진이 없으면 피부색 합성 이미지를 사용합니다.
+"""
+from pathlib import Path
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("onnx")
+pytest.importorskip("onnxruntime")
+np = pytest.importorskip("numpy")
+
+import torch.nn as nn
+import torch.nn.functional as F
+
+from conftest import MODEL_API_DIR, sample_image_paths
+from image_io import open_rgb
+from onnx_backend import ONNX_PARITY_TOLERANCE, load_or_export
+from preprocessing import INPUT_SIZE, prepare_image
+
+
+def _synthetic_skin(seed: int) -> np.ndarray:
+    """피부색 배경 + 어두운 병변 + 노이즈 (512x512 uint8 RGB)"""
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[0:INPUT_SIZE, 0:INPUT_SIZE]
+    cy, cx = rng.uniform(160, 352, size=2)
+    radius = rng.uniform(40, 120)
+    lesion = np.clip(1.0 - np.hypot(yy - cy, xx - cx) / radius, 0, 1)[..., None]
+    skin = np.array([224, 172, 150], dtype=np.float32) + rng.normal(0, 8, size=(INPUT_SIZE, INPUT_SIZE, 3))
+    dark = np.array([96, 60, 48], dtype=np.float32)
+    return np.clip(skin * (1 - lesion) + dark * lesion, 0, 255).astype(np.uint8)
+
+
+def _inputs() -> torch.Tensor:
+    """(B, 3, 512, 512) 정규화된 입력 배치"""
+    paths = sample_image_paths(4)
+    images = [open_rgb(path.read_bytes()) for path in paths] or [_synthetic_skin(seed) for seed in range(4)]
+    return torch.cat([prepare_image(image).tensor for image in images], dim=0)
+
+
+def _max_prob_diff(expected_logits: torch.Tensor, actual_logits: torch.Tensor) -> float:
+    expected = F.softmax(expected_logits.float(), dim=1)
+    actual = F.softmax(actual_logits.float(), dim=1)
+    return float((expected - actual).abs().max())
+
+
+class _SmallClassifier(nn.Module):
+    def __init__(self, num_classes: int = 8):
+        super().__init__()
+        self.features = nn.Sequential(
+            nn.Conv2d(3, 16, 3, stride=2, padding=1),
+            nn.BatchNorm2d(16),
+            nn.ReLU(),
+            nn.Conv2d(16, 32, 3, stride=2, padding=1),
+            nn.ReLU(),
+            nn.AdaptiveAvgPool2d(1),
+        )
+        self.classifier = nn.Linear(32, num_classes)
+
+    def forward(self, x):
+        return self.classifier(torch.flatten(self.features(x), 1))
+
+
+def test_exported_model_probabilities_within_tolerance(tmp_path):
+    torch.manual_seed(0)
+    model = _SmallClassifier().eval()
+    checkpoint_path = tmp_path / "small.pt"
+    torch.save(model.state_dict(), checkpoint_path)
+
+    onnx_model = load_or_export(model, checkpoint_path)
+    inputs = _inputs()
+    with torch.no_grad():
+        diff = _max_prob_diff(model(inputs), onnx_model(inputs))
+    assert diff <= ONNX_PARITY_TOLERANCE
+
+
+def test_reuses_current_export(tmp_path):
+    model = _SmallClassifier().eval()
+    checkpoint_path = tmp_path / "small.pt"
+    torch.save(model.state_dict(), checkpoint_path)
+
+    first = load_or_export(model, checkpoint_path)
+    mtime = first.path.stat().st_mtime_ns
+    second = load_or_export(model, checkpoint_path)
+    assert second.path.stat().st_mtime_ns == mtime
+
+
+def test_checkpoint_ensemble_probabilities_within_tolerance():
+    from prediction import PredictionPipeline, SoftVotingEnsemble
+
+    predictor = PredictionPipeline(models_dir=MODEL_API_DIR / "models")
+    if not (predictor.cnn_model_path.exists() and predictor.vit_model_path.exists()):
+        pytest.skip("분류 모델 체크포인트가 없습니다")
+    predictor.load_model()
+    if predictor.backend != "torch" or predictor.quantized:
+        pytest.skip("PyTorch FP32 백엔드 기준으로만 비교합니다")
+
+    onnx_model = SoftVotingEnsemble(
+        cnn_model=load_or_export(predictor.cnn_model, predictor.cnn_model_path),
+        vit_model=load_or_export(predictor.vit_model, predictor.vit_model_path),
+        num_classes=predictor.model.num_classes,
+        weights=predictor.model.weights,
+    )
+    inputs = _inputs()
+    with torch.no_grad():
+        expected = predictor.model(inputs).float()
+        actual = onnx_model(inputs).float()
+    # SoftVotingEnsemble은 이미 확률을 반환
+    assert float((expected - actual).abs().max()) <= ONNX_PARITY_TOLERANCE
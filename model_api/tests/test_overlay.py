@@ -0,0 +1,88 @@
+"""
+GradCAM 오버레이(create_overlay_image)가 기존 scipy.ndimage.zoom(order=3) + matplotlib cm.jet 구현과
+허용 오차 이내로 같은지 확인
+
+차이 원인은 두 가지뿐입니다.
+- 보간 커널: cv2 cubic(Keys) vs 3차 B-spline (좌표 정렬은 둘 다 모서리 정렬)
+- JET_LUT 조회 / 8비트 정수 혼합 vs float 연산
+layer4 히트맵(16x16)과 비슷한 매끄러운 히트맵에서 오차 상한과 히트맵 최댓값 위치를 확인합니다.
+"""
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+pytest.importorskip("torch")
+pytest.importorskip("torchvision")
+ndimage = pytest.importorskip("scipy.ndimage")
+cm = pytest.importorskip("matplotlib.cm")
+
+from gradcam_web_inference import create_overlay_image, resize_heatmap
+
+SIZE = 512
+GRID = 16
+
+# 허용 오차 (히트맵 [0, 1], 오버레이 [0, 255])
+HEATMAP_MAX_ERROR = 0.03
+OVERLAY_MEAN_ERROR = 1.5
+OVERLAY_MAX_ERROR = 20
+
+
+def _legacy_overlay(image_denorm, heatmap, alpha=0.5):
+    """기존 create_overlay_image (scipy zoom + cm.jet, float 연산)"""
+    H, W, _ = image_denorm.shape
+    zoom_factors = (H / heatmap.shape[0], W / heatmap.shape[1])
+    heatmap_resized = ndimage.zoom(heatmap, zoom_factors, order=3)
+    heatmap_colored = cm.jet(np.clip(heatmap_resized, 0, 1))[:, :, :3]
+    overlay = np.clip(heatmap_colored * alpha + image_denorm * (1 - alpha), 0, 1)
+    return (overlay * 255).astype(np.uint8), heatmap_resized
+
+
+def _smooth_heatmap(seed: int) -> np.ndarray:
+    """가우시안 블롭 몇 개를 더해 [0, 1]로 정규화한 GRID x GRID 히트맵"""
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[0:GRID, 0:GRID].astype(np.float64)
+    heatmap = np.zeros((GRID, GRID))
+    for _ in range(3):
+        cy, cx = rng.uniform(2, GRID - 3, size=2)
+        sigma = rng.uniform(1.5, 3.0)
+        heatmap += rng.uniform(0.3, 1.0) * np.exp(-((yy - cy) ** 2 + (xx - cx) ** 2) / (2 * sigma ** 2))
+    heatmap -= heatmap.min()
+    return (heatmap / heatmap.max()).astype(np.float32)
+
+
+def _image(seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 256, size=(SIZE, SIZE, 3), dtype=np.uint8)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_heatmap_resize_matches_zoom_alignment(seed):
+    heatmap = _smooth_heatmap(seed)
+    image = _image(seed)
+    _, expected = _legacy_overlay(image.astype(np.float64) / 255, heatmap)
+    actual = resize_heatmap(heatmap, SIZE, SIZE)
+
+    assert actual.shape == (SIZE, SIZE)
+    assert float(np.abs(actual - expected).max()) <= HEATMAP_MAX_ERROR
+    # half-pixel 정렬이면 최댓값 위치가 약 16px 밀림
+    expected_peak = np.unravel_index(np.argmax(expected), expected.shape)
+    actual_peak = np.unravel_index(np.argmax(actual), actual.shape)
+    assert max(abs(a - e) for a, e in zip(actual_peak, expected_peak)) <= 2
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_overlay_within_tolerance_of_legacy(seed):
+    heatmap = _smooth_heatmap(seed)
+    image = _image(seed)
+    expected, _ = _legacy_overlay(image.astype(np.float64) / 255, heatmap)
+    actual = create_overlay_image(image, heatmap)
+
+    assert actual.shape == expected.shape and actual.dtype == np.uint8
+    error = np.abs(actual.astype(np.int16) - expected.astype(np.int16))
+    assert float(error.mean()) <= OVERLAY_MEAN_ERROR
+    assert int(error.max()) <= OVERLAY_MAX_ERROR
+
+
+def test_same_size_heatmap_is_not_resized():
+    heatmap = _smooth_heatmap(0)
+    assert resize_heatmap(heatmap, GRID, GRID) is heatmap
@@ -0,0 +1,173 @@
+"""
+체크포인트 로딩 유틸리티 (meta 디바이스 생성 + mmap / safetensors 로드)
+
+기존 로딩은 torchvision 사전학습 가중치(IMAGENET1K_V1)로 모델을 만든 뒤(다운로드 또는 캐시 읽기)
+곧바로 우리 체크포인트로 덮어쓰고, torch.load가 체크포인트 전체를 메모리에 복사하므로
+로드 중에는 같은 가중치가 두세 벌 메모리에 올라갑니다.
+
+이 모듈은
+  1. 모델을 meta 디바이스에서 (저장 공간 없이) 만들고
+  2. 체크포인트를 mmap으로 열거나 (torch.load(mmap=True)) 변환된 .safetensors 파일을 읽어
+  3. load_state_dict(assign=True)로 체크포인트 텐서를 그대로 모델 파라미터로 사용합니다.
+체크포인트에 없는 파라미터가 남으면 일반 CPU 생성 + 복사 방식으로 자동 대체합니다.
+
+같은 이름의 .safetensors 파일이 체크포인트 옆에 있으면 우선 사용합니다
+(convert_to_safetensors.py로 생성).
+
+사용 방법:
+    state_dict, meta = load_checkpoint(model_path)
+    model = build_and_load(lambda: MyModel(num_classes=8), state_dict, strict=False, device=device)
+"""
+import json
+import logging
+import os
+from itertools import chain
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+import torch
+import torch.nn as nn
+
+logger = logging.getLogger(__name__)
+
+try:
+    from safetensors import safe_open
+    from safetensors.torch import load_file as _safetensors_load_file
+    HAS_SAFETENSORS = True
+except ImportError:
+    HAS_SAFETENSORS = False
+
+# 1이면 기존 방식 사용 (사전학습 가중치로 생성 → torch.load 전체 복사 → load_state_dict 복사)
+# 환경변수로 변경 가능: MODEL_LOAD_LEGACY (기본값: 0)
+MODEL_LOAD_LEGACY = os.getenv('MODEL_LOAD_LEGACY', '0') == '1'
+
+# 체크포인트 dict 안에서 state_dict를 찾는 키 (앞쪽 우선)
+STATE_DICT_KEYS = ("model_state_dict", "state_dict", "params_ema", "params")
+
+# safetensors 메타데이터 키
+# checkpoint_meta: 체크포인트의 비텐서 정보(meta 등, JSON)
+# source_checkpoint: 변환 원본 체크포인트 식별자 (원본이 바뀌면 오래된 변환본을 쓰지 않기 위함)
+SAFETENSORS_META_KEY = "checkpoint_meta"
+SAFETENSORS_SOURCE_KEY = "source_checkpoint"
+
+
+def safetensors_path(checkpoint_path: Path) -> Path:
+    """체크포인트에 대응하는 .safetensors 파일 경로 (같은 디렉토리, 같은 이름)"""
+    return Path(checkpoint_path).with_suffix(".safetensors")
+
+
+def source_signature(checkpoint_path: Path) -> str:
+    """원본 체크포인트 식별자 (이름:크기:수정 시각)"""
+    st = Path(checkpoint_path).stat()
+    return f"{Path(checkpoint_path).name}:{st.st_size}:{int(st.st_mtime)}"
+
+
+def extract_state_dict(checkpoint) -> Tuple[Dict[str, torch.Tensor], dict]:
+    """
+    torch.load 결과에서 (state_dict, meta) 추출
+
+    DataParallel로 저장된 "module." 접두사는 제거합니다.
+    """
+    meta = {}
+    state_dict = checkpoint
+    if isinstance(checkpoint, dict):
+        meta = checkpoint.get("meta") or {}
+        for key in STATE_DICT_KEYS:
+            if isinstance(checkpoint.get(key), dict):
+                state_dict = checkpoint[key]
+                break
+    if any(k.startswith("module.") for k in state_dict):
+        state_dict = {(k[len("module."):] if k.startswith("module.") else k): v for k, v in state_dict.items()}
+    return state_dict, meta
+
+
+def _torch_load(path: Path, map_location):
+    """mmap으로 체크포인트 로드 (구 포맷 등 mmap을 지원하지 않는 파일이면 일반 로드)"""
+    if not MODEL_LOAD_LEGACY:
+        try:
+            return torch.load(str(path), map_location=map_location, weights_only=False, mmap=True)
+        except (RuntimeError, TypeError, ValueError) as e:
+            logger.info(f"[Weights] mmap 로드 불가, 일반 로드로 대체: {path.name} ({e})")
+    return torch.load(str(path), map_location=map_location, weights_only=False)
+
+
+def load_checkpoint(checkpoint_path: Path, map_location="cpu") -> Tuple[Dict[str, torch.Tensor], dict]:
+    """
+    체크포인트 로드 → (state_dict, meta)
+
+    같은 이름의 .safetensors 파일이 있고 safetensors가 설치되어 있으면 그 파일을,
+    없으면 원본 체크포인트를 mmap으로 읽습니다.
+    """
+    checkpoint_path = Path(checkpoint_path)
+    st_path = safetensors_path(checkpoint_path)
+    if HAS_SAFETENSORS and not MODEL_LOAD_LEGACY and st_path.exists():
+        with safe_open(str(st_path), framework="pt") as f:
+            metadata = f.metadata() or {}
+        source = metadata.get(SAFETENSORS_SOURCE_KEY)
+        if checkpoint_path.exists() and source is not None and source != source_signature(checkpoint_path):
+            logger.warning(
+                f"[Weights] {st_path.name}이 현재 체크포인트와 다른 원본에서 변환되어 무시합니다 "
+                f"(convert_to_safetensors.py로 다시 변환하세요)"
+            )
+        else:
+            device = str(map_location) if map_location is not None else "cpu"
+            state_dict = _safetensors_load_file(str(st_path), device=device)
+            meta = json.loads(metadata.get(SAFETENSORS_META_KEY, "{}"))
+            logger.info(f"[Weights] safetensors 로드: {st_path.name} ({len(state_dict)} 텐서)")
+            return state_dict, meta
+
+    return extract_state_dict(_torch_load(checkpoint_path, map_location))
+
+
+def _leftover_meta_tensors(model: nn.Module):
+    return [name for name, tensor in chain(model.named_parameters(), model.named_buffers()) if tensor.is_meta]
+
+
+def build_and_load(
+    factory: Callable[[], nn.Module],
+    state_dict: Dict[str, torch.Tensor],
+    strict: bool = True,
+    device: Optional[torch.device] = None,
+) -> nn.Module:
+    """
+    factory()로 만든 모델에 state_dict를 로드
+
+    meta 디바이스에서 모델을 만들고 load_state_dict(assign=True)로 체크포인트 텐서를 그대로 사용합니다.
+    체크포인트에 없는 파라미터/버퍼가 meta로 남으면 CPU에서 다시 만들어 일반 방식으로 복사합니다.
+
+    Args:
+        factory: 사전학습 가중치 없이 모델을 만드는 인자 없는 함수
+        state_dict: load_checkpoint()로 얻은 state_dict
+        strict: load_state_dict strict 옵션
+        device: 최종 디바이스 (None이면 CPU)
+    """
+    model = None
+    if not MODEL_LOAD_LEGACY:
+        with torch.device("meta"):
+            meta_model = factory()
+        # assign=True는 requires_grad / dtype을 체크포인트 텐서에서 가져오므로 원래 값을 기억해 둠
+        requires_grad = {name: p.requires_grad for name, p in meta_model.named_parameters()}
+        dtypes = {name: p.dtype for name, p in meta_model.named_parameters()}
+        result = meta_model.load_state_dict(state_dict, strict=strict, assign=True)
+        leftovers = _leftover_meta_tensors(meta_model)
+        if leftovers:
+            logger.warning(
+                f"[Weights] 체크포인트에 없는 텐서 {len(leftovers)}개 (예: {leftovers[:3]}) - "
+                f"meta 로드를 건너뛰고 일반 로드로 대체합니다"
+            )
+        else:
+            model = meta_model
+            for name, p in model.named_parameters():
+                if p.dtype != dtypes[name]:
+                    p.data = p.data.to(dtypes[name])
+                p.requires_grad_(requires_grad[name])
+            if not strict and result.unexpected_keys:
+                logger.info(f"[Weights] 사용하지 않은 체크포인트 키 {len(result.unexpected_keys)}개")
+
+    if model is None:
+        model = factory()
+        model.load_state_dict(state_dict, strict=strict)
+
+    if device is not None:
+        model = model.to(device)
+    return model
@@ -0,0 +1,426 @@
+"""
+CPU 코어 고정 추론 워커 프로세스 풀
+
+단일 uvicorn 프로세스에서는 모든 요청이 asyncio.to_thread로 실행되어 하나의 PyTorch intra-op 스레드 풀을
+공유하고, numpy/OpenCV 처리 구간에서 GIL을 두고 경쟁합니다. 이 모드에서는 N개의 워커 프로세스가 각각
+HairRemovalPipeline / PredictionPipeline을 로드하고 고정된 CPU 집합과 torch 스레드 수로 실행되며,
+프론트 프로세스(FastAPI)는 유휴 워커에게 요청을 Pipe(IPC)로 전달합니다.
+
+사용 방법:
+    pool = WorkerPool(models_dir, num_workers=4)
+    await pool.start()
+    png = await pool.call("remove_hair", image_bytes)
+    result = await pool.call("predict", image_bytes, True)
+    processed_png, hair_removed, result = await pool.call("diagnose", image_bytes, True)
+"""
+import asyncio
+import logging
+import multiprocessing as mp
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def plan_cpu_sets(num_workers: int, threads_per_worker: int) -> List[Optional[List[int]]]:
+    """
+    현재 프로세스에 허용된 CPU를 워커별로 겹치지 않게 나눔
+
+    CPU 수가 부족하거나 sched_getaffinity를 지원하지 않는 플랫폼이면 고정하지 않습니다 (None).
+    """
+    if not hasattr(os, "sched_getaffinity"):
+        return [None] * num_workers
+    cpus = sorted(os.sched_getaffinity(0))
+    if len(cpus) < num_workers * threads_per_worker:
+        logger.warning(
+            f"[WorkerPool] CPU {len(cpus)}개로 워커 {num_workers}개 × 스레드 {threads_per_worker}개를 "
+            f"고정할 수 없어 코어 고정을 생략합니다"
+        )
+        return [None] * num_workers
+    return [cpus[i * threads_per_worker:(i + 1) * threads_per_worker] for i in range(num_workers)]
+
+
+# ----------------------------------------------------------------------
+# 워커 프로세스 (spawn으로 시작되므로 모듈 최상위 함수여야 함)
+# ----------------------------------------------------------------------
+def _worker_main(conn, models_dir: str, worker_index: int, cpu_set: Optional[List[int]], num_threads: int):
+    """워커 프로세스 진입점: 코어 고정 → 모델 로드 → 요청 루프"""
+    if cpu_set:
+        os.sched_setaffinity(0, cpu_set)
+
+    import cv2
+    import torch
+
+    torch.set_num_threads(num_threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass
+    cv2.setNumThreads(1)
+
+    from diagnose import remove_hair_in_memory
+    from hair_removal import HairRemovalPipeline
+    from prediction import PredictionPipeline
+    from result_cache import hair_model_fingerprint, prediction_model_fingerprint
+
+    try:
+        load_started = time.perf_counter()
+        hair_pipeline = HairRemovalPipeline(models_dir=Path(models_dir))
+        hair_load_seconds = time.perf_counter() - load_started
+
+        load_started = time.perf_counter()
+        prediction_pipeline = PredictionPipeline(models_dir=Path(models_dir))
+        prediction_pipeline.load_model()
+        prediction_load_seconds = time.perf_counter() - load_started
+    except Exception as e:
+        conn.send(("error", f"워커 {worker_index} 모델 로드 실패: {e!r}", None))
+        conn.close()
+        return
+
+    def _diagnose(image_bytes: bytes, generate_gradcam: bool):
+        # 털 제거 → 분류 → GradCAM을 워커 안에서 메모리로 연결 (IPC 왕복 1회, 털 제거 PNG 재디코딩 없음)
+        hair = remove_hair_in_memory(hair_pipeline, image_bytes)
+        image, image_tensor = prediction_pipeline.prepare_array(hair.rgb)
+        prediction_result = prediction_pipeline.predict_prepared(image, image_tensor, generate_gradcam)
+        return hair.processed_png, hair.hair_removed, prediction_result
+
+    def _gradcam(image_bytes: bytes):
+        image, _ = prediction_pipeline.prepare_input(image_bytes)
+        return prediction_pipeline.generate_gradcam_png(image)
+
+    handlers = {
+        "remove_hair": hair_pipeline.process,
+        "predict": prediction_pipeline.predict,
+        "diagnose": _diagnose,
+        "gradcam": _gradcam,
+    }
+
+    conn.send(("ready", {
+        "pid": os.getpid(),
+        "cpu_set": cpu_set,
+        "hair_fingerprint": hair_model_fingerprint(hair_pipeline),
+        "prediction_fingerprint": prediction_model_fingerprint(prediction_pipeline),
+        "load_seconds": {"hair_removal": hair_load_seconds, "prediction": prediction_load_seconds},
+    }, None))
+
+    # 요청자가 진행 이벤트를 받는 경우 단계 시작/종료를 응답 전에 ("stage", ...) 메시지로 바로 전달
+    # (병렬 브랜치 스레드에서도 호출되므로 Pipe 쓰기를 잠금으로 보호)
+    send_lock = threading.Lock()
+
+    def send(message):
+        with send_lock:
+            conn.send(message)
+
+    def forward_stage(phase: str, name: str, elapsed: float):
+        send(("stage", (phase, name, elapsed), None))
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+        method, args, stream_stages = message
+        token = metrics.stage_listener.set(forward_stage if stream_stages else None)
+        try:
+            result = handlers[method](*args)
+            send(("ok", result, metrics.STAGE_SECONDS.snapshot(reset=True)))
+        except Exception as e:
+            send(("error", f"{type(e).__name__}: {e}", metrics.STAGE_SECONDS.snapshot(reset=True)))
+        finally:
+            metrics.stage_listener.reset(token)
+    conn.close()
+
+
+# ----------------------------------------------------------------------
+# 프론트 프로세스 쪽 풀
+# ----------------------------------------------------------------------
+@dataclass
+class _Worker:
+    """실행 중인 워커 프로세스 핸들"""
+    index: int
+    process: Any
+    conn: Any
+    cpu_set: Optional[List[int]]
+    info: Dict = field(default_factory=dict)
+    calls: int = 0
+
+
+class WorkerPoolError(RuntimeError):
+    """워커가 요청 처리에 실패했거나 비정상 종료되었을 때 발생"""
+
+
+class WorkerPoolUnavailable(WorkerPoolError):
+    """살아 있는 워커가 하나도 없을 때 발생 (모두 재시작 중, HTTP 503으로 응답)"""
+
+
+# 워커 재시작 실패 시 재시도 간격 (초, 실패할 때마다 2배, 최대 RESPAWN_BACKOFF_MAX_S)
+RESPAWN_BACKOFF_S = 1.0
+RESPAWN_BACKOFF_MAX_S = 60.0
+
+
+class WorkerPool:
+    """유휴 워커에게 요청을 분배하는 프로세스 풀"""
+
+    def __init__(
+        self,
+        models_dir: Path,
+        num_workers: int,
+        threads_per_worker: Optional[int] = None,
+        pin_cpus: bool = True,
+    ):
+        """
+        Args:
+            models_dir: 모델 디렉토리
+            num_workers: 워커 프로세스 수
+            threads_per_worker: 워커당 torch 스레드 수 (None이면 허용된 CPU를 워커 수로 균등 분할)
+            pin_cpus: 워커별 CPU 집합 고정 여부
+        """
+        if num_workers < 1:
+            raise ValueError(f"num_workers는 1 이상이어야 합니다: {num_workers}")
+        available = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+        self.models_dir = Path(models_dir)
+        self.num_workers = int(num_workers)
+        self.threads_per_worker = int(threads_per_worker or max(1, available // self.num_workers))
+        self.pin_cpus = pin_cpus
+
+        self._ctx = mp.get_context("spawn")
+        self._workers: List[Optional[_Worker]] = [None] * self.num_workers
+        self._idle: Optional[asyncio.Queue] = None
+        # 살아 있는 워커가 0개가 되면 설정 (유휴 워커를 기다리던 요청을 깨워 바로 실패시킴)
+        self._all_dead: Optional[asyncio.Event] = None
+        self._stopping = False
+        # 요청 취소 후에도 계속 실행되는 왕복 / 재시작 태스크 (GC로 사라지지 않도록 참조 유지)
+        self._background: Set[asyncio.Task] = set()
+        self._respawns = 0
+        self._calls = 0
+        self._failures = 0
+
+    @property
+    def info(self) -> Dict:
+        """첫 번째 준비된 워커의 정보 (모델 fingerprint, 로드 시간 등)"""
+        for worker in self._workers:
+            if worker is not None:
+                return worker.info
+        return {}
+
+    async def start(self):
+        """워커 프로세스를 모두 띄우고 모델 로드 완료까지 대기"""
+        self._idle = asyncio.Queue()
+        self._all_dead = asyncio.Event()
+        self._stopping = False
+        cpu_sets = plan_cpu_sets(self.num_workers, self.threads_per_worker) if self.pin_cpus else [None] * self.num_workers
+        logger.info(
+            f"[WorkerPool] 워커 {self.num_workers}개 시작 (워커당 torch 스레드 {self.threads_per_worker}개, "
+            f"CPU 고정: {cpu_sets})"
+        )
+        workers = await asyncio.gather(*[
+            asyncio.to_thread(self._spawn, index, cpu_set) for index, cpu_set in enumerate(cpu_sets)
+        ])
+        for worker in workers:
+            self._workers[worker.index] = worker
+            self._idle.put_nowait(worker)
+
+    def _spawn(self, index: int, cpu_set: Optional[Sequence[int]]) -> _Worker:
+        """워커 1개 시작 후 ready 메시지까지 대기 (블로킹)"""
+        parent_conn, child_conn = self._ctx.Pipe(duplex=True)
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(child_conn, str(self.models_dir), index, list(cpu_set) if cpu_set else None, self.threads_per_worker),
+            name=f"model-worker-{index}",
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+
+        try:
+            status, payload, _ = parent_conn.recv()
+        except EOFError:
+            process.join(timeout=5)
+            raise WorkerPoolError(f"워커 {index}가 모델 로드 중 종료되었습니다 (exitcode={process.exitcode})")
+        if status != "ready":
+            process.join(timeout=5)
+            raise WorkerPoolError(payload)
+
+        logger.info(
+            f"[WorkerPool] 워커 {index} 준비 완료 (pid={payload['pid']}, CPU={payload['cpu_set']}, "
+            f"로드 시간={payload['load_seconds']})"
+        )
+        return _Worker(index=index, process=process, conn=parent_conn, cpu_set=payload["cpu_set"], info=payload)
+
+    async def stop(self):
+        """모든 워커 종료"""
+        self._stopping = True
+        for task in list(self._background):
+            task.cancel()
+        for worker in self._workers:
+            if worker is None:
+                continue
+            try:
+                worker.conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        for worker in self._workers:
+            if worker is None:
+                continue
+            await asyncio.to_thread(worker.process.join, 10)
+            if worker.process.is_alive():
+                worker.process.terminate()
+            worker.conn.close()
+        self._workers = [None] * self.num_workers
+        logger.info("[WorkerPool] 워커 풀 종료")
+
+    @staticmethod
+    def _roundtrip(worker: _Worker, method: str, args: tuple):
+        # 호출자 컨텍스트의 단계 이벤트 리스너 (asyncio.to_thread로 전파됨)가 있으면 워커의 단계 이벤트를 전달받음
+        listener = metrics.stage_listener.get()
+        worker.conn.send((method, args, listener is not None))
+        while True:
+            message = worker.conn.recv()
+            if message[0] != "stage":
+                return message
+            metrics.notify_listener(listener, *message[1])
+
+    @property
+    def alive(self) -> int:
+        """살아 있는 (요청을 받을 수 있는) 워커 수"""
+        return sum(1 for worker in self._workers if worker is not None)
+
+    async def call(self, method: str, *args):
+        """
+        유휴 워커 하나에서 method(*args)를 실행하고 결과를 반환
+
+        Raises:
+            WorkerPoolUnavailable: 살아 있는 워커가 없는 경우 (모두 재시작 중)
+            WorkerPoolError: 워커 안에서 예외가 발생했거나 워커가 비정상 종료된 경우
+        """
+        if self._idle is None:
+            raise RuntimeError("워커 풀이 시작되지 않았습니다. start()를 먼저 호출하세요.")
+
+        worker = await self._acquire()
+        # 요청이 취소되어도 왕복은 끝까지 진행하고 워커를 유휴 큐로 돌려보냄 (Pipe 요청/응답 짝 유지)
+        status, payload = await asyncio.shield(self._spawn_background(self._dispatch(worker, method, args)))
+        if status != "ok":
+            self._failures += 1
+            raise WorkerPoolError(payload)
+        return payload
+
+    async def _acquire(self) -> _Worker:
+        """유휴 워커 하나를 꺼냄 (살아 있는 워커가 없으면 기다리지 않고 WorkerPoolUnavailable)"""
+        while True:
+            if self.alive == 0:
+                raise WorkerPoolUnavailable("사용 가능한 추론 워커가 없습니다 (재시작 중)")
+            if not self._idle.empty():
+                return self._idle.get_nowait()
+            getter = asyncio.ensure_future(self._idle.get())
+            dead = asyncio.ensure_future(self._all_dead.wait())
+            try:
+                await asyncio.wait({getter, dead}, return_when=asyncio.FIRST_COMPLETED)
+            except BaseException:
+                # 요청 취소: 이미 꺼낸 워커가 있으면 유휴 큐로 돌려놓음
+                if getter.done() and not getter.cancelled():
+                    self._idle.put_nowait(getter.result())
+                getter.cancel()
+                raise
+            finally:
+                dead.cancel()
+            if getter.done():
+                return getter.result()
+            getter.cancel()
+
+    async def _dispatch(self, worker: _Worker, method: str, args: tuple) -> Tuple[str, object]:
+        """워커 1개에서 요청 왕복 후 워커 반환 (워커가 죽었으면 재시작)"""
+        crashed = False
+        try:
+            status, payload, stage_snapshot = await asyncio.to_thread(self._roundtrip, worker, method, args)
+        except (EOFError, BrokenPipeError, OSError) as e:
+            # 워커가 죽은 경우: 슬롯을 비우고 백그라운드에서 같은 CPU 집합으로 다시 띄움 (유휴 큐에는 준비 후 복귀)
+            crashed = True
+            self._failures += 1
+            logger.error(f"[WorkerPool] 워커 {worker.index} 비정상 종료, 재시작합니다: {e!r}")
+            self._mark_dead(worker)
+            self._spawn_background(self._respawn(worker))
+            raise WorkerPoolError(f"워커 {worker.index}가 요청 처리 중 종료되었습니다") from e
+        except Exception as e:
+            # 요청 직렬화 실패 등: 워커는 살아 있고 Pipe 메시지 경계도 그대로
+            self._failures += 1
+            raise WorkerPoolError(f"워커 {worker.index} 요청 전달 실패: {type(e).__name__}: {e}") from e
+        finally:
+            if not crashed:
+                self._idle.put_nowait(worker)
+
+        worker.calls += 1
+        self._calls += 1
+        if stage_snapshot:
+            # 단계별 히스토그램은 워커에서 기록되어 응답과 함께 넘어옴
+            metrics.STAGE_SECONDS.merge(stage_snapshot)
+        return status, payload
+
+    def _spawn_background(self, coro) -> asyncio.Task:
+        task = asyncio.ensure_future(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background_done)
+        return task
+
+    def _background_done(self, task: asyncio.Task):
+        self._background.discard(task)
+        if not task.cancelled():
+            # 호출자가 취소되어 아무도 await하지 않은 결과 / 예외는 버림 (미회수 예외 경고 방지)
+            task.exception()
+
+    def _mark_dead(self, worker: _Worker):
+        """워커 슬롯을 비움 (마지막 워커였으면 유휴 워커를 기다리던 요청을 깨움)"""
+        if self._workers[worker.index] is worker:
+            self._workers[worker.index] = None
+        if self.alive == 0:
+            self._all_dead.set()
+
+    async def _respawn(self, worker: _Worker):
+        if worker.process.is_alive():
+            worker.process.terminate()
+        await asyncio.to_thread(worker.process.join, 10)
+        worker.conn.close()
+        backoff = RESPAWN_BACKOFF_S
+        while not self._stopping:
+            try:
+                new_worker = await asyncio.to_thread(self._spawn, worker.index, worker.cpu_set)
+                break
+            except Exception as e:
+                logger.error(
+                    f"[WorkerPool] 워커 {worker.index} 재시작 실패, {backoff:.0f}초 후 다시 시도합니다: {e}",
+                    exc_info=True,
+                )
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, RESPAWN_BACKOFF_MAX_S)
+        else:
+            return
+        if self._stopping:
+            new_worker.conn.send(None)
+            return
+        self._respawns += 1
+        self._workers[worker.index] = new_worker
+        self._all_dead.clear()
+        self._idle.put_nowait(new_worker)
+
+    def stats(self) -> dict:
+        idle = self._idle.qsize() if self._idle is not None else 0
+        alive = self.alive
+        return {
+            "workers": self.num_workers,
+            "alive": alive,
+            "idle": idle,
+            "busy": alive - idle,
+            "threads_per_worker": self.threads_per_worker,
+            "cpu_sets": [worker.cpu_set if worker is not None else None for worker in self._workers],
+            "calls": self._calls,
+            "failures": self._failures,
+            "respawns": self._respawns,
+            "per_worker_calls": [worker.calls if worker is not None else 0 for worker in self._workers],
+        }